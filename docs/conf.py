@@ -226,6 +226,39 @@ def setup(sphinx):
     import GAUSSRoles
     GAUSSRoles.setup(sphinx)
 
+    import GAUSSInventory
+    GAUSSInventory.setup(sphinx)
+
+    import GAUSSSuggest
+    GAUSSSuggest.setup(sphinx)
+
+    import GAUSSSymbolDB
+    GAUSSSymbolDB.setup(sphinx)
+
+    import GAUSSHTMLFormatter
+    GAUSSHTMLFormatter.setup(sphinx)
+
+    import GAUSSHighlightCache
+    GAUSSHighlightCache.setup(sphinx)
+
+    import GAUSSParallelHighlight
+    GAUSSParallelHighlight.setup(sphinx)
+
+    import GAUSSAutodoc
+    GAUSSAutodoc.setup(sphinx)
+
+    import GAUSSInclude
+    GAUSSInclude.setup(sphinx)
+
+    import GAUSSViewcode
+    GAUSSViewcode.setup(sphinx)
+
+    import GAUSSCallLinks
+    GAUSSCallLinks.setup(sphinx)
+
+    import GAUSSLint
+    GAUSSLint.setup(sphinx)
+
     from GAUSSHTMLTranslator import GAUSSHTMLTranslator
 
     for builder in ['html', 'readthedocs', 'readthedocssinglehtmllocalmedia']:
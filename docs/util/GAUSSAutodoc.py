@@ -0,0 +1,571 @@
+# -*- coding: utf-8 -*-
+"""
+    GAUSSAutodoc
+    ~~~~~~~~~~~~
+
+    The ``autogauss`` directive, which documents the procs of GAUSS source
+    files from the sources themselves::
+
+        .. autogauss:: ../src/gehttpdroutes.src
+        .. autogauss:: ../src/*.src
+           :procs: route, routeList
+
+    Every ``proc (n) = name(args)`` definition becomes a ``gauss:function``
+    description, with the comment block right above the proc as its
+    content.  The names of the returns are taken from the ``retp``
+    statements of the proc where they return plain variables, and a proc
+    whose ``retp`` statements disagree with the number of returns it
+    declares is warned about.  Procs in comments, strings and ``#if 0``
+    blocks are skipped, as the sources are read with `GAUSSLexer`.
+
+    What is found in a file is cached by the content of the file, in
+    ``<doctreedir>/gauss-autodoc.db`` unless ``gauss_autodoc_cache`` names
+    another database, so that only files that changed are read again, and
+    files whose size and modification time did not change are not read at
+    all.
+    With ``gauss_autodoc_workers`` set, the files a directive has to read
+    are read in that many processes.
+
+    Like docstrings for autodoc, the comments are reStructuredText.
+"""
+
+import codecs
+import glob
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import textwrap
+from concurrent.futures import ProcessPoolExecutor
+
+from docutils import nodes
+from docutils.parsers.rst import directives
+from docutils.statemachine import ViewList
+
+from pygments.token import Comment, Keyword, Number, Text
+
+from sphinx.locale import __
+from sphinx.util import logging
+from sphinx.util.docutils import SphinxDirective, switch_source_input
+from sphinx.util.nodes import nested_parse_with_titles
+
+from GAUSSLexer import GAUSSLexer
+
+if False:
+    # For type annotation
+    from typing import Any, Dict, List, Set, Tuple  # NOQA
+    from sphinx.application import Sphinx  # NOQA
+    from sphinx.environment import BuildEnvironment  # NOQA
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE files (
+    filename TEXT NOT NULL,
+    encoding TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    mtime INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    procs TEXT NOT NULL,
+    PRIMARY KEY (filename, encoding)
+);
+"""
+
+_identifier_re = re.compile(r'[a-zA-Z_]\w*$')
+
+# the decoration at the start of the lines of a /* */ comment
+_comment_prefix_re = re.compile(r'^\s*\*+ ?', re.M)
+
+_lexer = None           # type: GAUSSLexer
+_code_version = None    # type: unicode
+
+# what get_procs found in this process, by file name and encoding, with the
+# modification time and size of the file
+_found = {}  # type: Dict[Tuple[unicode, unicode], Tuple[int, int, List[Dict[unicode, Any]]]]
+
+
+def code_version():
+    # type: () -> unicode
+    """Return a hash of the code that parses the files."""
+    global _code_version
+    if _code_version is None:
+        sha1 = hashlib.sha1()
+        for module in (sys.modules[GAUSSLexer.__module__], sys.modules[__name__]):
+            filename = module.__file__
+            if filename.endswith(('.pyc', '.pyo')):
+                filename = filename[:-1]
+            with open(filename, 'rb') as f:
+                sha1.update(f.read())
+        _code_version = sha1.hexdigest()
+    return _code_version
+
+
+def _comment_text(value):
+    # type: (unicode) -> unicode
+    """Return the text of a comment without its delimiters."""
+    if value.startswith('//'):
+        return value[2:].rstrip('\n')[1 if value[2:3] == ' ' else 0:]
+    if value.startswith('@'):
+        return value[1:-1]
+    return _comment_prefix_re.sub('', value[2:-2].rstrip('*'))
+
+
+def _split_args(tokens):
+    # type: (List[Tuple[int, Any, unicode]]) -> List[List[Tuple[int, Any, unicode]]]
+    """Split the tokens of an argument list at its top level commas."""
+    args = [[]]  # type: List[List[Tuple[int, Any, unicode]]]
+    depth = 0
+    for token in tokens:
+        value = token[2]
+        if value in ('(', '[', '{'):
+            depth += 1
+        elif value in (')', ']', '}'):
+            depth -= 1
+        elif value == ',' and depth == 0:
+            args.append([])
+            continue
+        args[-1].append(token)
+    return args if args != [[]] else []
+
+
+def _join(tokens):
+    # type: (List[Tuple[int, Any, unicode]]) -> unicode
+    """Return the text of *tokens*, with a blank where the source has
+    whitespace or comments between them.
+    """
+    text = ''
+    end = None
+    for pos, ttype, value in tokens:
+        if end is not None and pos > end:
+            text += ' '
+        text += value
+        end = pos + len(value)
+    return text
+
+
+def parse_procs(text):
+    # type: (unicode) -> List[Dict[unicode, Any]]
+    """Return the procs defined in the GAUSS source *text*, in order.
+
+    Each proc is a dict with its ``name``, the ``line`` it starts on, the
+    number of ``returns`` it declares (None if it does not), its ``args``,
+    the ``retp`` statements in it as (line, names) pairs, where a name is
+    None for a return that is not a plain variable, the ``comment`` block
+    above it, and the ``start`` and ``end`` of its lines, from the line of
+    ``proc`` to the line of ``endp``, in *text*.
+    """
+    global _lexer
+    if _lexer is None:
+        _lexer = GAUSSLexer(stripnl=False)
+
+    # the tokens that are not whitespace or comments, with their lines, and
+    # the comment block each of them follows
+    tokens = []     # type: List[Tuple[int, Any, unicode]]
+    lines = []      # type: List[int]
+    comments = {}   # type: Dict[int, List[unicode]]
+    block = []      # type: List[unicode]
+    block_end = 0
+    line = 1
+    last = 0
+    for pos, ttype, value in _lexer.get_tokens_unprocessed(text):
+        if ttype in Text and not value.strip():
+            continue
+        line += text.count('\n', last, pos)
+        last = pos
+        if ttype in Comment.Single or ttype in Comment.Multiline:
+            # a blank line ends a comment block
+            if block and text.count('\n', block_end, pos) > 1:
+                block = []
+            block.append(value)
+            block_end = pos + len(value) - value.endswith('\n')
+            continue
+        if block:
+            if ttype in Keyword and text.count('\n', block_end, pos) <= 1:
+                comments[len(tokens)] = block
+            block = []
+        tokens.append((pos, ttype, value))
+        lines.append(line)
+
+    procs = []  # type: List[Dict[unicode, Any]]
+    count = len(tokens)
+    i = 0
+    while i < count:
+        pos, ttype, value = tokens[i]
+        i += 1
+        if ttype not in Keyword or value.lower() != 'proc':
+            continue
+        start = i - 1
+
+        # proc (n) = name(args);
+        returns = None
+        if (i + 3 < count and tokens[i][2] == '(' and tokens[i + 1][1] in Number and
+                tokens[i + 2][2] == ')' and tokens[i + 3][2] == '='):
+            try:
+                returns = int(tokens[i + 1][2])
+            except ValueError:
+                pass
+            i += 4
+        if i >= count or not _identifier_re.match(tokens[i][2]):
+            continue
+        name = tokens[i][2]
+        i += 1
+        args = []  # type: List[unicode]
+        if i < count and tokens[i][2] == '(':
+            end = i + 1
+            while end < count and tokens[end][2] not in (')', ';'):
+                end += 1
+            args = [_join(arg) for arg in _split_args(tokens[i + 1:end])]
+            i = end + 1
+
+        # the body, up to endp or the next proc
+        retps = []  # type: List[Tuple[int, List[unicode]]]
+        while i < count:
+            pos, ttype, value = tokens[i]
+            if ttype in Keyword and value.lower() in ('endp', 'proc'):
+                break
+            i += 1
+            if ttype not in Keyword or value.lower() != 'retp':
+                continue
+            retp_line = lines[i - 1]
+            names = []  # type: List[unicode]
+            if i < count and tokens[i][2] == '(':
+                depth = 0
+                end = i
+                while end < count:
+                    if tokens[end][2] in ('(', '[', '{'):
+                        depth += 1
+                    elif tokens[end][2] in (')', ']', '}'):
+                        depth -= 1
+                        if depth == 0:
+                            break
+                    elif tokens[end][2] == ';':
+                        break
+                    end += 1
+                names = [arg[0][2] if len(arg) == 1 and _identifier_re.match(arg[0][2])
+                         else None
+                         for arg in _split_args(tokens[i + 1:end])]
+                i = end
+            retps.append([retp_line, names])
+
+        if i < count and tokens[i][2].lower() == 'endp':
+            end = text.find('\n', tokens[i][0]) + 1 or len(text)
+        elif i < count:
+            # not closed before the next proc
+            end = text.rfind('\n', 0, tokens[i][0]) + 1
+        else:
+            end = len(text)
+        comment = '\n'.join(line.rstrip() for value in comments.get(start, [])
+                            for line in _comment_text(value).split('\n'))
+        procs.append({
+            'name': name,
+            'line': lines[start],
+            'returns': returns,
+            'args': args,
+            'retps': retps,
+            'comment': textwrap.dedent(comment).strip('\n'),
+            'start': text.rfind('\n', 0, tokens[start][0]) + 1,
+            'end': end,
+        })
+    return procs
+
+
+def _byte_offsets(procs, text, content, encoding):
+    # type: (List[Dict[unicode, Any]], unicode, bytes, unicode) -> None
+    """Turn the ``start`` and ``end`` of *procs* from offsets in *text*
+    into offsets in *content*, the bytes *text* was decoded from.
+    """
+    codec = codecs.lookup(encoding).name
+    if codec == 'utf-8-sig':
+        codec = 'utf-8'
+    # a byte order mark comes before the first character
+    offset = len(content) - len(text.encode(codec))
+    offsets = {}    # type: Dict[int, int]
+    last = 0
+    for pos in sorted(set(proc[key] for proc in procs for key in ('start', 'end'))):
+        offset += len(text[last:pos].encode(codec))
+        offsets[pos] = offset
+        last = pos
+    for proc in procs:
+        proc['start'] = offsets[proc['start']]
+        proc['end'] = offsets[proc['end']]
+
+
+def connect(filename):
+    # type: (unicode) -> sqlite3.Connection
+    """Open the cache *filename*, emptying it when it is out of date."""
+    conn = sqlite3.connect(filename, timeout=60)
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+    except sqlite3.DatabaseError:
+        row = None
+    if row is None or int(row[0]) != SCHEMA_VERSION:
+        conn.close()
+        if os.path.exists(filename):
+            os.remove(filename)
+        conn = sqlite3.connect(filename, timeout=60)
+        # parallel readers look files up while another one commits
+        conn.execute('PRAGMA journal_mode=WAL')
+        with conn:
+            conn.executescript(SCHEMA)
+            conn.execute("INSERT INTO meta VALUES ('schema', ?)", (str(SCHEMA_VERSION),))
+            conn.execute("INSERT INTO meta VALUES ('code', '')")
+    row = conn.execute("SELECT value FROM meta WHERE key = 'code'").fetchone()
+    if row[0] != code_version():
+        with conn:
+            conn.execute("DELETE FROM files")
+            conn.execute("UPDATE meta SET value = ? WHERE key = 'code'", (code_version(),))
+    return conn
+
+
+def get_procs(filenames, encoding, cachefile, workers):
+    # type: (List[unicode], unicode, unicode, int) -> Dict[unicode, List[Dict[unicode, Any]]]
+    """Return the procs of each of *filenames*, reading only the files that
+    are not in the cache *cachefile* as they are now.  The ``start`` and
+    ``end`` of the procs are byte offsets.
+    """
+    result = {}     # type: Dict[unicode, List[Dict[unicode, Any]]]
+    missing = []    # type: List[Tuple[unicode, unicode, unicode, bytes, os.stat_result]]
+    touched = []    # type: List[Tuple[int, int, unicode, unicode]]
+    stats = {}      # type: Dict[unicode, os.stat_result]
+    for filename in filenames:
+        stat = stats[filename] = os.stat(filename)
+        found = _found.get((filename, encoding))
+        if found is not None and found[:2] == (stat.st_mtime_ns, stat.st_size):
+            result[filename] = found[2]
+    if len(result) == len(filenames):
+        return result
+
+    conn = connect(cachefile)
+    try:
+        for filename in filenames:
+            if filename in result:
+                continue
+            stat = stats[filename]
+            row = conn.execute("SELECT hash, mtime, size, procs FROM files "
+                               "WHERE filename = ? AND encoding = ?",
+                               (filename, encoding)).fetchone()
+            if row is not None and row[1:3] == (stat.st_mtime_ns, stat.st_size):
+                result[filename] = json.loads(row[3])
+                continue
+            with open(filename, 'rb') as f:
+                content = f.read()
+            digest = hashlib.sha1(content).hexdigest()
+            if row is not None and row[0] == digest:
+                # touched, but not changed
+                result[filename] = json.loads(row[3])
+                touched.append((stat.st_mtime_ns, stat.st_size, filename, encoding))
+            else:
+                missing.append((filename, digest, content.decode(encoding), content, stat))
+
+        texts = [item[2] for item in missing]
+        if workers > 0 and len(missing) > 1:
+            with ProcessPoolExecutor(min(workers, len(missing))) as executor:
+                parsed = list(executor.map(parse_procs, texts,
+                                           chunksize=max(1, len(texts) // (workers * 4))))
+        else:
+            parsed = [parse_procs(text) for text in texts]
+        with conn:
+            conn.executemany("UPDATE files SET mtime = ?, size = ? "
+                             "WHERE filename = ? AND encoding = ?", touched)
+            for (filename, digest, text, content, stat), procs in zip(missing, parsed):
+                _byte_offsets(procs, text, content, encoding)
+                result[filename] = procs
+                conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                             (filename, encoding, digest, stat.st_mtime_ns, stat.st_size,
+                              json.dumps(procs)))
+    finally:
+        conn.close()
+    for filename in filenames:
+        stat = stats[filename]
+        _found[filename, encoding] = (stat.st_mtime_ns, stat.st_size, result[filename])
+    return result
+
+
+def get_cachefile(app):
+    # type: (Sphinx) -> unicode
+    if app.config.gauss_autodoc_cache:
+        return os.path.join(app.confdir, app.config.gauss_autodoc_cache)
+    return os.path.join(app.doctreedir, 'gauss-autodoc.db')
+
+
+def get_signature(proc):
+    # type: (Dict[unicode, Any]) -> unicode
+    """Return the ``gauss:function`` signature of *proc*."""
+    returns = proc['returns']
+    if returns is None:
+        returns = max([len(names) for line, names in proc['retps']] or [1])
+    names = []  # type: List[unicode]
+    for i in range(returns):
+        for line, retp in proc['retps']:
+            if len(retp) == returns and retp[i] is not None and retp[i] not in names:
+                names.append(retp[i])
+                break
+        else:
+            names.append('out%d' % (i + 1) if returns > 1 else 'out')
+    signature = '%s(%s)' % (proc['name'], ', '.join(proc['args']))
+    if len(names) > 1:
+        return '{ %s } = %s' % (', '.join(names), signature)
+    elif names:
+        return '%s = %s' % (names[0], signature)
+    return signature
+
+
+class AutoGAUSSDirective(SphinxDirective):
+    """Describe the procs of GAUSS source files."""
+
+    has_content = False
+    required_arguments = 1
+    optional_arguments = 0
+    final_argument_whitespace = True
+    option_spec = {
+        'procs': directives.unchanged,
+        'noindex': directives.flag,
+        'encoding': directives.encoding,
+    }
+
+    def run(self):
+        # type: () -> List[nodes.Node]
+        filenames = []  # type: List[unicode]
+        patterns = self.env.temp_data.setdefault('gauss_autodoc_patterns', set())
+        for pattern in self.arguments[0].split():
+            rel_pattern, pattern = self.env.relfn2path(pattern)
+            patterns.add(pattern)
+            matches = sorted(glob.glob(pattern))
+            if not matches:
+                logger.warning(__('autogauss: no files match %s'), rel_pattern,
+                               location=(self.env.docname, self.lineno))
+            for filename in matches:
+                if filename not in filenames:
+                    filenames.append(filename)
+                    self.env.note_dependency(filename)
+
+        encoding = self.options.get('encoding', self.config.source_encoding)
+        try:
+            procs = get_procs(filenames, encoding, get_cachefile(self.env.app),
+                              self.config.gauss_autodoc_workers)
+        except (IOError, OSError, UnicodeError) as exc:
+            logger.warning(__('autogauss: cannot read %s'), exc,
+                           location=(self.env.docname, self.lineno))
+            return []
+
+        wanted = None
+        if 'procs' in self.options:
+            wanted = [name.strip() for name in self.options['procs'].split(',')]
+        content = ViewList()
+        found = set()   # type: Set[unicode]
+        for filename in filenames:
+            for proc in procs[filename]:
+                # the first of the definitions in #ifdef branches
+                if (wanted is not None and proc['name'] not in wanted or
+                        proc['name'] in found):
+                    continue
+                found.add(proc['name'])
+                line = proc['line'] - 1
+                for retp_line, names in proc['retps']:
+                    if proc['returns'] is not None and len(names) != proc['returns']:
+                        logger.warning(__('proc %s declares %d returns, but its retp '
+                                          'returns %d'),
+                                       proc['name'], proc['returns'], len(names),
+                                       location='%s:%d' % (filename, retp_line))
+                content.append('.. gauss:function:: ' + get_signature(proc), filename, line)
+                if 'noindex' in self.options:
+                    content.append('   :noindex:', filename, line)
+                content.append('', filename, line)
+                comment = proc['comment'].split('\n') if proc['comment'] else []
+                for i, text in enumerate(comment):
+                    content.append(text and '   ' + text, filename,
+                                   line - len(comment) + i)
+                content.append('', filename, line)
+        for name in wanted or []:
+            if name not in found:
+                logger.warning(__('autogauss: proc %s not found'), name,
+                               location=(self.env.docname, self.lineno))
+
+        node = nodes.section()
+        node.document = self.state.document
+        with switch_source_input(self.state, content):
+            nested_parse_with_titles(self.state, content, node)
+        return node.children
+
+
+def note_patterns(app, doctree):
+    # type: (Sphinx, nodes.Node) -> None
+    # remember what the patterns matched, to see new and removed files
+    patterns = app.env.temp_data.get('gauss_autodoc_patterns')
+    if not patterns:
+        return
+    app.env.gauss_autodoc_patterns[app.env.docname] = dict(
+        (pattern, sorted(glob.glob(pattern))) for pattern in patterns)
+
+
+def init_patterns(app, env, docnames):
+    # type: (Sphinx, BuildEnvironment, List[unicode]) -> None
+    if not hasattr(env, 'gauss_autodoc_patterns'):
+        env.gauss_autodoc_patterns = {}
+
+
+def purge_patterns(app, env, docname):
+    # type: (Sphinx, BuildEnvironment, unicode) -> None
+    getattr(env, 'gauss_autodoc_patterns', {}).pop(docname, None)
+
+
+def merge_patterns(app, env, docnames, other):
+    # type: (Sphinx, BuildEnvironment, Set[unicode], BuildEnvironment) -> None
+    for docname in docnames:
+        if docname in other.gauss_autodoc_patterns:
+            env.gauss_autodoc_patterns[docname] = other.gauss_autodoc_patterns[docname]
+
+
+def get_outdated(app, env, added, changed, removed):
+    # type: (Sphinx, BuildEnvironment, Set[unicode], Set[unicode], Set[unicode]) -> List[unicode]
+    """Return the documents whose patterns match other files than before."""
+    # Sphinx 1.8 passes the builder as env
+    env = app.env
+    outdated = []
+    for docname, patterns in getattr(env, 'gauss_autodoc_patterns', {}).items():
+        if docname in env.all_docs and docname not in changed and any(
+                sorted(glob.glob(pattern)) != matches
+                for pattern, matches in patterns.items()):
+            outdated.append(docname)
+    return outdated
+
+
+def prune_cache(app, exception):
+    # type: (Sphinx, Exception) -> None
+    filename = get_cachefile(app)
+    if exception is not None or not os.path.exists(filename):
+        return
+    conn = connect(filename)
+    try:
+        # files that were removed
+        stale = [row for row in conn.execute("SELECT DISTINCT filename FROM files")
+                 if not os.path.exists(row[0])]
+        if stale:
+            with conn:
+                conn.executemany("DELETE FROM files WHERE filename = ?", stale)
+    finally:
+        conn.close()
+
+
+def setup(app):
+    # type: (Sphinx) -> Dict[unicode, Any]
+    app.add_config_value('gauss_autodoc_cache', None, '')
+    app.add_config_value('gauss_autodoc_workers', 0, '')
+    app.add_directive('autogauss', AutoGAUSSDirective)
+    app.connect('env-before-read-docs', init_patterns)
+    app.connect('env-get-outdated', get_outdated)
+    app.connect('env-purge-doc', purge_patterns)
+    app.connect('env-merge-info', merge_patterns)
+    app.connect('doctree-read', note_patterns)
+    app.connect('build-finished', prune_cache)
+
+    return {
+        'version': 'builtin',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
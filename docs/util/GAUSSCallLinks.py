@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+    GAUSSCallLinks
+    ~~~~~~~~~~~~~~
+
+    Links the procs called in highlighted GAUSS code to their
+    ``gauss:function`` descriptions.  `GAUSSLexer` gives called names
+    ``Name.Function`` tokens, or ``Name.Builtin`` ones for the names it
+    knows, such as ``dbOpen``; once a block is highlighted, the spans of
+    those tokens whose name is described get wrapped in a link.  Set
+    ``gauss_link_calls = False`` to leave the code unlinked.
+
+    The links are added when a page is written, so the highlight cache
+    and the processes of ``gauss_highlight_workers`` are not affected;
+    `GAUSSHTMLFormatter` is only told to keep the spans of those tokens
+    apart.
+
+    The descriptions are looked up in a table built from the objects of
+    the GAUSS domain once per build, by lowercased name, as GAUSS is case
+    insensitive.
+"""
+
+import re
+from html import escape
+
+from GAUSSHTMLFormatter import GAUSSHTMLFormatter
+
+if False:
+    # For type annotation
+    from typing import Any, Dict, Tuple  # NOQA
+    from sphinx.application import Sphinx  # NOQA
+    from sphinx.builders import Builder  # NOQA
+
+# the spans of Name.Function and Name.Builtin tokens, as HtmlFormatter and
+# GAUSSHTMLFormatter write them
+_call_re = re.compile(r'<span class="n[fb]">([a-zA-Z_]\w*)</span>')
+
+
+def get_call_targets(app):
+    # type: (Sphinx) -> Dict[unicode, Tuple[unicode, unicode]]
+    """Return the document and anchor of every ``gauss:function``, by its
+    lowercased name, or by its name without module if that is not
+    ambiguous.
+    """
+    targets = getattr(app, '_gauss_call_targets', None)
+    if targets is not None:
+        return targets
+
+    data = app.env.get_domain('gauss').data
+    docnames, objtypes = data['docnames'], data['objtypes']
+    targets = {}
+    qualified = {}  # type: Dict[unicode, Any]
+    for fullname, code in data['objects'].items():
+        if objtypes[code & 0xff] != 'function':
+            continue
+        target = (docnames[code >> 8], fullname)
+        if '.' in fullname:
+            qualified.setdefault(fullname.rpartition('.')[2].lower(), []).append(target)
+        else:
+            targets[fullname.lower()] = target
+    for name, found in qualified.items():
+        if len(found) == 1:
+            targets.setdefault(name, found[0])
+    app._gauss_call_targets = targets
+    return targets
+
+
+class CallLinker(object):
+    """Links calls in the highlighted code of the document being written
+    by *builder*.
+    """
+
+    def __init__(self, builder, targets):
+        # type: (Builder, Dict[unicode, Tuple[unicode, unicode]]) -> None
+        self.builder = builder
+        self.targets = targets
+        self.docname = builder.current_docname
+        self._starts = {}   # type: Dict[unicode, unicode]
+
+    def _link(self, match):
+        # type: (Any) -> unicode
+        name = match.group(1)
+        try:
+            start = self._starts[name]
+        except KeyError:
+            target = self.targets.get(name.lower())
+            if target is None:
+                start = None
+            else:
+                docname, anchor = target
+                uri = self.builder.get_relative_uri(self.docname, docname)
+                # the single page builder gives the anchor of the document
+                start = '<a class="reference internal" href="%s">' % escape(
+                    uri.partition('#')[0] + '#' + anchor)
+            self._starts[name] = start
+        if start is None:
+            return match.group()
+        return start + match.group() + '</a>'
+
+    def link(self, html):
+        # type: (unicode) -> unicode
+        if not self.targets:
+            return html
+        return _call_re.sub(self._link, html)
+
+
+def keep_call_spans(app):
+    # type: (Sphinx) -> None
+    highlighter = getattr(app.builder, 'highlighter', None)
+    if (app.config.gauss_link_calls and highlighter is not None and
+            issubclass(highlighter.formatter, GAUSSHTMLFormatter)):
+        highlighter.formatter_args['keep'] = ['Name.Function', 'Name.Builtin']
+
+
+def setup(app):
+    # type: (Sphinx) -> Dict[unicode, Any]
+    app.add_config_value('gauss_link_calls', True, 'html')
+    app.connect('builder-inited', keep_call_spans)
+
+    return {
+        'version': 'builtin',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
@@ -21,14 +21,21 @@ from sphinx.directives import ObjectDescription
 from sphinx.domains import Domain, ObjType, Index
 from sphinx.locale import _, __
 from sphinx.roles import XRefRole
+from sphinx.transforms import SphinxTransform
 from sphinx.util import logging
 from sphinx.util.docfields import Field, GroupedField, TypedField
 from sphinx.util.docutils import SphinxDirective
 from sphinx.util.nodes import make_refnode
 
+try:
+    from sphinx.errors import NoUri
+except ImportError:
+    # Sphinx < 2.1, which has it in sphinx.environment only
+    from sphinx.environment import NoUri
+
 if False:
     # For type annotation
-    from typing import Any, Dict, Iterable, Iterator, List, Tuple, Union  # NOQA
+    from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple, Type, Union  # NOQA
     from sphinx.application import Sphinx  # NOQA
     from sphinx.builders import Builder  # NOQA
     from sphinx.environment import BuildEnvironment  # NOQA
@@ -36,17 +43,15 @@ if False:
 logger = logging.getLogger(__name__)
 
 
-# REs for Python signatures
-py_sig_re = re.compile(
-    r'''^ (?:
-          \{? \s*(.*?)\s*?\}?  # returns
-          \s*=\s*
-          )?
-          ([\w.]*\.)?            # prefix/class? name
-          (\w+)  \s*             # thing name
-          (?: \(\s*(.*)\s*\)     # optional: arguments
-          )? $                   # and nothing more
-          ''', re.VERBOSE)
+# characters allowed in a (possibly dotted) object name
+_name_re = re.compile(r'[\w.]*')
+
+# delimiters between the types of a typed doc field, e.g. "matrix or string"
+_xref_delims_re = re.compile(r'(\s*[\[\]\(\),](?:\s*or\s)?\s*|\s+or\s+)')
+
+# signature -> (returns, name prefix, name, arguments) or None; emptied
+# when a build starts, as a process may run several builds
+_signature_cache = {}  # type: Dict[unicode, Tuple]
 
 
 pairindextypes = {
@@ -67,60 +72,149 @@ locale.pairindextypes = DeprecatedDict(
 )
 
 
-def _pseudo_parse_generic(signode, arglist, desc_listtype, desc_type):
-    # type: (addnodes.desc_signature, unicode) -> None
-    """ "Parse" a list of returns separated by commas.
+def _parse_generic(arglist):
+    # type: (unicode) -> List[Union[unicode, List]]
+    """ "Parse" a list of arguments or returns separated by commas.
+
+    Returns a list of argument strings, with ``[...]`` optional groups as
+    nested lists.
     """
-    genericlist = desc_listtype()
+    if '[' not in arglist and ']' not in arglist:
+        # common case: no optional groups
+        return [argument for argument in
+                (argument.strip() for argument in arglist.split(','))
+                if argument]
+
+    genericlist = []  # type: List[Union[unicode, List]]
     stack = [genericlist]
     try:
         for argument in arglist.split(','):
-            argument = argument.strip()
-            ends_open = ends_close = 0
-            while argument.startswith('['):
-                stack.append(addnodes.desc_optional())
-                stack[-2] += stack[-1]
-                argument = argument[1:].strip()
-            while argument.startswith(']'):
+            start, end = 0, len(argument)
+            while start < end and argument[start].isspace():
+                start += 1
+            while end > start and argument[end - 1].isspace():
+                end -= 1
+            while start < end and argument[start] == '[':
+                stack.append([])
+                stack[-2].append(stack[-1])
+                start += 1
+                while start < end and argument[start].isspace():
+                    start += 1
+            while start < end and argument[start] == ']':
                 stack.pop()
-                argument = argument[1:].strip()
-            while argument.endswith(']') and not argument.endswith('[]'):
+                start += 1
+                while start < end and argument[start].isspace():
+                    start += 1
+            ends_close = 0
+            while end > start and argument[end - 1] == ']' and \
+                    not (end - start >= 2 and argument[end - 2] == '['):
                 ends_close += 1
-                argument = argument[:-1].strip()
-            while argument.endswith('['):
+                end -= 1
+                while end > start and argument[end - 1].isspace():
+                    end -= 1
+            ends_open = 0
+            while end > start and argument[end - 1] == '[':
                 ends_open += 1
-                argument = argument[:-1].strip()
-            if argument:
-                stack[-1] += desc_type(argument, argument)
-            while ends_open:
-                stack.append(addnodes.desc_optional())
-                stack[-2] += stack[-1]
-                ends_open -= 1
-            while ends_close:
+                end -= 1
+                while end > start and argument[end - 1].isspace():
+                    end -= 1
+            if start < end:
+                stack[-1].append(argument[start:end])
+            for _i in range(ends_open):
+                stack.append([])
+                stack[-2].append(stack[-1])
+            for _i in range(ends_close):
                 stack.pop()
-                ends_close -= 1
         if len(stack) != 1:
             raise IndexError
     except IndexError:
         # if there are too few or too many elements on the stack, just give up
-        # and treat the whole argument list as one argument, discarding the
-        # already partially populated returnlist node
-        signode += desc_listtype()
-        signode[-1] += desc_type(arglist, arglist)
-    else:
-        signode += genericlist
+        # and treat the whole argument list as one argument
+        genericlist = [arglist]
+    return genericlist
 
 
-def _pseudo_parse_arglist(signode, arglist):
-    _pseudo_parse_generic(signode, arglist,
-                          addnodes.desc_parameterlist,
-                          addnodes.desc_parameter)
+def _build_generic(signode, parsed, desc_listtype, desc_type):
+    # type: (addnodes.desc_signature, List[Union[unicode, List]], Type[nodes.Element], Type[nodes.Element]) -> None  # NOQA
+    """Append a *desc_listtype* node built from a :func:`_parse_generic`
+    result to *signode*.
+    """
+    def build(parent, items):
+        for item in items:
+            if isinstance(item, list):
+                optional = addnodes.desc_optional()
+                parent += optional
+                build(optional, item)
+            else:
+                parent += desc_type(item, item)
+
+    genericlist = desc_listtype()
+    build(genericlist, parsed)
+    signode += genericlist
+
 
+def _split_callable(sig, pos):
+    # type: (unicode, int) -> Tuple[unicode, unicode, unicode]
+    """Split ``prefix.name(arglist)`` starting at *pos* of *sig* into
+    (prefix, name, arglist), or return None if the rest of *sig* is not of
+    that form.  Missing parts are returned as None.
+    """
+    end = _name_re.match(sig, pos).end()
+    if end == pos or sig[end - 1] == '.':
+        return None
+    dot = sig.rfind('.', pos, end)
+    name_prefix = sig[pos:dot + 1] if dot != -1 else None
+    name = sig[dot + 1 if dot != -1 else pos:end]
+    while end < len(sig) and sig[end].isspace():
+        end += 1
+    if end == len(sig):
+        return name_prefix, name, None
+    if sig[end] != '(' or sig[-1] != ')' or end == len(sig) - 1:
+        return None
+    return name_prefix, name, sig[end + 1:-1].lstrip()
+
+
+def _parse_signature(sig):
+    # type: (unicode) -> Tuple[nodes.Element, unicode, unicode, nodes.Element]
+    """Parse a GAUSS signature such as ``{ a, b } = f(x[, y])``.
+
+    Return (returns, name prefix, name, arguments), where returns and
+    arguments are :func:`_parse_generic` results, or None if the signature
+    has none; or return None if *sig* is not a valid signature.  Results are
+    cached and shared, so they must not be modified.
+    """
+    try:
+        return _signature_cache[sig]
+    except KeyError:
+        pass
+
+    result = None
+    eq = sig.find('=')
+    while eq != -1:
+        # the returns are everything up to the first "=" that is followed by
+        # a valid name and argument list
+        parts = _split_callable(sig, len(sig) - len(sig[eq + 1:].lstrip()))
+        if parts is not None:
+            returns = sig[:eq].strip()
+            if returns[:1] == '{':
+                returns = returns[1:].lstrip()
+            if returns[-1:] == '}':
+                returns = returns[:-1].rstrip()
+            result = (returns,) + parts
+            break
+        eq = sig.find('=', eq + 1)
+    else:
+        parts = _split_callable(sig, 0)
+        if parts is not None:
+            result = (None,) + parts
 
-def _pseudo_parse_returns(signode, returns):
-    _pseudo_parse_generic(signode, returns,
-                          desc_returnlist,
-                          desc_return)
+    if result is not None:
+        returns, name_prefix, name, arglist = result
+        result = (_parse_generic(returns) if returns else None,
+                  name_prefix, name,
+                  _parse_generic(arglist) if arglist else None)
+    _signature_cache[sig] = result
+    return result
 
 
 # This override allows our inline type specifiers to behave like :class: link
@@ -158,9 +252,7 @@ class PyXrefMixin(object):
                    env=None,                  # type: BuildEnvironment
                    ):
         # type: (...) -> List[nodes.Node]
-        delims = r'(\s*[\[\]\(\),](?:\s*or\s)?\s*|\s+or\s+)'
-        delims_re = re.compile(delims)
-        sub_targets = re.split(delims, target)
+        sub_targets = _xref_delims_re.split(target)
 
         split_contnode = bool(contnode and contnode.astext() == target)
 
@@ -169,7 +261,7 @@ class PyXrefMixin(object):
             if split_contnode:
                 contnode = nodes.Text(sub_target)
 
-            if delims_re.match(sub_target):
+            if _xref_delims_re.match(sub_target):
                 results.append(contnode or innernode(sub_target, sub_target))
             else:
                 results.append(self.make_xref(rolename, domain, sub_target,
@@ -268,10 +360,10 @@ class PyObject(ObjectDescription):
         * it is stripped from the displayed name if present
         * it is added to the full name (return value) if not present
         """
-        m = py_sig_re.match(sig)
-        if m is None:
+        parsed = _parse_signature(sig)
+        if parsed is None:
             raise ValueError
-        retann, name_prefix, name, arglist = m.groups()
+        returns, name_prefix, name, arglist = parsed
 
         # determine module and class name (if applicable), as well as full name
         modname = self.options.get(
@@ -307,9 +399,8 @@ class PyObject(ObjectDescription):
         if sig_prefix:
             signode += addnodes.desc_annotation(sig_prefix, sig_prefix)
 
-        if retann:
-            _pseudo_parse_returns(signode, retann)
-            # signode += addnodes.desc_returns(retann, retann)
+        if returns is not None:
+            _build_generic(signode, returns, desc_returnlist, desc_return)
 
         if name_prefix:
             signode += addnodes.desc_addname(name_prefix, name_prefix)
@@ -323,8 +414,9 @@ class PyObject(ObjectDescription):
                 signode += addnodes.desc_addname(nodetext, nodetext)
 
         signode += addnodes.desc_name(name, name)
-        if arglist:
-            _pseudo_parse_arglist(signode, arglist)
+        if arglist is not None:
+            _build_generic(signode, arglist, addnodes.desc_parameterlist,
+                           addnodes.desc_parameter)
         else:
             if self.needs_arglist():
                 # for callables, add an empty parameter list
@@ -353,15 +445,16 @@ class PyObject(ObjectDescription):
             signode['ids'].append(fullname)
             signode['first'] = (not self.names)
             self.state.document.note_explicit_target(signode)
-            objects = self.env.domaindata['gauss']['objects']
-            if fullname in objects:
+            domain = self.env.get_domain('gauss')
+            other = domain.get_object(fullname)
+            if other is not None:
                 self.state_machine.reporter.warning(
                     'duplicate object description of %s, ' % fullname +
                     'other instance in ' +
-                    self.env.doc2path(objects[fullname][0]) +
+                    self.env.doc2path(other[0]) +
                     ', use :noindex: for one of them',
                     line=self.lineno)
-            objects[fullname] = (self.env.docname, self.objtype)
+            domain.note_object(fullname, self.objtype, self.env.docname)
 
         indextext = self.get_index_text(modname, name_cls)
         if indextext:
@@ -610,13 +703,14 @@ class PyModule(SphinxDirective):
         self.env.ref_context['py:module'] = modname
         ret = []
         if not noindex:
-            self.env.domaindata['gauss']['modules'][modname] = (self.env.docname,
-                                                             self.options.get('synopsis', ''),
-                                                             self.options.get('platform', ''),
-                                                             'deprecated' in self.options)
+            domain = self.env.get_domain('gauss')
+            domain.note_module(modname, (self.env.docname,
+                                         self.options.get('synopsis', ''),
+                                         self.options.get('platform', ''),
+                                         'deprecated' in self.options))
             # make a duplicate entry in 'objects' to facilitate searching for
             # the module in PythonDomain.find_obj()
-            self.env.domaindata['gauss']['objects'][modname] = (self.env.docname, 'module')
+            domain.note_object(modname, 'module', self.env.docname)
             targetnode = nodes.target('', '', ids=['module-' + modname],
                                       ismod=True)
             self.state.document.note_explicit_target(targetnode)
@@ -692,7 +786,8 @@ class PythonModuleIndex(Index):
         ignores = self.domain.env.config['modindex_common_prefix']  # type: ignore
         ignores = sorted(ignores, key=len, reverse=True)
         # list of all modules, sorted by module name
-        modules = sorted(iteritems(self.domain.data['modules']),
+        modules = sorted(((modname, self.domain.get_module(modname))
+                          for modname in self.domain.data['modules']),
                          key=lambda x: x[0].lower())
         # sort out collapsable modules
         prev_modname = ''
@@ -789,31 +884,221 @@ class GAUSSDomain(Domain):
         'obj':   PyXRefRole(),
     }
     initial_data = {
-        'objects': {},  # fullname -> docname, objtype
-        'modules': {},  # modname -> docname, synopsis, platform, deprecated
-    }  # type: Dict[unicode, Dict[unicode, Tuple[Any]]]
+        'docnames': [],    # docid -> docname
+        'objtypes': [],    # type id -> objtype
+        'objects': {},     # fullname -> docid << 8 | type id
+        'modules': {},     # modname -> docid, synopsis, platform, deprecated
+        'docobjects': {},  # docid -> set of fullnames described there
+        'docmodules': {},  # docid -> set of modnames described there
+        'xrefdeps': {},    # xref target -> set of docids referring to it
+        'docxrefs': {},    # docid -> set of xref targets used there
+    }  # type: Dict[unicode, Any]
     indices = [
         PythonModuleIndex,
     ]
+    data_version = 4
+
+    def __init__(self, env):
+        # type: (BuildEnvironment) -> None
+        data = env.domaindata.get(self.name)
+        if data is not None and data['version'] == 3:
+            _upgrade_data_v3(data)
+        super(GAUSSDomain, self).__init__(env)
+        # reverse tables and indices derived from the pickled data
+        self._docids = dict((docname, docid) for docid, docname
+                            in enumerate(self.data['docnames']))
+        self._typeids = dict((objtype, typeid) for typeid, objtype
+                             in enumerate(self.data['objtypes']))
+        # last component of fullname -> set of fullnames; built on first use
+        self._shortnames = None       # type: Dict[unicode, Set[unicode]]
+        # (modname, classname, target, type, searchmode) ->
+        # tuple of (fullname, docname, objtype); lives for one build only
+        self._resolve_cache = {}      # type: Dict[Tuple, Tuple]
+        self.resolve_cache_hits = 0   # type: int
+        self.resolve_cache_misses = 0  # type: int
+        # object/module entries as they were before this build touched them
+        self._previous_objects = {}   # type: Dict[unicode, int]
+        self._previous_modules = {}   # type: Dict[unicode, Tuple]
+
+    def _docid(self, docname):
+        # type: (unicode) -> int
+        try:
+            return self._docids[docname]
+        except KeyError:
+            docid = self._docids[docname] = len(self.data['docnames'])
+            self.data['docnames'].append(docname)
+            return docid
+
+    def _typeid(self, objtype):
+        # type: (unicode) -> int
+        try:
+            return self._typeids[objtype]
+        except KeyError:
+            typeid = self._typeids[objtype] = len(self.data['objtypes'])
+            self.data['objtypes'].append(objtype)
+            return typeid
+
+    def _get_shortnames(self):
+        # type: () -> Dict[unicode, Set[unicode]]
+        if self._shortnames is None:
+            self._shortnames = {}
+            for name in self.data['objects']:
+                self._shortnames.setdefault(name.rpartition('.')[2],
+                                            set()).add(name)
+        return self._shortnames
+
+    def get_object(self, name):
+        # type: (unicode) -> Tuple[unicode, unicode]
+        """Return the (docname, objtype) of object *name*, or None."""
+        code = self.data['objects'].get(name)
+        if code is None:
+            return None
+        return self.data['docnames'][code >> 8], self.data['objtypes'][code & 0xff]
+
+    def get_module(self, modname):
+        # type: (unicode) -> Tuple[unicode, unicode, unicode, bool]
+        """Return the (docname, synopsis, platform, deprecated) of module
+        *modname*, or None.
+        """
+        data = self.data['modules'].get(modname)
+        if data is None:
+            return None
+        return (self.data['docnames'][data[0]],) + data[1:]
+
+    def note_object(self, name, objtype, docname):
+        # type: (unicode, unicode, unicode) -> None
+        """Register an object, keeping the name and document indices up to
+        date.
+        """
+        self._resolve_cache.clear()
+        objects = self.data['objects']
+        docid = self._docid(docname)
+        self._previous_objects.setdefault(name, objects.get(name))
+        if name in objects and objects[name] >> 8 != docid:
+            # a duplicate description takes the object over
+            self.data['docobjects'].get(objects[name] >> 8, set()).discard(name)
+        objects[name] = docid << 8 | self._typeid(objtype)
+        if self._shortnames is not None:
+            self._shortnames.setdefault(name.rpartition('.')[2],
+                                        set()).add(name)
+        self.data['docobjects'].setdefault(docid, set()).add(name)
+
+    def note_module(self, modname, data):
+        # type: (unicode, Tuple[unicode, unicode, unicode, bool]) -> None
+        """Register a module; *data* is (docname, synopsis, platform,
+        deprecated).
+        """
+        self._resolve_cache.clear()
+        modules = self.data['modules']
+        docid = self._docid(data[0])
+        self._previous_modules.setdefault(modname, modules.get(modname))
+        if modname in modules and modules[modname][0] != docid:
+            self.data['docmodules'].get(modules[modname][0], set()).discard(modname)
+        modules[modname] = (docid,) + tuple(data[1:])
+        self.data['docmodules'].setdefault(docid, set()).add(modname)
+
+    def _forget_object(self, name):
+        # type: (unicode) -> None
+        self._previous_objects.setdefault(name, self.data['objects'][name])
+        del self.data['objects'][name]
+        if self._shortnames is None:
+            return
+        shortname = name.rpartition('.')[2]
+        fullnames = self._shortnames.get(shortname)
+        if fullnames is not None:
+            fullnames.discard(name)
+            if not fullnames:
+                del self._shortnames[shortname]
 
     def clear_doc(self, docname):
         # type: (unicode) -> None
-        for fullname, (fn, _l) in list(self.data['objects'].items()):
-            if fn == docname:
-                del self.data['objects'][fullname]
-        for modname, (fn, _x, _x, _x) in list(self.data['modules'].items()):
-            if fn == docname:
-                del self.data['modules'][modname]
+        self._resolve_cache.clear()
+        docid = self._docids.get(docname)
+        if docid is None:
+            return
+        objects = self.data['objects']
+        for fullname in self.data['docobjects'].pop(docid, ()):
+            if fullname in objects and objects[fullname] >> 8 == docid:
+                self._forget_object(fullname)
+        modules = self.data['modules']
+        for modname in self.data['docmodules'].pop(docid, ()):
+            if modules.get(modname, (None,))[0] == docid:
+                self._previous_modules.setdefault(modname, modules[modname])
+                del modules[modname]
+        xrefdeps = self.data['xrefdeps']
+        for target in self.data['docxrefs'].pop(docid, ()):
+            docids = xrefdeps.get(target)
+            if docids is not None:
+                docids.discard(docid)
+                if not docids:
+                    del xrefdeps[target]
+
+    def note_xref(self, target, docname):
+        # type: (unicode, unicode) -> None
+        """Record that *docname* contains a pending reference to *target*."""
+        docid = self._docid(docname)
+        self.data['xrefdeps'].setdefault(target, set()).add(docid)
+        self.data['docxrefs'].setdefault(docid, set()).add(target)
+
+    def process_doc(self, env, docname, document):
+        # type: (BuildEnvironment, unicode, nodes.Node) -> None
+        for node in document.traverse(addnodes.pending_xref):
+            if node.get('refdomain') == 'gauss' or node.get('reftype') == 'any':
+                target = node['reftarget']
+                if target[-2:] == '()':
+                    target = target[:-2]
+                if target:
+                    self.note_xref(target, docname)
+
+    def get_outdated_xrefs(self):
+        # type: () -> Set[unicode]
+        """Return the documents referring to a name whose object or module
+        entry was added, removed or changed since the last call.
+
+        Every name a reference to "target" can resolve to is either "target"
+        itself or ends with ".target", so only the dotted suffixes of the
+        changed names need to be looked up.
+        """
+        objects = self.data['objects']
+        modules = self.data['modules']
+        changed = [name for name, entry in iteritems(self._previous_objects)
+                   if objects.get(name) != entry]
+        changed.extend(name for name, entry in iteritems(self._previous_modules)
+                       if modules.get(name) != entry)
+        self._previous_objects = {}
+        self._previous_modules = {}
+
+        xrefdeps = self.data['xrefdeps']
+        docids = set()  # type: Set[int]
+        for name in changed:
+            parts = name.split('.')
+            for i in range(len(parts)):
+                docids.update(xrefdeps.get('.'.join(parts[i:]), ()))
+        return set(self.data['docnames'][docid] for docid in docids)
 
     def merge_domaindata(self, docnames, otherdata):
         # type: (List[unicode], Dict) -> None
         # XXX check duplicates?
-        for fullname, (fn, objtype) in otherdata['objects'].items():
-            if fn in docnames:
-                self.data['objects'][fullname] = (fn, objtype)
-        for modname, data in otherdata['modules'].items():
-            if data[0] in docnames:
-                self.data['modules'][modname] = data
+        self._resolve_cache.clear()
+        # the other process may have numbered new documents differently
+        other_docids = dict((docname, docid) for docid, docname
+                            in enumerate(otherdata['docnames']))
+        other_objtypes = otherdata['objtypes']
+        for docname in docnames:
+            docid = other_docids.get(docname)
+            if docid is None:
+                continue
+            for fullname in otherdata['docobjects'].get(docid, ()):
+                code = otherdata['objects'][fullname]
+                if code >> 8 == docid:
+                    self.note_object(fullname, other_objtypes[code & 0xff],
+                                     docname)
+            for modname in otherdata['docmodules'].get(docid, ()):
+                data = otherdata['modules'][modname]
+                if data[0] == docid:
+                    self.note_module(modname, (docname,) + tuple(data[1:]))
+            for target in otherdata['docxrefs'].get(docid, ()):
+                self.note_xref(target, docname)
 
     def find_obj(self, env, modname, classname, name, type, searchmode=0):
         # type: (BuildEnvironment, unicode, unicode, unicode, unicode, int) -> List[Tuple[unicode, Any]]  # NOQA
@@ -837,22 +1122,29 @@ class GAUSSDomain(Domain):
             else:
                 objtypes = self.objtypes_for_role(type)
             if objtypes is not None:
+                # compare interned type ids rather than decoding every entry
+                typeids = set(self._typeids[objtype] for objtype in objtypes
+                              if objtype in self._typeids)
                 if modname and classname:
                     fullname = modname + '.' + classname + '.' + name
-                    if fullname in objects and objects[fullname][1] in objtypes:
+                    if fullname in objects and objects[fullname] & 0xff in typeids:
                         newname = fullname
                 if not newname:
                     if modname and modname + '.' + name in objects and \
-                       objects[modname + '.' + name][1] in objtypes:
+                       objects[modname + '.' + name] & 0xff in typeids:
                         newname = modname + '.' + name
-                    elif name in objects and objects[name][1] in objtypes:
+                    elif name in objects and objects[name] & 0xff in typeids:
                         newname = name
                     else:
-                        # "fuzzy" searching mode
+                        # "fuzzy" searching mode; only names sharing the last
+                        # component can end with ".name"
                         searchname = '.' + name
-                        matches = [(oname, objects[oname]) for oname in objects
+                        candidates = self._get_shortnames().get(
+                            name.rpartition('.')[2], ())
+                        matches = [(oname, self.get_object(oname))
+                                   for oname in sorted(candidates)
                                    if oname.endswith(searchname) and
-                                   objects[oname][1] in objtypes]
+                                   objects[oname] & 0xff in typeids]
         else:
             # NOTE: searching for exact match, object type is not considered
             if name in objects:
@@ -876,30 +1168,49 @@ class GAUSSDomain(Domain):
                     'object.' + name in objects:
                 newname = 'object.' + name
         if newname is not None:
-            matches.append((newname, objects[newname]))
+            matches.append((newname, self.get_object(newname)))
         return matches
 
+    def find_obj_cached(self, env, modname, classname, name, type,
+                        searchmode=0):
+        # type: (BuildEnvironment, unicode, unicode, unicode, unicode, int) -> Tuple[Tuple[unicode, unicode, unicode], ...]  # NOQA
+        """Like :meth:`find_obj`, but memoized for the rest of the build and
+        returning (fullname, docname, objtype) tuples.
+        """
+        key = (modname, classname, name, type, searchmode)
+        try:
+            result = self._resolve_cache[key]
+        except KeyError:
+            self.resolve_cache_misses += 1
+            result = tuple((fullname, obj[0], obj[1]) for fullname, obj in
+                           self.find_obj(env, modname, classname, name, type,
+                                         searchmode))
+            self._resolve_cache[key] = result
+        else:
+            self.resolve_cache_hits += 1
+        return result
+
     def resolve_xref(self, env, fromdocname, builder,
                      type, target, node, contnode):
         # type: (BuildEnvironment, unicode, Builder, unicode, unicode, nodes.Node, nodes.Node) -> nodes.Node  # NOQA
         modname = node.get('py:module')
         clsname = node.get('py:class')
         searchmode = node.hasattr('refspecific') and 1 or 0
-        matches = self.find_obj(env, modname, clsname, target,
-                                type, searchmode)
+        matches = self.find_obj_cached(env, modname, clsname, target,
+                                       type, searchmode)
         if not matches:
             return None
         elif len(matches) > 1:
             logger.warning(__('more than one target found for cross-reference %r: %s'),
                            target, ', '.join(match[0] for match in matches),
                            type='ref', subtype='python', location=node)
-        name, obj = matches[0]
+        name, docname, objtype = matches[0]
 
-        if obj[1] == 'module':
+        if objtype == 'module':
             return self._make_module_refnode(builder, fromdocname, name,
                                              contnode)
         else:
-            return make_refnode(builder, fromdocname, obj[0], name,
+            return make_refnode(builder, fromdocname, docname, name,
                                 contnode, name)
 
     def resolve_any_xref(self, env, fromdocname, builder, target,
@@ -910,22 +1221,28 @@ class GAUSSDomain(Domain):
         results = []  # type: List[Tuple[unicode, nodes.Node]]
 
         # always search in "refspecific" mode with the :any: role
-        matches = self.find_obj(env, modname, clsname, target, None, 1)
-        for name, obj in matches:
-            if obj[1] == 'module':
+        matches = self.find_obj_cached(env, modname, clsname, target, None, 1)
+        for name, docname, objtype in matches:
+            if objtype == 'module':
                 results.append(('py:mod',
                                 self._make_module_refnode(builder, fromdocname,
                                                           name, contnode)))
             else:
-                results.append(('py:' + self.role_for_objtype(obj[1]),
-                                make_refnode(builder, fromdocname, obj[0], name,
+                results.append(('py:' + self.role_for_objtype(objtype),
+                                make_refnode(builder, fromdocname, docname, name,
                                              contnode, name)))
         return results
 
     def _make_module_refnode(self, builder, fromdocname, name, contnode):
         # type: (Builder, unicode, unicode, nodes.Node) -> nodes.Node
+        docname, targetid, title = self._get_module_target(name)
+        return make_refnode(builder, fromdocname, docname,
+                            targetid, contnode, title)
+
+    def _get_module_target(self, name):
+        # type: (unicode) -> Tuple[unicode, unicode, unicode]
         # get additional info for modules
-        docname, synopsis, platform, deprecated = self.data['modules'][name]
+        docname, synopsis, platform, deprecated = self.get_module(name)
         title = name
         if synopsis:
             title += ': ' + synopsis
@@ -933,16 +1250,19 @@ class GAUSSDomain(Domain):
             title += _(' (deprecated)')
         if platform:
             title += ' (' + platform + ')'
-        return make_refnode(builder, fromdocname, docname,
-                            'module-' + name, contnode, title)
+        return docname, 'module-' + name, title
 
     def get_objects(self):
         # type: () -> Iterator[Tuple[unicode, unicode, unicode, unicode, unicode, int]]
+        docnames = self.data['docnames']
+        objtypes = self.data['objtypes']
         for modname, info in iteritems(self.data['modules']):
-            yield (modname, modname, 'module', info[0], 'module-' + modname, 0)
-        for refname, (docname, type) in iteritems(self.data['objects']):
+            yield (modname, modname, 'module', docnames[info[0]],
+                   'module-' + modname, 0)
+        for refname, code in iteritems(self.data['objects']):
+            type = objtypes[code & 0xff]
             if type != 'module':  # modules are already handled
-                yield (refname, refname, type, docname, refname, 1)
+                yield (refname, refname, type, docnames[code >> 8], refname, 1)
 
     def get_full_qualified_name(self, node):
         # type: (nodes.Node) -> unicode
@@ -955,15 +1275,141 @@ class GAUSSDomain(Domain):
             return '.'.join(filter(None, [modname, clsname, target]))
 
 
+class GAUSSReferenceResolver(SphinxTransform):
+    """Resolve the ``gauss`` cross-references of a document in one pass.
+
+    References that share a target and context are looked up once and the
+    link is applied to every one of them.  References left unresolved, and
+    those of the ``any`` role, are handled by Sphinx's ReferencesResolver.
+    """
+
+    # run before sphinx.transforms.post_transforms.ReferencesResolver
+    default_priority = 5
+
+    def apply(self):
+        # type: () -> None
+        domain = self.env.get_domain('gauss')
+        builder = self.app.builder
+        pending = {}  # type: Dict[Tuple, List[addnodes.pending_xref]]
+        for node in self.document.traverse(addnodes.pending_xref):
+            if node.get('refdomain') != 'gauss':
+                continue
+            key = (node.get('refdoc', self.env.docname), node['reftype'],
+                   node['reftarget'], node.get('py:module'),
+                   node.get('py:class'), node.hasattr('refspecific') and 1 or 0)
+            pending.setdefault(key, []).append(node)
+
+        for key, refnodes in iteritems(pending):
+            refdoc, type, target, modname, clsname, searchmode = key
+            matches = domain.find_obj_cached(self.env, modname, clsname,
+                                             target, type, searchmode)
+            if not matches:
+                continue
+            elif len(matches) > 1:
+                for node in refnodes:
+                    logger.warning(__('more than one target found for '
+                                      'cross-reference %r: %s'),
+                                   target, ', '.join(match[0] for match in matches),
+                                   type='ref', subtype='python', location=node)
+            name, docname, objtype = matches[0]
+
+            if objtype == 'module':
+                docname, targetid, title = domain._get_module_target(name)
+            else:
+                targetid = title = name
+            attributes = {'internal': True, 'reftitle': title}
+            if refdoc == docname:
+                attributes['refid'] = targetid
+            else:
+                try:
+                    attributes['refuri'] = (builder.get_relative_uri(refdoc, docname) +
+                                            '#' + targetid)
+                except NoUri:
+                    attributes = None
+
+            # the pending nodes are discarded, so their content is moved into
+            # the new references instead of being copied
+            for node in refnodes:
+                if attributes is None:
+                    node.replace_self(node[0])
+                else:
+                    newnode = nodes.reference('', '', **attributes)
+                    newnode.append(node[0])
+                    node.replace_self(newnode)
+
+
+def _upgrade_data_v3(data):
+    # type: (Dict) -> None
+    """Convert version 3 domain data, which spelled out docnames and objtypes
+    in every entry, to the interned version 4 layout in place.
+    """
+    docnames = []   # type: List[unicode]
+    objtypes = []   # type: List[unicode]
+    docids = {}     # type: Dict[unicode, int]
+    typeids = {}    # type: Dict[unicode, int]
+
+    def docid(docname):
+        if docname not in docids:
+            docids[docname] = len(docnames)
+            docnames.append(docname)
+        return docids[docname]
+
+    def typeid(objtype):
+        if objtype not in typeids:
+            typeids[objtype] = len(objtypes)
+            objtypes.append(objtype)
+        return typeids[objtype]
+
+    data['objects'] = dict((name, docid(docname) << 8 | typeid(objtype))
+                           for name, (docname, objtype)
+                           in iteritems(data['objects']))
+    data['modules'] = dict((modname, (docid(info[0]),) + tuple(info[1:]))
+                           for modname, info in iteritems(data['modules']))
+    for key in ('docobjects', 'docmodules', 'docxrefs'):
+        data[key] = dict((docid(docname), names)
+                         for docname, names in iteritems(data[key]))
+    data['xrefdeps'] = dict((target, set(docid(docname) for docname in refs))
+                            for target, refs in iteritems(data['xrefdeps']))
+    data.pop('shortnames', None)
+    data['docnames'] = docnames
+    data['objtypes'] = objtypes
+    data['version'] = 4
+
+
+def report_resolve_cache(app, exception):
+    # type: (Sphinx, Exception) -> None
+    domain = app.env.get_domain('gauss')
+    lookups = domain.resolve_cache_hits + domain.resolve_cache_misses
+    if lookups:
+        logger.info(__('gauss: %d cross-reference lookups, %d served from '
+                       'cache (%.0f%%)'),
+                    lookups, domain.resolve_cache_hits,
+                    100.0 * domain.resolve_cache_hits / lookups)
+
+
+def clear_signature_cache(app):
+    # type: (Sphinx) -> None
+    _signature_cache.clear()
+
+
+def get_updated_docs(app, env):
+    # type: (Sphinx, BuildEnvironment) -> List[unicode]
+    return sorted(env.get_domain('gauss').get_outdated_xrefs())
+
+
 def setup(app):
     # type: (Sphinx) -> Dict[unicode, Any]
     app.add_domain(GAUSSDomain)
     app.add_node(desc_returnlist)
     app.add_node(desc_return)
+    app.add_post_transform(GAUSSReferenceResolver)
+    app.connect('builder-inited', clear_signature_cache)
+    app.connect('env-get-updated', get_updated_docs)
+    app.connect('build-finished', report_resolve_cache)
 
     return {
         'version': 'builtin',
-        'env_version': 1,
+        'env_version': 5,
         'parallel_read_safe': True,
         'parallel_write_safe': True,
     }
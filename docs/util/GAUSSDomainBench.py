@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+    GAUSSDomainBench
+    ~~~~~~~~~~~~~~~~
+
+    Measures the size of the GAUSS domain data in the pickled environment
+    and the time to load it, for a synthetic reference set, in the layout
+    of ``data_version`` 3, which spelled out the docname and objtype of
+    every entry, and in the interned layout `GAUSSDomain` uses now::
+
+        python docs/util/GAUSSDomainBench.py --objects 20000 --docs 400
+
+    Loading the interned layout includes building the reverse tables of
+    `GAUSSDomain`; the version 3 layout needed none.
+"""
+
+import argparse
+import copy
+import gc
+import pickle
+import random
+import sys
+import time
+
+from GAUSSDomain import GAUSSDomain, _upgrade_data_v3
+
+if False:
+    # For type annotation
+    from typing import Any, Callable, Dict, List  # NOQA
+
+OBJTYPES = ['function'] * 8 + ['data', 'class', 'method', 'attribute']
+
+
+class Environment(object):
+    """What `GAUSSDomain` needs of a `BuildEnvironment`."""
+
+    def __init__(self, domaindata):
+        # type: (Dict[unicode, Any]) -> None
+        self.domaindata = domaindata
+
+
+def make_data(objects, docs, xrefs, seed=0):
+    # type: (int, int, int, int) -> Dict[unicode, Any]
+    """Return version 3 domain data of *objects* objects and *xrefs*
+    references spread over *docs* documents, a module per document.
+    """
+    rng = random.Random(seed)
+    docnames = ['reference/section%d/page%d' % (i % 20, i) for i in range(docs)]
+    data = {
+        'objects': {}, 'modules': {}, 'shortnames': {}, 'docobjects': {},
+        'docmodules': {}, 'xrefdeps': {}, 'docxrefs': {}, 'version': 3,
+    }  # type: Dict[unicode, Any]
+    for i, docname in enumerate(docnames):
+        modname = 'module%d' % i
+        data['modules'][modname] = (docname, 'Synopsis of %s.' % modname, '', False)
+        data['docmodules'][docname] = set([modname])
+    names = []
+    for i in range(objects):
+        docname = docnames[i % docs]
+        name = 'module%d.proc%dName' % (i % docs, i)
+        names.append(name)
+        data['objects'][name] = (docname, rng.choice(OBJTYPES))
+        data['shortnames'].setdefault(name.rpartition('.')[2], set()).add(name)
+        data['docobjects'].setdefault(docname, set()).add(name)
+    for i in range(xrefs):
+        docname = rng.choice(docnames)
+        target = rng.choice(names).rpartition('.')[2]
+        data['xrefdeps'].setdefault(target, set()).add(docname)
+        data['docxrefs'].setdefault(docname, set()).add(target)
+    return data
+
+
+def best_time(func, repeat):
+    # type: (Callable[[], Any], int) -> float
+    best = None
+    for i in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv=None):
+    # type: (List[unicode]) -> int
+    parser = argparse.ArgumentParser(description='Benchmark the GAUSS domain data.')
+    parser.add_argument('--objects', type=int, default=20000,
+                        help='number of objects (default: %(default)s)')
+    parser.add_argument('--docs', type=int, default=400,
+                        help='number of documents (default: %(default)s)')
+    parser.add_argument('--xrefs', type=int, default=20000,
+                        help='number of references (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=15,
+                        help='timing runs, the best counts (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    v3 = make_data(args.objects, args.docs, args.xrefs)
+    v4 = copy.deepcopy(v3)
+    _upgrade_data_v3(v4)
+    v4['version'] = GAUSSDomain.data_version
+
+    def load_v3():
+        pickle.loads(v3_pickle)
+
+    def load_v4():
+        GAUSSDomain(Environment({'gauss': pickle.loads(v4_pickle)}))
+
+    print('%d objects, %d documents, %d references, pickle protocol %d' %
+          (args.objects, args.docs, args.xrefs, pickle.DEFAULT_PROTOCOL))
+    print('%-22s %12s %10s' % ('layout', 'bytes', 'load ms'))
+    v3_pickle = pickle.dumps(v3, pickle.DEFAULT_PROTOCOL)
+    v4_pickle = pickle.dumps(v4, pickle.DEFAULT_PROTOCOL)
+    for name, data, load in [('version 3', v3_pickle, load_v3),
+                             ('interned', v4_pickle, load_v4)]:
+        print('%-22s %12d %10.1f' % (name, len(data), 1000 * best_time(load, args.repeat)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
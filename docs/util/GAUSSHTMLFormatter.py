@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+    GAUSSHTMLFormatter
+    ~~~~~~~~~~~~~~~~~~
+
+    An HTML formatter for highlighted code that emits a span only where the
+    stylesheet makes a difference.  Token types are compared by the CSS
+    rules ``_static/pygments.css`` gives their classes, so that
+
+    * tokens without a rule, such as ``Text``, get no span,
+    * adjacent tokens that look the same, such as the ``Operator`` and
+      ``Punctuation`` of ``x[1, 2]``, share one span, with the class of the
+      first,
+    * a token gets the class of its most general parent type that looks
+      the same, e.g. ``n`` rather than ``nx``,
+    * whitespace between tokens that look the same goes in their span, and
+      is left unstyled otherwise, unless its own rule has a background or
+      border.
+
+    Token types named in the ``keep`` option, such as ``Name.Function``,
+    always get a span of their own, with their own class.  Set
+    ``gauss_compact_highlighting = False`` to use the Pygments formatter
+    instead.
+"""
+
+import os
+import re
+
+from pygments.formatters import HtmlFormatter
+from pygments.token import Text, string_to_tokentype
+
+if False:
+    # For type annotation
+    from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Tuple  # NOQA
+    from pygments.token import _TokenType  # NOQA
+    from sphinx.application import Sphinx  # NOQA
+
+_rule_re = re.compile(r'([^{}]+)\{([^{}]*)\}')
+_comment_re = re.compile(r'/\*.*?\*/', re.S)
+
+# properties that show on whitespace
+_blank_properties = ('background', 'border', 'box-shadow', 'outline', 'text-decoration')
+
+# parsed style sheets, by their text
+_stylesheets = {}  # type: Dict[unicode, Tuple[Dict[unicode, Tuple], unicode]]
+# what token types look like, by style sheet, class prefix and kept types
+_looks = {}  # type: Dict[Tuple[unicode, unicode, FrozenSet], Dict[_TokenType, Tuple]]
+
+
+def parse_stylesheet(css, prefix='.highlight'):
+    # type: (unicode, unicode) -> Tuple[Dict[unicode, Tuple], unicode]
+    """Return the declarations of every ``prefix .class`` rule in *css*, by
+    class, and the color of the ``prefix`` background.
+    """
+    try:
+        return _stylesheets[css]
+    except KeyError:
+        pass
+    rules = {}  # type: Dict[unicode, Tuple]
+    background = None
+    for selectors, body in _rule_re.findall(_comment_re.sub('', css)):
+        declarations = []
+        for declaration in body.split(';'):
+            name, colon, value = declaration.partition(':')
+            if colon:
+                declarations.append((name.strip().lower(), ' '.join(value.split())))
+        for selector in selectors.split(','):
+            selector = selector.split()
+            if selector == [prefix]:
+                for name, value in declarations:
+                    if name in ('background', 'background-color'):
+                        background = value
+            elif (len(selector) == 2 and selector[0] == prefix and
+                  selector[1].startswith('.')):
+                rules[selector[1][1:]] = rules.get(selector[1][1:], ()) + tuple(declarations)
+    _stylesheets[css] = rules, background
+    return rules, background
+
+
+class GAUSSHTMLFormatter(HtmlFormatter):
+    """`HtmlFormatter` merging tokens by the CSS rules of *stylesheet*, the
+    text of the style sheet the output is used with; by default, that of
+    the formatter's own style.  The tokens of the types named in *keep*
+    are not merged.
+    """
+
+    name = 'GAUSS HTML'
+    aliases = []  # type: List[unicode]
+
+    def __init__(self, **options):
+        # type: (Any) -> None
+        HtmlFormatter.__init__(self, **options)
+        stylesheet = options.get('stylesheet') or self.get_style_defs('.highlight')
+        self.rules, self.background = parse_stylesheet(stylesheet)
+        self.keep = frozenset(string_to_tokentype(name) for name in options.get('keep', ()))
+        # formatters are made for every block, so share what they work out
+        self._looks = _looks.setdefault((stylesheet, self.classprefix, self.keep), {})
+
+    def _look(self, ttype):
+        # type: (_TokenType) -> Tuple[Tuple, _TokenType, bool]
+        """Return the CSS declarations of *ttype*, its most general parent
+        type with the same ones and whether they show on whitespace.
+        """
+        try:
+            return self._looks[ttype]
+        except KeyError:
+            pass
+        prefix = len(self.classprefix)
+        declarations = ()  # type: Tuple
+        for cls in self._get_css_classes(ttype).split():
+            declarations += self.rules.get(cls[prefix:], ())
+        if ttype in self.keep:
+            # declarations no other type has
+            look = declarations + (('', ttype),), ttype, False
+        elif not declarations:
+            look = (), Text, False
+        else:
+            parent = ttype
+            while parent.parent is not None and self._look(parent.parent)[0] == declarations:
+                parent = parent.parent
+            color = dict(declarations).get('color')
+            blank = any(name.startswith(_blank_properties) and
+                        not (name.startswith('text-decoration') and color == self.background)
+                        for name, value in declarations)
+            look = declarations, parent, blank
+        self._looks[ttype] = look
+        return look
+
+    def _merge(self, tokensource):
+        # type: (Iterable[Tuple[_TokenType, unicode]]) -> Iterator[Tuple[_TokenType, unicode]]
+        looks = self._looks
+        current = ()        # type: Tuple
+        ttype = Text
+        values = []         # type: List[unicode]
+        blanks = []         # type: List[unicode]
+        for tokentype, value in tokensource:
+            declarations, parent, blank = looks.get(tokentype) or self._look(tokentype)
+            if not blank and not value.strip():
+                # whitespace goes with the tokens around it if they look
+                # the same, and is left unstyled otherwise
+                blanks.append(value)
+                continue
+            if declarations != current:
+                if values:
+                    yield ttype, ''.join(values)
+                    values = []
+                if blanks:
+                    yield Text, ''.join(blanks)
+                    blanks = []
+                current = declarations
+                ttype = parent
+            elif blanks:
+                values.extend(blanks)
+                blanks = []
+            values.append(value)
+        if values:
+            yield ttype, ''.join(values)
+        if blanks:
+            yield Text, ''.join(blanks)
+
+    def format_unencoded(self, tokensource, outfile):
+        # type: (Iterable[Tuple[_TokenType, unicode]], Any) -> None
+        HtmlFormatter.format_unencoded(self, self._merge(tokensource), outfile)
+
+
+def install_formatter(app):
+    # type: (Sphinx) -> None
+    highlighter = getattr(app.builder, 'highlighter', None)
+    if (not app.config.gauss_compact_highlighting or highlighter is None or
+            highlighter.dest != 'html'):
+        return
+
+    # the pygments.css of html_static_path replaces the one Sphinx writes
+    stylesheet = None
+    for path in reversed(app.config.html_static_path):
+        filename = os.path.join(app.confdir, path, 'pygments.css')
+        if os.path.isfile(filename):
+            with open(filename, encoding='utf-8') as f:
+                stylesheet = f.read()
+            break
+    if stylesheet is None:
+        stylesheet = highlighter.get_stylesheet()
+    highlighter.formatter = GAUSSHTMLFormatter
+    highlighter.formatter_args['stylesheet'] = stylesheet
+
+
+def setup(app):
+    # type: (Sphinx) -> Dict[unicode, Any]
+    app.add_config_value('gauss_compact_highlighting', True, 'html')
+    app.connect('builder-inited', install_formatter)
+
+    return {
+        'version': 'builtin',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
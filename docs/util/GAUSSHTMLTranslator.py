@@ -1,7 +1,11 @@
 from docutils import nodes
 from sphinx import addnodes
+from sphinx.highlighting import lexers
 from sphinx.writers.html import HTMLTranslator
 
+from GAUSSCallLinks import CallLinker, get_call_targets
+from GAUSSLexer import GAUSSLexer
+
 
 class desc_returnlist(nodes.Part, nodes.Inline, nodes.FixedTextElement):
     """Node for a general parameter list."""
@@ -20,10 +24,40 @@ class GAUSSHTMLTranslator(HTMLTranslator):
     def __init__(self, *args):
         super().__init__(*args)
         self.multiple_returns = False
+        self.call_linker = None
+        if getattr(self.builder.config, 'gauss_link_calls', False):
+            self.call_linker = CallLinker(self.builder, get_call_targets(self.builder.app))
 
     def unknown_visit(self, node):
         super().unknown_visit(node)
 
+    def visit_literal_block(self, node):
+        # type: (nodes.Node) -> None
+        # blocks highlighted ahead of time by GAUSSParallelHighlight
+        highlighted = node.get('gauss_highlighted')
+        if highlighted is None:
+            try:
+                return super().visit_literal_block(node)
+            except nodes.SkipNode:
+                self.body[-1] = self.link_calls(node, self.body[-1])
+                raise
+
+        lang = node.get('language', 'default')
+        starttag = self.starttag(node, 'div', suffix='',
+                                 CLASS='highlight-%s notranslate' % lang)
+        self.body.append(starttag + self.link_calls(node, highlighted) + '</div>\n')
+        raise nodes.SkipNode
+
+    def link_calls(self, node, highlighted):
+        # type: (nodes.Node, unicode) -> unicode
+        """Return the *highlighted* code of *node* with links on the procs
+        it calls, if it is GAUSS code.
+        """
+        if (self.call_linker is None or
+                not isinstance(lexers.get(node.get('language')), GAUSSLexer)):
+            return highlighted
+        return self.call_linker.link(highlighted)
+
     # def visit_desc_name(self, node):
     #     # type: (nodes.Element) -> None
     #     self.body.append(self.starttag(node, 'code', '', CLASS='descname'))
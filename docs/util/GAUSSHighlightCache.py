@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+"""
+    GAUSSHighlightCache
+    ~~~~~~~~~~~~~~~~~~~
+
+    Caches highlighted code blocks in an SQLite database, keyed by a hash of
+    the code, its language and options, the lexer and the Pygments style, so
+    that blocks that did not change are not highlighted again.  Keep the
+    database between CI runs to reuse it from one clean checkout to the
+    next::
+
+        gauss_highlight_cache = '.cache/gauss-highlight.db'
+        gauss_highlight_cache_size = 64 * 1024 * 1024
+
+    By default the database is kept with the doctrees.  At the end of a
+    build the entries used least recently are evicted until the cached
+    output fits in ``gauss_highlight_cache_size`` bytes, and the hit rate
+    is reported.
+
+    Only languages whose lexer cannot fail, such as ``gauss``, are cached.
+    Sphinx adds the ``raiseonerror`` filter to the other lexers, including
+    its own, and warns when they fail, so their blocks are always
+    highlighted again rather than losing the warning on a cache hit.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+
+import pygments
+from pygments.filters import RaiseOnErrorTokenFilter
+
+import sphinx
+from sphinx.highlighting import lexers
+from sphinx.locale import __
+from sphinx.util import logging
+from sphinx.util.console import bold  # type: ignore
+
+if False:
+    # For type annotation
+    from typing import Any, Dict, List, Set  # NOQA
+    from sphinx.application import Sphinx  # NOQA
+    from sphinx.highlighting import PygmentsBridge  # NOQA
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value INTEGER);
+CREATE TABLE entries (
+    key TEXT PRIMARY KEY,
+    html TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    used INTEGER NOT NULL
+);
+CREATE INDEX entries_used ON entries (used);
+INSERT INTO meta VALUES ('clock', 0);
+INSERT INTO meta VALUES ('hits', 0);
+INSERT INTO meta VALUES ('misses', 0);
+"""
+
+
+def connect(filename):
+    # type: (unicode) -> sqlite3.Connection
+    """Open the cache *filename*, creating it when it is missing or out of
+    date.
+    """
+    conn = sqlite3.connect(filename, timeout=60)
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+    except sqlite3.DatabaseError:
+        row = None
+    if row is None or row[0] != SCHEMA_VERSION:
+        conn.close()
+        if os.path.exists(filename):
+            os.remove(filename)
+        conn = sqlite3.connect(filename, timeout=60)
+        # parallel writers read while another one commits
+        conn.execute('PRAGMA journal_mode=WAL')
+        with conn:
+            conn.executescript(SCHEMA)
+            conn.execute("INSERT INTO meta VALUES ('schema', ?)", (SCHEMA_VERSION,))
+    # losing the last pages of a crashed build only costs a few misses
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+class HighlightCache(object):
+    """The cache as seen by one process of a build.
+
+    Lookups that hit and new entries are only recorded here, and written
+    to the database by `flush`, once per page.  Parallel writers fork
+    after the last flush of the main process, and each opens its own
+    connection.
+    """
+
+    def __init__(self, filename, clock):
+        # type: (unicode, int) -> None
+        self.filename = filename
+        self.clock = clock
+        self._conn = None   # type: sqlite3.Connection
+        self._pid = None    # type: int
+        self._reset()
+
+    def _reset(self):
+        # type: () -> None
+        self.hits = self.misses = 0
+        self.used = set()   # type: Set[unicode]
+        self.new = {}       # type: Dict[unicode, unicode]
+
+    @property
+    def conn(self):
+        # type: () -> sqlite3.Connection
+        if self._pid != os.getpid():
+            # in a forked writer, whatever the main process had recorded is
+            # its own to write
+            self._pid = os.getpid()
+            self._conn = None
+            self._reset()
+        if self._conn is None:
+            self._conn = connect(self.filename)
+        return self._conn
+
+    def get(self, key):
+        # type: (unicode) -> unicode
+        conn = self.conn
+        html = self.new.get(key)
+        if html is None:
+            row = conn.execute("SELECT html FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            html = row[0]
+            self.used.add(key)
+        self.hits += 1
+        return html
+
+    def put(self, key, html):
+        # type: (unicode, unicode) -> None
+        self.conn
+        self.new[key] = html
+        self.misses += 1
+
+    def flush(self):
+        # type: () -> None
+        """Write what was recorded since the last flush and close the
+        connection.
+        """
+        if self._conn is None or self._pid != os.getpid():
+            return
+        with self._conn as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                [(key, html, len(html.encode('utf-8')), self.clock)
+                 for key, html in self.new.items()])
+            conn.executemany("UPDATE entries SET used = ? WHERE key = ?",
+                             [(self.clock, key) for key in self.used])
+            conn.execute("UPDATE meta SET value = value + ? WHERE key = 'hits'",
+                         (self.hits,))
+            conn.execute("UPDATE meta SET value = value + ? WHERE key = 'misses'",
+                         (self.misses,))
+        self._conn.close()
+        self._conn = None
+        self._reset()
+
+
+class CachingHighlighter(object):
+    """Wraps the `PygmentsBridge` of a builder, looking blocks up in a
+    `HighlightCache` before highlighting them.
+    """
+
+    def __init__(self, highlighter, cache, stylename):
+        # type: (PygmentsBridge, HighlightCache, unicode) -> None
+        self.highlighter = highlighter
+        self.cache = cache
+        self.stylename = stylename
+        self._version = None       # type: List[unicode]
+        self._code_versions = {}   # type: Dict[type, unicode]
+
+    def __getattr__(self, name):
+        # type: (unicode) -> Any
+        return getattr(self.highlighter, name)
+
+    @property
+    def version(self):
+        # type: () -> List[unicode]
+        """What the output depends on besides the block and its lexer."""
+        if self._version is None:
+            # worked out on first use, once other extensions have set up
+            # the highlighter
+            highlighter = self.highlighter
+            args = dict(highlighter.formatter_args)
+            style = args.pop('style', None)
+            self._version = [highlighter.dest, self.stylename,
+                             getattr(style, '__module__', None),
+                             getattr(style, '__name__', None),
+                             highlighter.formatter.__module__,
+                             highlighter.formatter.__name__,
+                             self.code_version(highlighter.formatter),
+                             json.dumps(args, sort_keys=True, default=repr),
+                             pygments.__version__, sphinx.__version__]
+        return self._version
+
+    def code_version(self, cls):
+        # type: (type) -> unicode
+        """Return a hash of the module defining *cls*, unless it comes with
+        Pygments.
+        """
+        try:
+            return self._code_versions[cls]
+        except KeyError:
+            version = ''
+            filename = getattr(sys.modules.get(cls.__module__), '__file__', None)
+            if not cls.__module__.startswith('pygments.') and filename:
+                if filename.endswith(('.pyc', '.pyo')):
+                    filename = filename[:-1]
+                try:
+                    with open(filename, 'rb') as f:
+                        version = hashlib.sha1(f.read()).hexdigest()
+                except (IOError, OSError):
+                    pass
+            self._code_versions[cls] = version
+            return version
+
+    def cache_key(self, source, lang, opts=None, force=False, **kwargs):
+        # type: (unicode, unicode, Any, bool, Any) -> unicode
+        """Return the key of a block, or None if it is not to be cached."""
+        lexer = lexers.get(lang)
+        if lexer is None or any(isinstance(f, RaiseOnErrorTokenFilter)
+                                for f in lexer.filters):
+            return None
+        return hashlib.sha1(json.dumps(
+            [source, lang, opts, kwargs, force, self.code_version(type(lexer))] + self.version,
+            sort_keys=True, default=repr).encode('utf-8')).hexdigest()
+
+    def highlight_block(self, source, lang, opts=None, location=None, force=False,
+                        **kwargs):
+        # type: (unicode, unicode, Any, Any, bool, Any) -> unicode
+        key = self.cache_key(source, lang, opts, force, **kwargs)
+        html = None if key is None else self.cache.get(key)
+        if html is None:
+            html = self.highlighter.highlight_block(source, lang, opts=opts,
+                                                    location=location, force=force,
+                                                    **kwargs)
+            if key is not None:
+                self.cache.put(key, html)
+        return html
+
+
+def _get_filename(app):
+    # type: (Sphinx) -> unicode
+    if app.config.gauss_highlight_cache:
+        return os.path.join(app.confdir, app.config.gauss_highlight_cache)
+    return os.path.join(app.doctreedir, 'gauss-highlight.db')
+
+
+def install_cache(app):
+    # type: (Sphinx) -> None
+    app._gauss_highlight_cache = None
+    highlighter = getattr(app.builder, 'highlighter', None)
+    if highlighter is None or app.config.gauss_highlight_cache_size <= 0:
+        return
+
+    filename = _get_filename(app)
+    dirname = os.path.dirname(filename)
+    if dirname and not os.path.isdir(dirname):
+        os.makedirs(dirname)
+    conn = connect(filename)
+    try:
+        with conn:
+            # a new tick of the LRU clock, and counts for this build
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'clock'")
+            conn.execute("UPDATE meta SET value = 0 WHERE key IN ('hits', 'misses')")
+            clock = conn.execute("SELECT value FROM meta WHERE key = 'clock'").fetchone()[0]
+    finally:
+        conn.close()
+
+    cache = app._gauss_highlight_cache = HighlightCache(filename, clock)
+    app.builder.highlighter = CachingHighlighter(highlighter, cache,
+                                                 app.config.pygments_style)
+
+
+def flush_cache(app, *args):
+    # type: (Sphinx, Any) -> None
+    cache = getattr(app, '_gauss_highlight_cache', None)
+    if cache is not None:
+        cache.flush()
+
+
+def finish_cache(app, exception):
+    # type: (Sphinx, Exception) -> None
+    cache = getattr(app, '_gauss_highlight_cache', None)
+    if cache is None:
+        return
+    cache.flush()
+    app._gauss_highlight_cache = None
+    if exception is not None:
+        return
+
+    conn = connect(cache.filename)
+    try:
+        # drop the entries used least recently while the rest is too large
+        total = 0
+        stale = []
+        for key, size in conn.execute("SELECT key, size FROM entries "
+                                      "ORDER BY used DESC, size"):
+            total += size
+            if total > app.config.gauss_highlight_cache_size:
+                stale.append((key,))
+        if stale:
+            with conn:
+                conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+            conn.execute('VACUUM')
+
+        hits, misses = [conn.execute("SELECT value FROM meta WHERE key = ?",
+                                     (name,)).fetchone()[0]
+                        for name in ('hits', 'misses')]
+        count, size = conn.execute("SELECT COUNT(*), TOTAL(size) FROM entries").fetchone()
+    finally:
+        conn.close()
+
+    if hits + misses:
+        logger.info(bold(__('gauss highlight cache: ')) +
+                    __('%d of %d blocks cached (%.1f%%), %d entries, %.1f MB, %d evicted'),
+                    hits, hits + misses, 100.0 * hits / (hits + misses),
+                    count, size / 1048576.0, len(stale))
+
+
+def setup(app):
+    # type: (Sphinx) -> Dict[unicode, Any]
+    app.add_config_value('gauss_highlight_cache', None, '')
+    app.add_config_value('gauss_highlight_cache_size', 64 * 1024 * 1024, '')
+    app.connect('builder-inited', install_cache)
+    app.connect('html-page-context', flush_cache)
+    app.connect('build-finished', finish_cache)
+
+    return {
+        'version': 'builtin',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+    GAUSSInclude
+    ~~~~~~~~~~~~
+
+    The ``gauss-include`` directive, a ``literalinclude`` that can include
+    a single proc of a GAUSS source file, as ``:pyobject:`` does for
+    Python::
+
+        .. gauss-include:: ../src/gehttpdroutes.src
+           :proc: route
+           :lineno-match:
+
+    The proc runs from the line of its ``proc`` to the line of its
+    ``endp``.  Procs are found through the index `GAUSSAutodoc` keeps of
+    every file, built with `GAUSSLexer` once per version of the file, so
+    that commented-out procs are never included, and only the bytes of
+    the proc are read from the file.  The other options of
+    ``literalinclude`` work on the lines of the proc, and the language is
+    ``gauss`` unless ``:language:`` says otherwise.
+"""
+
+import mmap
+
+from docutils import nodes
+from six import text_type
+
+from sphinx.directives.code import LiteralInclude, LiteralIncludeReader, container_wrapper
+from sphinx.locale import __
+from sphinx.util import logging, parselinenos
+from sphinx.util.nodes import set_source_info
+
+from GAUSSAutodoc import get_cachefile, get_procs
+
+if False:
+    # For type annotation
+    from typing import Any, Dict, List  # NOQA
+    from sphinx.application import Sphinx  # NOQA
+    from sphinx.config import Config  # NOQA
+
+logger = logging.getLogger(__name__)
+
+
+class GAUSSIncludeReader(LiteralIncludeReader):
+    """`LiteralIncludeReader` reading only the lines of the ``:proc:``
+    option from the file, if it is given.
+    """
+
+    def __init__(self, filename, options, config, cachefile):
+        # type: (unicode, Dict, Config, unicode) -> None
+        super().__init__(filename, options, config)
+        self.cachefile = cachefile
+
+    def read_file(self, filename, location=None):
+        # type: (unicode, Any) -> List[unicode]
+        name = self.options.get('proc')
+        if not name:
+            return super().read_file(filename, location=location)
+
+        try:
+            procs = get_procs([filename], self.encoding, self.cachefile, 0)[filename]
+            for proc in procs:
+                if proc['name'] == name:
+                    break
+            else:
+                raise ValueError(__('Proc named %r not found in include file %r') %
+                                 (name, filename))
+            with open(filename, 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    text = data[proc['start']:proc['end']].decode(self.encoding)
+        except (IOError, OSError):
+            raise IOError(__('Include file %r not found or reading it failed') % filename)
+        except UnicodeError:
+            raise UnicodeError(__('Encoding %r used for reading included file %r seems to '
+                                  'be wrong, try giving an :encoding: option') %
+                               (self.encoding, filename))
+
+        if 'lineno-match' in self.options:
+            self.lineno_start = proc['line']
+        # the newlines of a file read as text, as literalinclude reads it
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+        if 'tab-width' in self.options:
+            text = text.expandtabs(self.options['tab-width'])
+        return text.splitlines(True)
+
+
+class GAUSSInclude(LiteralInclude):
+    """`LiteralInclude` with a ``:proc:`` option instead of ``:pyobject:``
+    and ``:diff:``.
+    """
+
+    option_spec = dict(LiteralInclude.option_spec, proc=str)
+    del option_spec['pyobject'], option_spec['diff']
+
+    def run(self):
+        # type: () -> List[nodes.Node]
+        document = self.state.document
+        if not document.settings.file_insertion_enabled:
+            return [document.reporter.warning('File insertion disabled',
+                                              line=self.lineno)]
+        try:
+            location = self.state_machine.get_source_and_line(self.lineno)
+            rel_filename, filename = self.env.relfn2path(self.arguments[0])
+            self.env.note_dependency(rel_filename)
+
+            reader = GAUSSIncludeReader(filename, self.options, self.config,
+                                        get_cachefile(self.env.app))
+            text, lines = reader.read(location=location)
+
+            retnode = nodes.literal_block(text, text, source=filename)
+            set_source_info(self, retnode)
+            retnode['language'] = self.options.get('language', 'gauss')
+            retnode['linenos'] = ('linenos' in self.options or
+                                  'lineno-start' in self.options or
+                                  'lineno-match' in self.options)
+            retnode['classes'] += self.options.get('class', [])
+            extra_args = retnode['highlight_args'] = {}
+            if 'emphasize-lines' in self.options:
+                hl_lines = parselinenos(self.options['emphasize-lines'], lines)
+                if any(i >= lines for i in hl_lines):
+                    logger.warning(__('line number spec is out of range(1-%d): %r') %
+                                   (lines, self.options['emphasize-lines']),
+                                   location=location)
+                extra_args['hl_lines'] = [x + 1 for x in hl_lines if x < lines]
+            extra_args['linenostart'] = reader.lineno_start
+
+            if 'caption' in self.options:
+                caption = self.options['caption'] or self.arguments[0]
+                retnode = container_wrapper(self, retnode, caption)
+
+            self.add_name(retnode)
+
+            return [retnode]
+        except Exception as exc:
+            return [document.reporter.warning(text_type(exc), line=self.lineno)]
+
+
+def setup(app):
+    # type: (Sphinx) -> Dict[unicode, Any]
+    app.add_directive('gauss-include', GAUSSInclude)
+
+    return {
+        'version': 'builtin',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+    GAUSSInventory
+    ~~~~~~~~~~~~~~
+
+    Resolves ``gauss`` references that are not documented locally against
+    the ``objects.inv`` inventories of other GAUSS documentation sets, such
+    as the GAUSS language reference::
+
+        gauss_inventories = {
+            'gauss': ('https://docs.aptech.com/gauss/', 'inv/gauss.inv'),
+        }
+
+    The first time an inventory is used it is converted to a binary index,
+    sorted by name and stored next to the doctrees.  Later builds memory-map
+    that index and binary-search it, so nothing is decompressed or parsed
+    until the inventory file itself changes.  The pages with ``gauss``
+    references are then written again, for links to what it added, moved
+    or removed.
+"""
+
+import mmap
+import os
+import posixpath
+import struct
+
+from docutils import nodes
+from docutils.utils import relative_path
+from six import iteritems
+
+from sphinx.locale import _, __
+from sphinx.util import logging
+from sphinx.util.inventory import InventoryFile
+
+if False:
+    # For type annotation
+    from typing import Any, Dict, List, Tuple  # NOQA
+    from sphinx.application import Sphinx  # NOQA
+    from sphinx.environment import BuildEnvironment  # NOQA
+
+logger = logging.getLogger(__name__)
+
+
+class GAUSSInventory(object):
+    """A sorted, memory-mapped index of the ``gauss`` entries of one
+    inventory.
+
+    The index file holds a header, the project and version, a table of
+    record offsets in name order and the records themselves, each
+    ``name\\0objtype\\0location\\0dispname\\0`` in UTF-8.
+    """
+
+    magic = b'GAUSSIX1'
+    # magic, source mtime, source size, record count, offset table position
+    header = struct.Struct('<8sQQII')
+    offset = struct.Struct('<I')
+
+    def __init__(self, filename):
+        # type: (unicode) -> None
+        self._file = open(filename, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.source_mtime, self.source_size,
+         self.count, self._table) = self.header.unpack_from(self._map, 0)
+        if magic != self.magic:
+            self.close()
+            raise ValueError('%s is not a GAUSS inventory index' % filename)
+        self.project, self.version = self._strings(self.header.size, 2)
+
+    @classmethod
+    def build(cls, invfile, filename):
+        # type: (unicode, unicode) -> None
+        """Convert the inventory *invfile* into the index *filename*."""
+        with open(invfile, 'rb') as f:
+            inventory = InventoryFile.load(f, '', posixpath.join)
+        project = version = ''
+        entries = []  # type: List[Tuple[bytes, bytes, bytes, bytes]]
+        for type, objects in iteritems(inventory):
+            if not type.startswith('gauss:'):
+                continue
+            for name, (project, version, location, dispname) in iteritems(objects):
+                entries.append((name.encode('utf-8'),
+                                type[6:].encode('utf-8'),
+                                location.encode('utf-8'),
+                                dispname.encode('utf-8')))
+        entries.sort()
+
+        strings = project.encode('utf-8') + b'\0' + version.encode('utf-8') + b'\0'
+        table = cls.header.size + len(strings)
+        position = table + cls.offset.size * len(entries)
+        offsets = []
+        records = []
+        for entry in entries:
+            record = b'\0'.join(entry) + b'\0'
+            offsets.append(cls.offset.pack(position))
+            records.append(record)
+            position += len(record)
+
+        stat = os.stat(invfile)
+        tmpname = filename + '.tmp'
+        with open(tmpname, 'wb') as f:
+            f.write(cls.header.pack(cls.magic, stat.st_mtime_ns,
+                                    stat.st_size, len(entries), table))
+            f.write(strings)
+            f.write(b''.join(offsets))
+            f.write(b''.join(records))
+        os.replace(tmpname, filename)
+
+    def close(self):
+        # type: () -> None
+        self._map.close()
+        self._file.close()
+
+    def is_current(self, invfile):
+        # type: (unicode) -> bool
+        """Return whether the index still matches the inventory *invfile*."""
+        stat = os.stat(invfile)
+        return (self.source_mtime == stat.st_mtime_ns and
+                self.source_size == stat.st_size)
+
+    def _strings(self, position, count):
+        # type: (int, int) -> List[unicode]
+        strings = []
+        for i in range(count):
+            end = self._map.find(b'\0', position)
+            strings.append(self._map[position:end].decode('utf-8'))
+            position = end + 1
+        return strings
+
+    def _name_at(self, index):
+        # type: (int) -> bytes
+        position = self.offset.unpack_from(self._map, self._table +
+                                           index * self.offset.size)[0]
+        return self._map[position:self._map.find(b'\0', position)]
+
+    def lookup(self, name):
+        # type: (unicode) -> List[Tuple[unicode, unicode, unicode]]
+        """Return (objtype, location, dispname) for every entry *name*."""
+        key = name.encode('utf-8')
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._name_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        results = []
+        while lo < self.count and self._name_at(lo) == key:
+            position = self.offset.unpack_from(self._map, self._table +
+                                               lo * self.offset.size)[0]
+            results.append(tuple(self._strings(position + len(key) + 1, 3)))
+            lo += 1
+        return results
+
+
+def load_inventories(app):
+    # type: (Sphinx) -> List[Tuple[unicode, GAUSSInventory]]
+    """Return (base URI, index) for every configured inventory, building
+    indexes that are missing or out of date.
+    """
+    if getattr(app, '_gauss_inventories', None) is not None:
+        return app._gauss_inventories
+
+    app._gauss_inventories = []
+    app._gauss_inventories_changed = False
+    for name, (uri, invfile) in sorted(iteritems(app.config.gauss_inventories)):
+        invfile = os.path.join(app.confdir, invfile)
+        filename = os.path.join(app.doctreedir, 'gaussinv-%s.idx' % name)
+        try:
+            try:
+                inventory = GAUSSInventory(filename)
+                if not inventory.is_current(invfile):
+                    inventory.close()
+                    inventory = None
+            except (IOError, OSError, ValueError, struct.error):
+                inventory = None
+            if inventory is None:
+                app._gauss_inventories_changed = True
+                if not os.path.isdir(app.doctreedir):
+                    os.makedirs(app.doctreedir)
+                GAUSSInventory.build(invfile, filename)
+                inventory = GAUSSInventory(filename)
+        except Exception as exc:
+            logger.warning(__('failed to load GAUSS inventory %r from %s: %s'),
+                           name, invfile, exc)
+            continue
+        app._gauss_inventories.append((uri, inventory))
+    return app._gauss_inventories
+
+
+def missing_reference(app, env, node, contnode):
+    # type: (Sphinx, BuildEnvironment, nodes.Node, nodes.Node) -> nodes.Node
+    """Resolve a ``gauss`` or ``any`` reference through the inventories."""
+    if node['reftype'] == 'any':
+        objtypes = None
+    elif node.get('refdomain') == 'gauss':
+        objtypes = env.get_domain('gauss').objtypes_for_role(node['reftype'])
+        if not objtypes:
+            return None
+    else:
+        return None
+
+    target = node['reftarget']
+    to_try = [target]
+    fullname = env.get_domain('gauss').get_full_qualified_name(node)
+    if fullname and fullname != target:
+        to_try.append(fullname)
+
+    for baseuri, inventory in load_inventories(app):
+        for name in to_try:
+            for objtype, location, dispname in inventory.lookup(name):
+                if objtypes is not None and objtype not in objtypes:
+                    continue
+                uri = posixpath.join(baseuri, location)
+                if '://' not in uri and node.get('refdoc'):
+                    # get correct path in case of subdirectories
+                    uri = posixpath.join(relative_path(node['refdoc'], '.'), uri)
+                if inventory.version:
+                    reftitle = _('(in %s v%s)') % (inventory.project,
+                                                    inventory.version)
+                else:
+                    reftitle = _('(in %s)') % (inventory.project,)
+                newnode = nodes.reference('', '', internal=False, refuri=uri,
+                                          reftitle=reftitle)
+                newnode.append(contnode)
+                return newnode
+    return None
+
+
+def get_updated_docs(app, env):
+    # type: (Sphinx, BuildEnvironment) -> List[unicode]
+    """Return the documents with ``gauss`` references if an inventory
+    changed since the last build.
+    """
+    load_inventories(app)
+    if not app._gauss_inventories_changed:
+        return []
+    data = env.get_domain('gauss').data
+    return sorted(data['docnames'][docid] for docid, targets
+                  in iteritems(data['docxrefs']) if targets)
+
+
+def close_inventories(app, exception):
+    # type: (Sphinx, Exception) -> None
+    for uri, inventory in getattr(app, '_gauss_inventories', None) or []:
+        inventory.close()
+    app._gauss_inventories = None
+
+
+def setup(app):
+    # type: (Sphinx) -> Dict[unicode, Any]
+    app.add_config_value('gauss_inventories', {}, 'env')
+    app.connect('env-get-updated', get_updated_docs)
+    app.connect('missing-reference', missing_reference)
+    app.connect('build-finished', close_inventories)
+
+    return {
+        'version': 'builtin',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
@@ -9,18 +9,154 @@
     :license: BSD, see LICENSE for details.
 """
 
+import codecs
 import re
+from itertools import accumulate, chain
 
+from pygments.filter import apply_filters
 from pygments.lexer import Lexer, RegexLexer, bygroups, words, do_insertions, \
     using, default, this, include
+from pygments.regexopt import regex_opt
 from pygments.token import Text, Comment, Operator, Keyword, Name, String, \
-    Number, Punctuation, Generic, Whitespace, Literal, Error
+    Number, Punctuation, Generic, Whitespace, Literal, Error, _TokenType
 
 
-__all__ = ['GAUSSLexer']
+__all__ = ['GAUSSLexer', 'IncrementalGAUSSLexer']
 
 
-class GAUSSLexer(RegexLexer):
+class CombinedRegexLexer(RegexLexer):
+    """
+    A RegexLexer that tries the rules of a state with a single regular
+    expression instead of one match call per rule.
+
+    Each state is compiled into one alternation of its rules, in order, so
+    the first rule that matches wins exactly as before.  Every alternative
+    ends in an empty group whose number identifies the rule; it is placed
+    last so that an alternative still starts with the rule's own first
+    character test, which lets the regex engine skip it cheaply.  Rules
+    with callbacks and groups are matched again on their own to give the
+    callback the groups it expects; callbacks of rules without groups get
+    the match of the combined expression.  The token stream is the same as
+    RegexLexer's.
+    """
+
+    @classmethod
+    def _combine_states(cls):
+        combined = {}
+        for state, statetokens in cls._tokens.items():
+            patterns = []
+            rules = [None]
+            for rexmatch, action, new_state in statetokens:
+                regex = rexmatch.__self__
+                patterns.append('(?:%s)()' % regex.pattern)
+                rules.extend([None] * regex.groups)
+                rules.append((rexmatch if regex.groups else None, action, new_state))
+            combined[state] = (re.compile('|'.join(patterns), cls.flags).match,
+                               rules)
+        cls._combined = combined
+        return combined
+
+    @staticmethod
+    def _change_state(statestack, new_state):
+        """Apply the state transition ``new_state`` of a rule to ``statestack``."""
+        if isinstance(new_state, tuple):
+            for state in new_state:
+                if state == '#pop':
+                    if len(statestack) > 1:
+                        statestack.pop()
+                elif state == '#push':
+                    statestack.append(statestack[-1])
+                else:
+                    statestack.append(state)
+        elif isinstance(new_state, int):
+            # pop, but keep at least one state on the stack
+            if abs(new_state) >= len(statestack):
+                del statestack[1:]
+            else:
+                del statestack[new_state:]
+        elif new_state == '#push':
+            statestack.append(statestack[-1])
+        else:
+            assert False, "wrong state def: %r" % new_state
+
+    def get_tokens_unprocessed(self, text, stack=('root',)):
+        """
+        Split ``text`` into (tokentype, text) pairs.
+
+        ``stack`` is the initial stack (default: ``['root']``)
+        """
+        combined = self.__class__.__dict__.get('_combined') or self._combine_states()
+        pos = 0
+        statestack = list(stack)
+        master, rules = combined[statestack[-1]]
+        while 1:
+            m = master(text, pos)
+            if m:
+                rexmatch, action, new_state = rules[m.lastindex]
+                if action is not None:
+                    if type(action) is _TokenType:
+                        yield pos, action, m.group()
+                    else:
+                        yield from action(self, rexmatch(text, pos) if rexmatch else m)
+                pos = m.end()
+                if new_state is not None:
+                    self._change_state(statestack, new_state)
+                    master, rules = combined[statestack[-1]]
+            else:
+                # no rule matched
+                try:
+                    if text[pos] == '\n':
+                        # at EOL, reset state to "root"
+                        statestack = ['root']
+                        master, rules = combined['root']
+                        yield pos, Whitespace, '\n'
+                        pos += 1
+                        continue
+                    yield pos, Error, text[pos]
+                    pos += 1
+                except IndexError:
+                    break
+
+    def _get_matches(self, text, statestack, tokens):
+        """
+        Like `get_tokens_unprocessed`, but append the (index, tokentype,
+        value) items to ``tokens`` and yield the end of each match.
+        ``statestack`` is updated in place; when the end of a match is
+        yielded it holds the state the next match starts in.
+        """
+        combined = self.__class__.__dict__.get('_combined') or self._combine_states()
+        pos = 0
+        master, rules = combined[statestack[-1]]
+        while 1:
+            m = master(text, pos)
+            if m:
+                rexmatch, action, new_state = rules[m.lastindex]
+                if action is not None:
+                    if type(action) is _TokenType:
+                        tokens.append((pos, action, m.group()))
+                    else:
+                        tokens.extend(action(self, rexmatch(text, pos) if rexmatch else m))
+                pos = m.end()
+                if new_state is not None:
+                    self._change_state(statestack, new_state)
+                    master, rules = combined[statestack[-1]]
+                yield pos
+            elif pos < len(text):
+                # no rule matched
+                if text[pos] == '\n':
+                    # at EOL, reset state to "root"
+                    statestack[:] = ['root']
+                    master, rules = combined['root']
+                    tokens.append((pos, Whitespace, '\n'))
+                else:
+                    tokens.append((pos, Error, text[pos]))
+                pos += 1
+                yield pos
+            else:
+                break
+
+
+class GAUSSLexer(CombinedRegexLexer):
     """
     For GAUSS source code.
     .. versionadded:: 0.10
@@ -144,6 +280,72 @@ class GAUSSLexer(RegexLexer):
                "DB_POSITIONAL_PLACEHOLDERS", "DB_PREPARED_QUERIES", "DB_QUERY_SIZE", "DB_SIMPLE_LOCKING", "DB_SYSTEM_TABLES", "DB_TABLES",
                "DB_TRANSACTIONS", "DB_UNICODE", "DB_VIEWS", "__STDIN", "__STDOUT", "__STDERR")
 
+    # Identifiers are matched once and classified by looking them up here
+    # (lowercased, since GAUSS is case insensitive) instead of trying an
+    # alternation of every name at each identifier.  Later tables win, which
+    # keeps the precedence of the old words() rules: literal, keyword,
+    # declaration, built-in.
+    _identifier_types = dict(
+        [(name.lower(), Name.Builtin) for name in built_in] +
+        [(name.lower(), Keyword.Declaration) for name in declaration] +
+        [(name.lower(), Keyword) for name in keyword] +
+        [(name.lower(), Literal) for name in literal] +
+        [(name, Operator.Word) for name in ('and', 'or', 'xor', 'not', 'eq', 'eqv',
+                                            'ne', 'ge', 'le', 'gt', 'lt')])
+
+    def _identifier(lexer, match):
+        name = match.group()
+        yield match.start(), lexer._identifier_types.get(name.lower(), Name), name
+
+    def _called_identifier(lexer, match):
+        name, space, paren = match.groups()
+        ttype = lexer._identifier_types.get(name.lower(), Name.Function)
+        yield match.start(1), ttype, name
+        if space:
+            # keywords and the like are followed by ordinary whitespace
+            yield match.start(2), (Whitespace if ttype in (Name.Function, Name.Builtin)
+                                   else Text), space
+        yield match.start(3), Punctuation, paren
+
+    def _label(lexer, match):
+        space, name, colon = match.groups()
+        if space:
+            yield match.start(1), Whitespace, space
+        ttype = lexer._identifier_types.get(name.lower(), Name.Label)
+        yield match.start(2), Name.Label if ttype is Name.Builtin else ttype, name
+        yield match.start(3), Punctuation, colon
+
+    def _comment_lines(lexer, match):
+        # one token per line, as the .*?\n rule of 'if0' would give
+        pos = match.start()
+        for line in match.group().split('\n')[:-1]:
+            yield pos, Comment, line + '\n'
+            pos += len(line) + 1
+
+    #: a number as the Number.Float rules below match it, ending where they
+    #: would end it
+    _number_re = r'-?(?:\d+(?:\.\d*)?|\.\d+)(?:e[-+]?\d+)?(?![\w.])'
+
+    #: a run of at least eight numbers and the separators between them, as
+    #: in matrix literals and pasted data
+    _number_run_re = r'(?<!\w)(?:' + _number_re + r'[\s,;]+){7,}' + _number_re
+
+    _number_run_split = re.compile(r'([,;]|\n|\s+)').split
+
+    _separator_types = {',': Punctuation, ';': Punctuation}
+
+    def _number_run(lexer, match):
+        # Splitting a run at its separators leaves the numbers at even
+        # indexes.  A newline goes on its own, like the first 'whitespace'
+        # rule, and any other whitespace in one piece with the newlines
+        # after it, like \s+; the other rules would give the same tokens
+        # one at a time.
+        values = lexer._number_run_split(match.group())
+        types = [Number.Float, Text] * (len(values) // 2) + [Number.Float]
+        types[1::2] = [lexer._separator_types.get(value, Text) for value in values[1::2]]
+        positions = accumulate(chain((match.start(),), map(len, values)))
+        return [token for token in zip(positions, types, values) if token[2]]
+
     #: optional Comment or Whitespace
     _ws = r'(?:\s|//.*?\n|/[*].*?[*]/|@.*?@)+'
 
@@ -153,8 +355,20 @@ class GAUSSLexer(RegexLexer):
 
     _id_re = r'([a-zA-Z_]\w*)'
 
+    #: keywords and the like are never the head of a struct member
+    _reserved_re = '(?!(?:' + regex_opt(literal + keyword + declaration)[1:] + r'\b)'
+
+    #: an identifier that none of the more specific statement rules (calls,
+    #: labels, struct members, struct/for/fn) would match
+    _plain_id_re = (r'(?!(?:struct|for|threadfor|fn)\b)[a-zA-Z_]\w*'
+                    r'(?![\w.:]|\s*\(|->)')
+
     tokens = {
         'whitespace': [
+            # A blank line is never part of the whitespace before a directive
+            # that the rules below would match; taking it first keeps them
+            # from rescanning a run of blank lines at every line.
+            (r'\n', Text),
             # preprocessor directives: without whitespace
             ('^#if\s+0', Comment.Preproc, 'if0'),
             ('^#', Comment.Preproc, 'macro'),
@@ -163,17 +377,21 @@ class GAUSSLexer(RegexLexer):
              bygroups(using(this), Comment.Preproc), 'if0'),
             ('^(' + _ws1 + ')(#)',
              bygroups(using(this), Comment.Preproc), 'macro'),
-            (r'\n', Text),
             (r'\s+', Text),
             (r'\\\n', Text),  # line continuation
-            (r'//(\n|[\w\W]*?[^\\]\n)', Comment.Single),
+            (r'//(?:[^\n]*\\\n)*(?:[^\n]*[^\\\n])?\n', Comment.Single),
             (r'/(\\\n)?[*][\w\W]*?[*](\\\n)?/', Comment.Multiline),
             (r'@[\w\W]*?@', Comment.Multiline),
             # Open until EOF, so no ending delimeter
             (r'/(\\\n)?[*][\w\W]*', Comment.Multiline),
+            # or a last line without its newline, where the rule above
+            # would fail at every character of the line
+            (r'//(?:[^\n]*\\\n)*[^\n]*\Z', Comment.Single),
         ],
         'statements': [
+            (_plain_id_re, _identifier),
             (r'"', String, 'string'),
+            (_number_run_re, _number_run),
             (r'0x[0-9a-fA-F]+', Number.Hex),
             (r'(\d+\.\d*|\.\d+|\d+)[eE][+-]?\d+', Number.Float),
             (r'(-?)((\b\d+(\.\d*)?|\.\d+)([eE][-+]?\d+)?)', Number.Float),
@@ -187,15 +405,11 @@ class GAUSSLexer(RegexLexer):
             (r'\[|\]|\(|\)|\{|\}|\.|,|=|\?|:|;', Punctuation),
             (r'(struct)(\s+)' + _id_re, bygroups(Keyword, Whitespace, Name.Class)),
             (r'(?:(for|threadfor)\b)(\s*)' + _id_re, bygroups(Keyword, Whitespace, Name)), # special 'for' case
-            (r'(fn)(\s+)' + _id_re + r'([^=]*?)(=)', bygroups(Keyword, Whitespace, Name.Function, using(this), Punctuation)),
-            (words(literal, suffix=r'\b'), Literal),
-            (words(keyword, suffix=r'\b'), Keyword),
-            #(words(built_in, suffix=r'\b'), Name.Function),
-            (words(declaration, suffix=r'\b'), Keyword.Declaration),
-            (_id_re + r'(\s*)(\()', bygroups(Name.Function, Whitespace, Punctuation)),
-            (r'(^\s*)' + _id_re + r'(:)(?!:)', bygroups(Whitespace, Name.Label, Punctuation)),
-            (_id_re + r'(\.|->)' + _id_re, bygroups(Name, Punctuation, Name.Attribute), 'structmember'),
-            (_id_re, Name),
+            (r'(fn)(\s+)' + _id_re, bygroups(Keyword, Whitespace, Name.Function)),
+            (_id_re + r'(\s*)(\()', _called_identifier),
+            (r'(^\s*)' + _id_re + r'(:)(?!:)', _label),
+            (_reserved_re + _id_re + r'(\.|->)' + _id_re, bygroups(Name, Punctuation, Name.Attribute), 'structmember'),
+            (_id_re, _identifier),
         ],
         'structmember': [
             (r'(\.)' + _id_re, bygroups(Punctuation, Name.Attribute)),
@@ -223,21 +437,141 @@ class GAUSSLexer(RegexLexer):
             (r'(include)(' + _ws1 + r')([^\n]+)',
              bygroups(Comment.Preproc, Text, Comment.PreprocFile)),
             (r'[^/\n]+', Comment.Preproc),
-            (r'/[*](.|\n)*?[*]/', Comment.Multiline),
+            (r'/[*][\w\W]*?(?:[*]/|\Z)', Comment.Multiline),
             (r'@(.|\n)*?@', Comment.Multiline),
-            (r'//.*?\n', Comment.Single, '#pop'),
+            (r'//.*?(?:\n|\Z)', Comment.Single, '#pop'),
             (r'/', Comment.Preproc),
             (r'(?<=\\)\n', Comment.Preproc),
             (r'\n', Comment.Preproc, '#pop'),
         ],
         'if0': [
-            (r'^\s*#if.*?(?<!\\)\n', Comment.Preproc, '#push'),
-            (r'^\s*#el(?:se|if).*\n', Comment.Preproc, '#pop'),
-            (r'^\s*#endif.*?(?<!\\)\n', Comment.Preproc, '#pop'),
+            # lines, the last of which may have no newline
+            (r'^\s*#if.*?(?<!\\)(?:\n|\Z)', Comment.Preproc, '#push'),
+            (r'^\s*#el(?:se|if).*(?:\n|\Z)', Comment.Preproc, '#pop'),
+            (r'^\s*#endif.*?(?<!\\)(?:\n|\Z)', Comment.Preproc, '#pop'),
+            # blank lines not leading to one of the above
+            (r'^(?:[^\S\n]*\n)+', _comment_lines),
             (r'.*?\n', Comment),
+            (r'.+\Z', Comment),
         ],
     }
 
+    def get_tokens_stream(self, source, chunksize=65536, unfiltered=False):
+        """
+        Like `get_tokens`, but read the text from ``source``, a file object
+        or ``mmap``, ``chunksize`` characters or bytes at a time, and yield
+        the tokens of what has been read as soon as the rest of the text can
+        no longer change them.  The tokens are those `get_tokens` gives for
+        the whole text, but only the text not yet lexed is kept in memory:
+        a few chunks, unless a single comment, string or line is longer.
+
+        Bytes are decoded with the ``encoding`` option, or as UTF-8 if that
+        is ``'guess'`` or ``'chardet'``.
+        """
+        def streamer():
+            for _, t, v in self._lex_stream(self._read_text(source, chunksize)):
+                yield t, v
+        stream = streamer()
+        if not unfiltered:
+            stream = apply_filters(stream, self.filters, self)
+        return stream
+
+    def _read_text(self, source, chunksize):
+        """
+        Read ``source`` and yield its text in pieces of whole lines (but for
+        the last), preprocessed the way `get_tokens` preprocesses a string.
+        """
+        encoding = self.encoding
+        if encoding in ('guess', 'chardet'):
+            encoding = 'utf-8'
+        decoder = codecs.getincrementaldecoder(encoding)()
+        if self.stripall:
+            strip = None
+        elif self.stripnl:
+            strip = '\n'
+        else:
+            strip = ''
+        rest = ''       # an unfinished line, or half of a \r\n
+        held = ''       # trailing text that is stripped if nothing follows
+        first = start = True
+        last = ''
+        while True:
+            data = source.read(chunksize)
+            eof = not data
+            if isinstance(data, bytes):
+                data = decoder.decode(data, eof)
+            text = rest + data
+            rest = ''
+            if first and text:
+                if text.startswith(u'\ufeff'):
+                    text = text[1:]
+                first = False
+            if not eof and text.endswith('\r'):
+                text, rest = text[:-1], '\r'
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+            if not eof:
+                end = text.rfind('\n') + 1
+                text, rest = text[:end], text[end:] + rest
+            if start and text:
+                if strip != '':
+                    text = text.lstrip(strip)
+                start = not text
+            if self.tabsize > 0:
+                text = text.expandtabs(self.tabsize)
+            if strip != '' and text:
+                text = held + text
+                stripped = text.rstrip(strip)
+                text, held = stripped, text[len(stripped):]
+            if text:
+                last = text[-1]
+                yield text
+            if eof:
+                break
+        if self.ensurenl and last != '\n':
+            yield '\n'
+
+    def _lex_stream(self, pieces):
+        """
+        Yield (index, tokentype, value) for the text made of ``pieces``,
+        lexing what has been read as far as later text cannot change it.
+        """
+        text = ''
+        offset = 0      # index of text[0] in the whole text
+        statestack = ['root']
+        wanted = 0
+        for piece in pieces:
+            text += piece
+            if len(text) < wanted:
+                continue
+            # Lookaheads stop at the last complete line holding more than
+            # whitespace, so the matches ending by its start are final, but
+            # for an @ whose closing @ has not been read yet.  Lexing resumes
+            # after the last of them that ends a line.
+            head = text[:text.rfind('\n') + 1].rstrip()
+            limit = head.rfind('\n') + 1
+            stack = list(statestack)
+            tokens = []
+            cut = count = 0
+            for end in self._get_matches(text, stack, tokens):
+                if end > limit or (text[end - 1] == '@' and tokens[-1][1] is Text and
+                                   tokens[-1][2] == '@'):
+                    break
+                if text[end - 1] == '\n':
+                    cut, count, cutstack = end, len(tokens), list(stack)
+            if cut:
+                for index, ttype, value in tokens[:count]:
+                    yield offset + index, ttype, value
+                text = text[cut:]
+                offset += cut
+                statestack = cutstack
+                wanted = 0
+            else:
+                # within a comment, string or line longer than the text read
+                # so far; read as much again before trying once more
+                wanted = 2 * len(text)
+        for index, ttype, value in self.get_tokens_unprocessed(text, statestack):
+            yield offset + index, ttype, value
+
     def analyse_text(text):
         if re.search('^\s*(?:endp|endfor)\s*;', text, re.MULTILINE): # end of proc
             return 0.2
@@ -245,3 +579,161 @@ class GAUSSLexer(RegexLexer):
             return 0.2
 
 
+def _split_lines(text):
+    """Split ``text`` after each newline; the last line may lack one."""
+    lines = text.split('\n')
+    last = lines.pop()
+    lines = [line + '\n' for line in lines]
+    if last:
+        lines.append(last)
+    return lines
+
+
+class IncrementalGAUSSLexer(object):
+    """
+    Keeps the tokens of a GAUSS text by line, with the state stack of the
+    lexer at each line start, for editors that lex again after every edit.
+
+    An edit is lexed again from the nearest line start it cannot have
+    changed, and only until a line start after it has the state it had
+    before; the tokens from there on are kept.  The tokens are those of
+    `GAUSSLexer.get_tokens_unprocessed` for the whole text, which is not
+    preprocessed the way `get_tokens` does.
+    """
+
+    #: lines lexed past the edited ones at first; doubled until the state
+    #: settles
+    window = 16
+
+    def __init__(self, text='', **options):
+        self.lexer = GAUSSLexer(**options)
+        #: the lines of the text, each but the last ending in a newline
+        self.lines = []
+        #: (column, tokentype, value) of the tokens starting in each line
+        self.tokens = []
+        #: the state stack at the start of each line, or None where a
+        #: token goes on from the line before
+        self.states = []
+        #: lines holding an @ whose closing @ was not found
+        self.strays = []
+        self.edit(0, 0, 0, 0, text)
+
+    @property
+    def text(self):
+        return ''.join(self.lines)
+
+    def get_tokens_unprocessed(self):
+        """Yield (index, tokentype, value) for the whole text."""
+        pos = 0
+        for line, tokens in zip(self.lines, self.tokens):
+            for column, ttype, value in tokens:
+                yield pos + column, ttype, value
+            pos += len(line)
+
+    def edit(self, line, column, end_line, end_column, text):
+        """
+        Replace the text from (``line``, ``column``) up to (``end_line``,
+        ``end_column``), both counted from 0, with ``text`` and lex again
+        what that can change.  Return ``(first, stop)``, the range of lines
+        whose tokens were replaced, numbered as after the edit.
+        """
+        lines = self.lines
+        head = lines[line][:column] if line < len(lines) else ''
+        if end_line < len(lines):
+            tail = lines[end_line][end_column:]
+            old_stop = end_line + 1
+        else:
+            tail = ''
+            old_stop = len(lines)
+        if not tail.endswith('\n') and old_stop < len(lines):
+            # the newline ending the edited lines was replaced
+            tail += lines[old_stop]
+            old_stop += 1
+        new = _split_lines(head + text + tail)
+        stop = line + len(new)
+        delta = stop - old_stop
+
+        # As in GAUSSLexer._lex_stream, the tokens before the last line
+        # ahead of the edit that holds more than whitespace cannot have
+        # depended on the edited text, unless an @ before it is still open.
+        first = line - 1
+        while first > 0 and not lines[first].strip():
+            first -= 1
+        if self.strays and self.strays[0] < first:
+            first = self.strays[0]
+        while first > 0 and self.states[first] is None:
+            first -= 1
+        first = max(first, 0)
+        statestack = self.states[first] if first < line else ('root',)
+
+        lines[line:old_stop] = new
+        self.tokens[line:old_stop] = [[] for _ in new]
+        self.states[line:old_stop] = [None] * len(new)
+        strays = [i for i in self.strays if i < first]
+        later = [i + delta for i in self.strays if i >= old_stop]
+        if not lines:
+            # the text is empty, with no line to keep a state for
+            self.strays = []
+            return 0, 0
+
+        start = first
+        size = stop - first + self.window
+        while True:
+            end = min(start + size, len(lines))
+            at_end = end == len(lines)
+            text = ''.join(lines[start:end])
+            if at_end:
+                limit = len(text)
+            else:
+                limit = text.rstrip().rfind('\n') + 1
+            starts = [0]
+            for i in range(start, end):
+                starts.append(starts[-1] + len(lines[i]))
+
+            stack = list(statestack)
+            tokens = []
+            marks = []      # (line, token count, state) at each line start
+            settled = False
+            i = start
+            for pos in self.lexer._get_matches(text, stack, tokens):
+                if pos > limit or (not at_end and text[pos - 1] == '@' and
+                                   tokens[-1][1] is Text and tokens[-1][2] == '@'):
+                    break
+                if text[pos - 1] == '\n':
+                    while starts[i - start] < pos:
+                        i += 1
+                    state = tuple(stack)
+                    marks.append((i, len(tokens), state))
+                    if stop <= i < len(lines) and self.states[i] == state:
+                        settled = True
+                        break
+
+            if settled or at_end:
+                upto, count = (marks[-1][:2] if settled else (end, len(tokens)))
+            elif marks:
+                upto, count = marks[-1][:2]
+            else:
+                size *= 2
+                continue
+
+            for i in range(start, upto):
+                self.tokens[i] = []
+                self.states[i] = None
+            self.states[start] = tuple(statestack)
+            for i, _, state in marks:
+                if i < upto:
+                    self.states[i] = state
+            i = start
+            for index, ttype, value in tokens[:count]:
+                while starts[i + 1 - start] <= index:
+                    i += 1
+                self.tokens[i].append((index - starts[i - start], ttype, value))
+                if ttype is Text and value == '@':
+                    strays.append(i)
+
+            if settled or at_end:
+                self.strays = sorted(set(strays)) + [i for i in later if i >= upto]
+                return first, upto
+            statestack = marks[-1][2]
+            start = upto
+            size *= 2
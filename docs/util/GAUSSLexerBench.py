@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+    GAUSSLexerBench
+    ~~~~~~~~~~~~~~~
+
+    Measures how fast `GAUSSLexer` lexes the sources of ``lexer-corpus``,
+    which cover procs, structs, ``#if 0`` blocks, ``threadfor``, strings,
+    comments and matrix literals, and a set of generated pathological
+    inputs.  Each case is scaled to ``--size`` kilobytes and reported with
+    its throughput, its peak memory and the share of the text lexed in
+    each state of the lexer::
+
+        python docs/util/GAUSSLexerBench.py --save     # record a baseline
+        python docs/util/GAUSSLexerBench.py --check    # compare with it
+
+    ``--check`` exits with status 1 if a case has become slower or needs
+    more memory than its baseline by more than ``--threshold``.  Timings
+    depend on the machine, so baselines are kept locally, by default in
+    ``lexer-corpus/baseline.json``, and are not to be committed.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from collections import Counter, deque
+
+import pygments
+
+from GAUSSLexer import GAUSSLexer
+
+if False:
+    # For type annotation
+    from typing import Any, Dict, List, Tuple  # NOQA
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lexer-corpus')
+
+#: inputs that have made the lexer slow, or could: the text repeated
+#: between a prefix and a suffix.  ``tests/test_lexer.py`` checks that
+#: lexing them takes time linear in their size, also as they are, without
+#: the newline `get_tokens` adds at the end
+PATHOLOGICAL = [
+    ('blank lines', 'x', '\n', 'x'),
+    ('blank lines in #if 0', '#if 0\n', ' \n', 'x'),
+    ('nested #if 0', '#if 0\n', '#if 0\n', ''),
+    ('unclosed /* in macros', '', '#define a /*\n', ''),
+    ('unclosed /*', '', 'x /*\n', ''),
+    ('continued // to EOF', '', '// c \\\n', ''),
+    ('// run to EOF', '', '/', ''),
+    ('// in macros to EOF', '#define a ', '//', ''),
+    ('#if 0 to EOF', '#if 0\n', 'x ', ''),
+    ('unclosed string', 'x = "', 'text \\', ''),
+    ('fn without =', '', 'fn f(x) ', ''),
+    ('stray @', '', 'x = 1; @ ', ''),
+    ('stray */', '', 'x */ ', ''),
+    ('long number run', 'x = {', ' 1.5e-3,', ' 0 };'),
+    ('short number runs', '', '1 2 3 4 5 6 7' + ' ' * 50 + 'x\n', ''),
+    ('long identifiers', '', 'a' * 1000 + '.b ', ''),
+]  # type: List[Tuple[unicode, unicode, unicode, unicode]]
+
+
+def get_cases(size):
+    # type: (int) -> List[Tuple[unicode, unicode]]
+    """Return the name and text of every case, each about *size*
+    characters long.
+    """
+    cases = []
+    sources = []
+    for filename in sorted(os.listdir(CORPUS)):
+        if filename.endswith(('.src', '.g', '.e')):
+            with open(os.path.join(CORPUS, filename), encoding='utf-8') as f:
+                sources.append((filename, f.read()))
+    for name, source in sources + [('whole corpus', ''.join(s for n, s in sources))]:
+        cases.append((name, source * max(1, size // len(source))))
+    for name, prefix, text, suffix in PATHOLOGICAL:
+        cases.append((name, prefix + text * max(1, size // len(text)) + suffix))
+    return cases
+
+
+def state_mix(lexer, text):
+    # type: (GAUSSLexer, unicode) -> Dict[unicode, float]
+    """Return the share of *text* lexed in each state."""
+    counts = Counter()  # type: Dict[unicode, int]
+    statestack = ['root']
+    state = 'root'
+    start = 0
+    for end in lexer._get_matches(text, statestack, deque(maxlen=0)):
+        counts[state] += end - start
+        state = statestack[-1]
+        start = end
+    return dict((name, count / len(text)) for name, count in counts.items())
+
+
+def measure(lexer, text, repeat):
+    # type: (GAUSSLexer, unicode, int) -> Dict[unicode, Any]
+    """Lex *text* *repeat* times and return the best throughput, the peak
+    memory and the state mix.
+    """
+    best = None
+    for i in range(repeat):
+        start = time.process_time()
+        deque(lexer.get_tokens(text), maxlen=0)
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    try:
+        tokens = sum(1 for token in lexer.get_tokens(text))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'tokens': tokens,
+        'mb_per_s': len(text.encode('utf-8')) / 1048576.0 / best,
+        'tokens_per_s': tokens / best,
+        'peak_kb': peak / 1024.0,
+        'states': state_mix(lexer, text),
+    }
+
+
+def compare(result, baseline, threshold):
+    # type: (Dict[unicode, Any], Dict[unicode, Any], float) -> List[unicode]
+    """Return what got worse than *baseline* by more than *threshold*."""
+    problems = []
+    if result['mb_per_s'] < baseline['mb_per_s'] * (1 - threshold):
+        problems.append('%.1f%% slower' %
+                        (100 * (1 - result['mb_per_s'] / baseline['mb_per_s'])))
+    # a few kilobytes either way are noise
+    if (result['peak_kb'] > baseline['peak_kb'] * (1 + threshold) and
+            result['peak_kb'] - baseline['peak_kb'] > 64):
+        problems.append('%.0f KB more memory' % (result['peak_kb'] - baseline['peak_kb']))
+    return problems
+
+
+def format_states(states):
+    # type: (Dict[unicode, float]) -> unicode
+    return ' '.join('%s %.0f%%' % (name, 100 * share)
+                    for name, share in sorted(states.items(), key=lambda item: -item[1])
+                    if share >= 0.005)
+
+
+def main(argv=None):
+    # type: (List[unicode]) -> int
+    parser = argparse.ArgumentParser(description='Benchmark GAUSSLexer.')
+    parser.add_argument('cases', nargs='*',
+                        help='run only the cases whose name contains one of these')
+    parser.add_argument('--size', type=int, default=256,
+                        help='size of each case in kilobytes (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='timing runs per case, the best counts (default: %(default)s)')
+    parser.add_argument('--baseline', default=os.path.join(CORPUS, 'baseline.json'),
+                        help='baseline file (default: %(default)s)')
+    parser.add_argument('--save', action='store_true',
+                        help='store the results as the baseline')
+    parser.add_argument('--check', action='store_true',
+                        help='exit with status 1 if a case got worse than its baseline')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='the change that counts as worse (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    baseline = {}  # type: Dict[unicode, Any]
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('size') != args.size:
+            print('baseline was taken with --size %s; not comparing' % baseline.get('size'))
+            baseline = {}
+        elif (baseline.get('python'), baseline.get('pygments')) != \
+                (platform.python_version(), pygments.__version__):
+            print('baseline was taken with Python %s and Pygments %s' %
+                  (baseline.get('python'), baseline.get('pygments')))
+    if args.check and not baseline:
+        print('no baseline for --size %d in %s; run with --save first' %
+              (args.size, args.baseline))
+        return 1
+
+    lexer = GAUSSLexer()
+    results = {}  # type: Dict[unicode, Dict[unicode, Any]]
+    failed = []  # type: List[unicode]
+    print('%-24s %8s %10s %9s %8s  %s' % ('case', 'MB/s', 'tokens/s', 'peak KB',
+                                          'change', 'states'))
+    for name, text in get_cases(args.size * 1024):
+        if args.cases and not any(pattern in name for pattern in args.cases):
+            continue
+        result = results[name] = measure(lexer, text, args.repeat)
+        previous = baseline.get('cases', {}).get(name)
+        change = ''
+        if previous:
+            change = '%+.1f%%' % (100 * (result['mb_per_s'] / previous['mb_per_s'] - 1))
+            problems = compare(result, previous, args.threshold)
+            if problems and args.check:
+                failed.append('%s: %s' % (name, ', '.join(problems)))
+        print('%-24s %8.2f %10.0f %9.0f %8s  %s' % (name, result['mb_per_s'],
+                                                   result['tokens_per_s'], result['peak_kb'],
+                                                   change, format_states(result['states'])))
+        if previous and previous['tokens'] != result['tokens']:
+            # the rules changed, so the speeds may not be comparable
+            print('%-24s %d tokens, %d in the baseline' % ('', result['tokens'],
+                                                          previous['tokens']))
+
+    if args.save:
+        saved = dict(baseline) if baseline else {}
+        saved.update(size=args.size, python=platform.python_version(),
+                     pygments=pygments.__version__)
+        saved.setdefault('cases', {}).update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(saved, f, indent=1, sort_keys=True)
+        print('baseline saved to %s' % args.baseline)
+    if failed:
+        print('\n'.join(['worse than the baseline by more than %.0f%%:' %
+                         (100 * args.threshold)] + failed))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
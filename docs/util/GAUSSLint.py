@@ -0,0 +1,407 @@
+# -*- coding: utf-8 -*-
+"""
+    GAUSSLint
+    ~~~~~~~~~
+
+    Checks the GAUSS code blocks of the documents read by a build::
+
+        gauss_lint = True
+        gauss_lint_workers = 4
+
+    Each block is lexed with `GAUSSLexer`, and what the lexer cannot make
+    sense of is reported where the block is: the characters it gives
+    ``Error`` tokens, such as a stray ``*/``, strings, comments and
+    ``#if`` blocks that run to the end of the block, and ``proc``,
+    ``keyword``, ``if``, ``for``, ``threadfor`` and ``do`` statements
+    that are not closed by their ``endp``, ``endif``, ``endfor``,
+    ``threadendfor`` or ``endo``, or closers without them.  The ``proc``
+    of ``local f:proc``, a procedure argument, opens nothing.
+
+    The blocks are collected as the documents are read and checked once
+    reading is done, in ``gauss_lint_workers`` processes.  What is found
+    in a block is cached by the hash of its code, in
+    ``<doctreedir>/gauss-lint.db`` unless ``gauss_lint_cache`` names
+    another database, so that only blocks that changed are lexed again.
+    The warnings can be silenced with ``suppress_warnings = ['gauss.lint']``.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from docutils import nodes
+from docutils.utils import get_source_line
+
+from pygments.token import Comment, Error, Keyword, Text
+
+from sphinx.highlighting import lexers
+from sphinx.locale import __
+from sphinx.transforms.post_transforms.code import HighlightLanguageVisitor
+from sphinx.util import logging
+
+from GAUSSLexer import GAUSSLexer
+
+if False:
+    # For type annotation
+    from typing import Any, Dict, List, Set, Tuple  # NOQA
+    from sphinx.application import Sphinx  # NOQA
+    from sphinx.environment import BuildEnvironment  # NOQA
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE blocks (hash TEXT PRIMARY KEY, problems TEXT NOT NULL);
+"""
+
+#: the statements that must be closed, by the keyword closing them
+OPENERS = {
+    'proc': 'endp',
+    'keyword': 'endp',
+    'if': 'endif',
+    'for': 'endfor',
+    'threadfor': 'threadendfor',
+    'do': 'endo',
+}
+#: the statements each keyword closes, the first of which warnings name
+CLOSERS = {}  # type: Dict[unicode, List[unicode]]
+for _opener, _closer in OPENERS.items():
+    CLOSERS.setdefault(_closer, []).append(_opener)
+
+# a /* comment with its */
+_closed_comment_re = re.compile(r'/(\\\n)?[*][\w\W]*?[*](\\\n)?/\Z')
+
+# lines of the source a block may start on, from the one before that of its
+# node, which is that of the directive for code-block
+_window = 32
+
+_lexer = None           # type: GAUSSLexer
+_code_version = None    # type: unicode
+
+
+def code_version():
+    # type: () -> unicode
+    """Return a hash of the code that checks the blocks."""
+    global _code_version
+    if _code_version is None:
+        sha1 = hashlib.sha1()
+        for module in (sys.modules[GAUSSLexer.__module__], sys.modules[__name__]):
+            filename = module.__file__
+            if filename.endswith(('.pyc', '.pyo')):
+                filename = filename[:-1]
+            with open(filename, 'rb') as f:
+                sha1.update(f.read())
+        _code_version = sha1.hexdigest()
+    return _code_version
+
+
+def lint(text):
+    # type: (unicode) -> List[Tuple[int, unicode, Tuple]]
+    """Return the problems of the GAUSS code *text*, as (line, message,
+    arguments) triples, the line counted from 1 and the message not yet
+    translated.
+    """
+    global _lexer
+    if _lexer is None:
+        _lexer = GAUSSLexer()
+
+    problems = []       # type: List[Tuple[int, unicode, Tuple]]
+    tokens = []         # type: List[Tuple[int, Any, unicode]]
+    statestack = ['root']
+    entered = []        # type: List[int]
+    start = 0
+    # the state stack above 'root', with where each state was entered
+    for end in _lexer._get_matches(text, statestack, tokens):
+        del entered[len(statestack) - 1:]
+        while len(entered) < len(statestack) - 1:
+            entered.append(start)
+        start = end
+
+    def line(pos):
+        # type: (int) -> int
+        return text.count('\n', 0, pos) + 1
+
+    unterminated = False
+    for state, pos in zip(statestack[1:], entered):
+        if state == 'string':
+            problems.append((line(pos), 'unterminated string', ()))
+            unterminated = True
+            break
+        elif state == 'if0':
+            problems.append((line(pos), "'#if' is not closed by '#endif'", ()))
+            break
+
+    opened = []         # type: List[Tuple[unicode, int]]
+    previous = None     # the last token but whitespace and comments
+    for pos, ttype, value in tokens:
+        if ttype is Error:
+            problems.append((line(pos), 'unexpected %r', (value,)))
+        elif ttype is Text and len(value) == 1 and not value.isspace():
+            # what the lexer's catch-all rule took
+            if value == '@':
+                problems.append((line(pos), 'unterminated comment', ()))
+                unterminated = True
+            else:
+                problems.append((line(pos), 'unexpected %r', (value,)))
+        elif ttype in Comment.Multiline and value.startswith('/') and \
+                not _closed_comment_re.match(value):
+            problems.append((line(pos), 'unterminated comment', ()))
+            unterminated = True
+        elif ttype in Keyword:
+            word = value.lower()
+            if word == 'proc' and previous == ':':
+                # the type of a local, as in local f:proc
+                pass
+            elif word in OPENERS:
+                opened.append((word, pos))
+            elif word in CLOSERS:
+                openers = CLOSERS[word]
+                if not any(opener in openers for opener, where in opened):
+                    problems.append((line(pos), '%r without %r', (value, openers[0])))
+                else:
+                    while opened[-1][0] not in openers:
+                        opener, where = opened.pop()
+                        problems.append((line(where), '%r is not closed by %r before %r',
+                                         (opener, OPENERS[opener], value)))
+                    opened.pop()
+        if ttype not in Comment and not value.isspace():
+            previous = value
+    if not unterminated:
+        # otherwise, the closers are likely in the string or comment
+        for opener, where in opened:
+            problems.append((line(where), '%r is not closed by %r',
+                             (opener, OPENERS[opener])))
+
+    # one report for a run of stray characters
+    seen = set()        # type: Set[Tuple[int, unicode, Tuple]]
+    result = []
+    for problem in sorted(problems, key=lambda problem: problem[0]):
+        if problem[1] == 'unexpected %r':
+            key = (problem[0], problem[1], ())
+            if key in seen:
+                continue
+            seen.add(key)
+        result.append(problem)
+    return result
+
+
+def connect(filename):
+    # type: (unicode) -> sqlite3.Connection
+    """Open the cache *filename*, emptying it when it is out of date."""
+    conn = sqlite3.connect(filename, timeout=60)
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+    except sqlite3.DatabaseError:
+        row = None
+    if row is None or int(row[0]) != SCHEMA_VERSION:
+        conn.close()
+        if os.path.exists(filename):
+            os.remove(filename)
+        conn = sqlite3.connect(filename, timeout=60)
+        conn.execute('PRAGMA journal_mode=WAL')
+        with conn:
+            conn.executescript(SCHEMA)
+            conn.execute("INSERT INTO meta VALUES ('schema', ?)", (str(SCHEMA_VERSION),))
+            conn.execute("INSERT INTO meta VALUES ('code', '')")
+    row = conn.execute("SELECT value FROM meta WHERE key = 'code'").fetchone()
+    if row[0] != code_version():
+        with conn:
+            conn.execute("DELETE FROM blocks")
+            conn.execute("UPDATE meta SET value = ? WHERE key = 'code'", (code_version(),))
+    return conn
+
+
+def get_problems(texts, cachefile, workers):
+    # type: (Dict[unicode, unicode], unicode, int) -> Dict[unicode, List[Tuple[int, unicode, Tuple]]]  # NOQA
+    """Return the problems of each of *texts*, by hash, checking only the
+    ones that are not in the cache *cachefile*.
+    """
+    result = {}     # type: Dict[unicode, List[Tuple[int, unicode, Tuple]]]
+    conn = connect(cachefile)
+    try:
+        digests = list(texts)
+        # in batches, below the limit on SQL variables
+        for i in range(0, len(digests), 500):
+            batch = digests[i:i + 500]
+            for digest, problems in conn.execute(
+                    "SELECT hash, problems FROM blocks WHERE hash IN (%s)" %
+                    ', '.join('?' * len(batch)), batch):
+                result[digest] = [(line, message, tuple(args))
+                                  for line, message, args in json.loads(problems)]
+
+        missing = [digest for digest in digests if digest not in result]
+        if workers > 0 and len(missing) > 1:
+            with ProcessPoolExecutor(min(workers, len(missing))) as executor:
+                found = list(executor.map(lint, [texts[digest] for digest in missing],
+                                          chunksize=max(1, len(missing) // (workers * 4))))
+        else:
+            found = [lint(texts[digest]) for digest in missing]
+        with conn:
+            for digest, problems in zip(missing, found):
+                result[digest] = problems
+                conn.execute("INSERT OR REPLACE INTO blocks VALUES (?, ?)",
+                             (digest, json.dumps(problems)))
+    finally:
+        conn.close()
+    return result
+
+
+def get_cachefile(app):
+    # type: (Sphinx) -> unicode
+    if app.config.gauss_lint_cache:
+        return os.path.join(app.confdir, app.config.gauss_lint_cache)
+    return os.path.join(app.doctreedir, 'gauss-lint.db')
+
+
+def _read_lines(filename, encoding, files):
+    # type: (unicode, unicode, Dict[unicode, List[unicode]]) -> List[unicode]
+    lines = files.get(filename)
+    if lines is None:
+        try:
+            with open(filename, encoding=encoding, errors='replace') as f:
+                lines = [line.rstrip() for line in f]
+        except (IOError, OSError):
+            lines = []
+        files[filename] = lines
+    return lines
+
+
+def get_location(node, text, encoding, files):
+    # type: (nodes.Node, unicode, unicode, Dict[unicode, List[unicode]]) -> Tuple[unicode, int, bool]  # NOQA
+    """Return the file and line the code of *node* starts on, and whether
+    they were found in the file rather than guessed.
+    """
+    source, line = get_source_line(node)
+    code = [codeline.strip() for codeline in text.split('\n')]
+    if not any(code):
+        return source, line, False
+    # match from the first line with code to the last
+    first = next(i for i, codeline in enumerate(code) if codeline)
+    code = code[first:len(code) - next(i for i, codeline in enumerate(reversed(code))
+                                        if codeline)]
+
+    included = node.get('source')
+    if included and included != source:
+        # literalinclude and gauss-include give the file they read
+        filename = included
+        lines = _read_lines(filename, encoding, files)
+        starts = range(len(lines) - len(code) + 1)
+    elif source and line:
+        filename = source
+        lines = _read_lines(filename, encoding, files)
+        starts = range(max(line - 2, 0), min(line - 1 + _window, len(lines) - len(code) + 1))
+    else:
+        starts = range(0)
+    for start in starts:
+        # the lines may also be in a comment, for autogauss
+        if all(lines[start + i].endswith(codeline) for i, codeline in enumerate(code)):
+            return filename, start + 1 - first, True
+    return source, line, False
+
+
+class BlockLanguages(HighlightLanguageVisitor):
+    """Finds the language each literal block will be highlighted in, as
+    the ``highlight`` directives and :confval:`highlight_language` only
+    give it to the blocks after the document is read.
+    """
+
+    def __init__(self, document, default_language):
+        # type: (nodes.document, unicode) -> None
+        super().__init__(document, default_language)
+        self.blocks = []    # type: List[Tuple[nodes.Node, unicode]]
+
+    def visit_literal_block(self, node):
+        # type: (nodes.literal_block) -> None
+        self.blocks.append((node, node.get('language', self.settings[-1].language)))
+
+
+def collect_blocks(app, doctree):
+    # type: (Sphinx, nodes.Node) -> None
+    if not app.config.gauss_lint:
+        return
+    visitor = BlockLanguages(doctree, app.config.highlight_language)
+    doctree.walkabout(visitor)
+    blocks = []
+    files = {}  # type: Dict[unicode, List[unicode]]
+    for node, language in visitor.blocks:
+        if (node.rawsource != node.astext() or
+                not isinstance(lexers.get(language), GAUSSLexer)):
+            continue
+        text = node.astext()
+        digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        source, line, exact = get_location(node, text, app.config.source_encoding, files)
+        if not source:
+            source = app.env.doc2path(app.env.docname)
+        blocks.append((digest, source, line, exact, text))
+    if blocks:
+        app.env.gauss_lint_blocks[app.env.docname] = blocks
+
+
+def init_blocks(app, env, docnames):
+    # type: (Sphinx, BuildEnvironment, List[unicode]) -> None
+    if not hasattr(env, 'gauss_lint_blocks'):
+        env.gauss_lint_blocks = {}
+
+
+def purge_blocks(app, env, docname):
+    # type: (Sphinx, BuildEnvironment, unicode) -> None
+    getattr(env, 'gauss_lint_blocks', {}).pop(docname, None)
+
+
+def merge_blocks(app, env, docnames, other):
+    # type: (Sphinx, BuildEnvironment, Set[unicode], BuildEnvironment) -> None
+    for docname in docnames:
+        if docname in other.gauss_lint_blocks:
+            env.gauss_lint_blocks[docname] = other.gauss_lint_blocks[docname]
+
+
+def check_blocks(app, env):
+    # type: (Sphinx, BuildEnvironment) -> List[unicode]
+    blocks = getattr(env, 'gauss_lint_blocks', None)
+    if not blocks:
+        return []
+    # the blocks of the documents read by this build, which are not kept
+    env.gauss_lint_blocks = {}
+
+    texts = {}  # type: Dict[unicode, unicode]
+    for docname in blocks:
+        for digest, source, line, exact, text in blocks[docname]:
+            texts[digest] = text
+    problems = get_problems(texts, get_cachefile(app), app.config.gauss_lint_workers)
+
+    for docname in sorted(blocks):
+        for digest, source, line, exact, text in blocks[docname]:
+            for offset, message, args in problems[digest]:
+                message = __(message) % args
+                if exact:
+                    location = '%s:%d' % (source, line + offset - 1)
+                else:
+                    message = __('%s (line %d of the block)') % (message, offset)
+                    location = '%s:%s' % (source, line or '')
+                logger.warning(__('GAUSS code: %s'), message, location=location,
+                               type='gauss', subtype='lint')
+    return []
+
+
+def setup(app):
+    # type: (Sphinx) -> Dict[unicode, Any]
+    app.add_config_value('gauss_lint', False, 'env')
+    app.add_config_value('gauss_lint_workers', 0, '')
+    app.add_config_value('gauss_lint_cache', None, '')
+    app.connect('env-before-read-docs', init_blocks)
+    app.connect('env-purge-doc', purge_blocks)
+    app.connect('env-merge-info', merge_blocks)
+    app.connect('doctree-read', collect_blocks)
+    app.connect('env-updated', check_blocks)
+
+    return {
+        'version': 'builtin',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
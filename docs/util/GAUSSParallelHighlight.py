@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+    GAUSSParallelHighlight
+    ~~~~~~~~~~~~~~~~~~~~~~
+
+    Highlights the code blocks of a page in a pool of processes, for large
+    manuals and the single page builds where one document holds every
+    block::
+
+        gauss_highlight_workers = 4
+
+    Once a doctree is resolved, its literal blocks are highlighted by the
+    pool and the results stored on the nodes, where `GAUSSHTMLTranslator`
+    picks them up instead of highlighting them itself.  The output is the
+    same as with ``gauss_highlight_workers = 0``, the default, which
+    leaves highlighting to the translator: blocks whose highlighting would
+    warn, and blocks in languages whose lexer cannot be sent to another
+    process, are left to the translator too.
+"""
+
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from docutils import nodes
+from six import iteritems
+
+from sphinx.highlighting import lexers
+from sphinx.locale import __
+from sphinx.util import logging
+
+from GAUSSHTMLTranslator import GAUSSHTMLTranslator
+
+if False:
+    # For type annotation
+    from typing import Any, Dict, List, Set, Tuple  # NOQA
+    from sphinx.application import Sphinx  # NOQA
+    from sphinx.highlighting import PygmentsBridge  # NOQA
+
+logger = logging.getLogger(__name__)
+
+_bridge = None  # type: PygmentsBridge
+
+
+def _init_worker(bridge, shipped):
+    # type: (PygmentsBridge, Dict[unicode, Any]) -> None
+    global _bridge
+    _bridge = bridge
+    lexers.update(shipped)
+
+
+def _highlight(job):
+    # type: (Tuple[unicode, unicode, Any, bool, Dict[unicode, Any]]) -> unicode
+    """Highlight a block in a worker; None if that would warn."""
+    source, lang, opts, force, kwargs = job
+    with logging.pending_logging() as memhandler:
+        html = _bridge.highlight_block(source, lang, opts=opts, force=force, **kwargs)
+        if memhandler.clear():
+            return None
+    return html
+
+
+class HighlightPool(object):
+    """The worker processes of a build, with the lexers they were sent."""
+
+    def __init__(self, highlighter, workers):
+        # type: (Any, int) -> None
+        # a caching highlighter wraps the bridge the workers need
+        bridge = getattr(highlighter, 'highlighter', highlighter)
+        self.shipped = {}   # type: Dict[unicode, Any]
+        for name, lexer in iteritems(lexers):
+            try:
+                pickle.dumps(lexer)
+            except Exception:
+                continue
+            self.shipped[name] = lexer
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(workers, initializer=_init_worker,
+                                            initargs=(bridge, self.shipped))
+
+    def can_highlight(self, lang):
+        # type: (unicode) -> bool
+        # languages not registered yet are looked up by name, as they
+        # would be by the translator
+        return lang in self.shipped or lang not in lexers
+
+    def highlight(self, jobs):
+        # type: (List[Tuple[unicode, unicode, Any, bool, Dict[unicode, Any]]]) -> List[unicode]
+        chunksize = max(1, len(jobs) // (self.workers * 4))
+        return list(self.executor.map(_highlight, jobs, chunksize=chunksize))
+
+    def shutdown(self):
+        # type: () -> None
+        self.executor.shutdown()
+
+
+def get_pool(app):
+    # type: (Sphinx) -> HighlightPool
+    pool = getattr(app, '_gauss_highlight_pool', None)
+    if pool is None:
+        try:
+            pool = HighlightPool(app.builder.highlighter,
+                                 app.config.gauss_highlight_workers)
+        except (OSError, NotImplementedError) as exc:
+            logger.warning(__('cannot start GAUSS highlighting processes: %s'), exc)
+            pool = False
+        app._gauss_highlight_pool = pool
+    return pool
+
+
+def highlight_sources(app, jobs):
+    # type: (Sphinx, List[Tuple[unicode, unicode, Any, bool, Dict[unicode, Any]]]) -> List[unicode]
+    """Return the HTML of *jobs*, (source, lang, opts, force, kwargs)
+    tuples, from the highlight cache or the pool; None for those left to
+    the caller.
+    """
+    results = [None] * len(jobs)  # type: List[unicode]
+    highlighter = app.builder.highlighter
+    cache_key = getattr(highlighter, 'cache_key', None)
+    pool = get_pool(app) if app.config.gauss_highlight_workers > 0 else None
+
+    todo = []  # type: List[Tuple[int, unicode]]
+    for i, (source, lang, opts, force, kwargs) in enumerate(jobs):
+        key = cache_key and cache_key(source, lang, opts, force, **kwargs)
+        if key:
+            results[i] = highlighter.cache.get(key)
+            if results[i] is not None:
+                continue
+        if pool and pool.can_highlight(lang):
+            todo.append((i, key))
+    if len(todo) < 2:
+        return results
+
+    try:
+        htmls = pool.highlight([jobs[i] for i, key in todo])
+    except BrokenProcessPool as exc:
+        logger.warning(__('GAUSS highlighting processes failed: %s'), exc)
+        pool.shutdown()
+        app._gauss_highlight_pool = False
+        return results
+    for (i, key), html in zip(todo, htmls):
+        if html is not None:
+            results[i] = html
+            if key:
+                highlighter.cache.put(key, html)
+    return results
+
+
+def highlight_blocks(app, doctree, docname):
+    # type: (Sphinx, nodes.Node, unicode) -> None
+    if (app.config.gauss_highlight_workers <= 0 or
+            getattr(app.builder, 'highlighter', None) is None or
+            not issubclass(app.builder.get_translator_class(), GAUSSHTMLTranslator)):
+        return
+    pool = get_pool(app)
+    if not pool:
+        return
+
+    blocks = []  # type: List[nodes.Node]
+    jobs = []    # type: List[Tuple[unicode, unicode, Any, bool, Dict[unicode, Any]]]
+    for node in doctree.traverse(nodes.literal_block):
+        if node.rawsource != node.astext():
+            continue
+        # the same arguments as HTMLTranslator.visit_literal_block
+        lang = node.get('language', 'default')
+        if not pool.can_highlight(lang):
+            continue
+        kwargs = dict(node.get('highlight_args', {}))
+        kwargs['linenos'] = node.get('linenos', False)
+        kwargs.pop('force', None)
+        force = node.get('force', node.get('force_highlighting', False))
+        if lang is app.config.highlight_language:
+            opts = app.config.highlight_options
+        else:
+            opts = {}
+        blocks.append(node)
+        jobs.append((node.rawsource, lang, opts, force, kwargs))
+
+    for node, html in zip(blocks, highlight_sources(app, jobs)):
+        if html is not None:
+            node['gauss_highlighted'] = html
+
+
+def shutdown_pool(app, exception):
+    # type: (Sphinx, Exception) -> None
+    pool = getattr(app, '_gauss_highlight_pool', None)
+    if pool:
+        pool.shutdown()
+    app._gauss_highlight_pool = None
+
+
+def setup(app):
+    # type: (Sphinx) -> Dict[unicode, Any]
+    app.add_config_value('gauss_highlight_workers', 0, '')
+    app.connect('doctree-resolved', highlight_blocks)
+    app.connect('build-finished', shutdown_pool)
+
+    return {
+        'version': 'builtin',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
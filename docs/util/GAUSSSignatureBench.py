@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+    GAUSSSignatureBench
+    ~~~~~~~~~~~~~~~~~~~
+
+    Measures how fast `GAUSSDomain` parses signatures and builds their
+    nodes, for every signature of a reference corpus::
+
+        python docs/util/GAUSSSignatureBench.py ../reference ../src
+
+    The signatures are those of the ``gauss:`` object directives in the
+    ``.rst`` files, and those ``autogauss`` would give the procs of the
+    GAUSS sources, found in the files and directories given.  Without
+    any, the procs of ``lexer-corpus`` and ``--generate`` generated
+    signatures of every form the parser handles are used.
+
+    Parsing is timed with the parse cache empty and filled; building the
+    nodes, as ``handle_signature`` does, with the cache filled.
+"""
+
+import argparse
+import gc
+import os
+import random
+import re
+import sys
+import time
+
+from sphinx import addnodes
+
+from GAUSSAutodoc import get_signature, parse_procs
+from GAUSSDomain import _build_generic, _parse_signature, _signature_cache
+from GAUSSHTMLTranslator import desc_return, desc_returnlist
+
+if False:
+    # For type annotation
+    from typing import Any, Callable, List, Tuple  # NOQA
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lexer-corpus')
+
+SOURCES = ('.src', '.g', '.e')
+
+_directive_re = re.compile(r'^\s*\.\. gauss:(?:function|data|class|exception|method|'
+                           r'classmethod|staticmethod|attribute|decorator)::\s*(\S.*)$',
+                           re.MULTILINE)
+
+
+def read_signatures(filename):
+    # type: (unicode) -> List[unicode]
+    with open(filename, encoding='utf-8', errors='replace') as f:
+        text = f.read()
+    if filename.endswith(SOURCES):
+        return [get_signature(proc) for proc in parse_procs(text)]
+    return [sig.strip() for sig in _directive_re.findall(text)]
+
+
+def find_signatures(paths):
+    # type: (List[unicode]) -> List[unicode]
+    signatures = []  # type: List[unicode]
+    for path in paths:
+        if os.path.isfile(path):
+            signatures.extend(read_signatures(path))
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.endswith(SOURCES + ('.rst', '.txt')):
+                    signatures.extend(read_signatures(os.path.join(dirpath, filename)))
+    return signatures
+
+
+def generate_signatures(count, seed=0):
+    # type: (int, int) -> List[unicode]
+    """Return *count* signatures, with as many repeats as a reference
+    describing the same procs in several places would have.
+    """
+    rng = random.Random(seed)
+    names = ['x', 'y', 'ctl', 'dataset', 'formula', 'struct modelControl c',
+             'struct DS *p', '&fct', 'start_date', 'tol']
+
+    def arguments(nested):
+        args = rng.sample(names, rng.randint(0, 4))
+        if nested and args and rng.random() < 0.4:
+            # optional arguments, which may themselves be nested
+            return '%s[, %s]' % (', '.join(args), arguments(False) or 'opt')
+        return ', '.join(args)
+
+    distinct = []
+    for i in range(max(1, count // 6)):
+        name = rng.choice(['', 'pkg.', 'mod.sub.']) + 'proc%d%s' % (
+            i, rng.choice(['', 'Fit', 'Bvn2e', 'QueryFetchAllM']))
+        sig = '%s(%s)' % (name, arguments(True))
+        returns = rng.randint(0, 3)
+        if returns == 1:
+            sig = 'out = ' + sig
+        elif returns > 1:
+            sig = '{ %s } = %s' % (', '.join('r%d' % j for j in range(returns)), sig)
+        distinct.append(sig)
+    return [rng.choice(distinct) for i in range(count)]
+
+
+def build_nodes(sig):
+    # type: (unicode) -> addnodes.desc_signature
+    returns, name_prefix, name, arglist = _parse_signature(sig)
+    signode = addnodes.desc_signature(sig, '')
+    if returns is not None:
+        _build_generic(signode, returns, desc_returnlist, desc_return)
+    if name_prefix:
+        signode += addnodes.desc_addname(name_prefix, name_prefix)
+    signode += addnodes.desc_name(name, name)
+    if arglist is not None:
+        _build_generic(signode, arglist, addnodes.desc_parameterlist,
+                       addnodes.desc_parameter)
+    return signode
+
+
+def best_time(func, repeat, setup=None):
+    # type: (Callable[[], Any], int, Callable[[], Any]) -> float
+    best = None
+    for i in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv=None):
+    # type: (List[unicode]) -> int
+    parser = argparse.ArgumentParser(description='Benchmark GAUSS signature parsing.')
+    parser.add_argument('paths', nargs='*',
+                        help='.rst files, GAUSS sources and directories to take '
+                             'the signatures of')
+    parser.add_argument('--generate', type=int, default=6000,
+                        help='signatures to generate without paths (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=7,
+                        help='timing runs, the best counts (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    if args.paths:
+        signatures = find_signatures(args.paths)
+    else:
+        signatures = find_signatures([CORPUS]) + generate_signatures(args.generate)
+    invalid = [sig for sig in set(signatures) if _parse_signature(sig) is None]
+    signatures = [sig for sig in signatures if sig not in invalid]
+    if not signatures:
+        print('no signatures found')
+        return 1
+
+    def parse():
+        for sig in signatures:
+            _parse_signature(sig)
+
+    def build():
+        for sig in signatures:
+            build_nodes(sig)
+
+    print('%d signatures, %d distinct, %d invalid ones skipped' %
+          (len(signatures), len(set(signatures)), len(invalid)))
+    for name, func, setup in [('parse, cache empty', parse, _signature_cache.clear),
+                              ('parse, cache filled', parse, None),
+                              ('parse and build nodes', build, None)]:
+        elapsed = best_time(func, args.repeat, setup)
+        print('%-24s %8.2f us/signature' % (name, 1e6 * elapsed / len(signatures)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
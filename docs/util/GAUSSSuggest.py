@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+    GAUSSSuggest
+    ~~~~~~~~~~~~
+
+    Suggests GAUSS object names for references that could not be resolved,
+    e.g. ``dbOpn`` -> ``dbOpen``.  Candidates come from a trigram index over
+    the domain's object names, built on the first miss of a build, and are
+    ranked by similarity, so a miss costs a few posting-list lookups rather
+    than a comparison against every name.
+
+    Set up after every other ``missing-reference`` handler so that only
+    references nothing could resolve are reported.  Where Sphinx warns
+    about the reference itself, as it does for the ``any`` role and in
+    nitpicky mode, the suggestions are added to its warning, which keeps
+    its type; otherwise they get a warning of type ``ref.gauss``.  Either
+    can be silenced with ``suppress_warnings``.
+"""
+
+import heapq
+from collections import Counter
+from difflib import SequenceMatcher
+from itertools import chain
+
+from sphinx.locale import __
+from sphinx.util import logging
+
+if False:
+    # For type annotation
+    from typing import Any, Dict, Iterable, List, Set  # NOQA
+    from docutils import nodes  # NOQA
+    from sphinx.application import Sphinx  # NOQA
+    from sphinx.environment import BuildEnvironment  # NOQA
+
+logger = logging.getLogger(__name__)
+
+
+def trigrams(word):
+    # type: (unicode) -> Set[unicode]
+    """Return the trigrams of *word*, case folded and padded so that short
+    words and word boundaries count too.
+    """
+    word = '  ' + word.lower() + ' '
+    return set(word[i:i + 3] for i in range(len(word) - 2))
+
+
+class TrigramIndex(object):
+    """Finds the names most similar to a word."""
+
+    #: candidates, by trigram overlap, that are ranked by similarity
+    shortlist = 8
+    #: lowest similarity ratio worth suggesting
+    cutoff = 0.7
+
+    def __init__(self, names):
+        # type: (Iterable[unicode]) -> None
+        self.names = sorted(set(names))
+        self.sizes = []     # type: List[int]
+        self.postings = {}  # type: Dict[unicode, List[int]]
+        for i, name in enumerate(self.names):
+            grams = trigrams(name)
+            self.sizes.append(len(grams))
+            for trigram in grams:
+                self.postings.setdefault(trigram, []).append(i)
+
+    def suggest(self, word, limit=3):
+        # type: (unicode, int) -> List[unicode]
+        """Return up to *limit* names similar to *word*, best first."""
+        grams = trigrams(word)
+        counts = Counter(chain.from_iterable(self.postings.get(trigram, ())
+                                             for trigram in grams))
+        if not counts:
+            return []
+        # names sharing less than half the trigrams of the best one are not
+        # worth ranking; the rest are ranked by the Dice coefficient
+        least = max(counts.values()) / 2.0
+        size = len(grams)
+        sizes = self.sizes
+        candidates = heapq.nlargest(
+            self.shortlist, [i for i, n in counts.items() if n >= least],
+            key=lambda i: float(counts[i]) / (size + sizes[i]))
+
+        matcher = SequenceMatcher(None, b=word.lower())
+        scored = []
+        for i in candidates:
+            matcher.set_seq1(self.names[i].lower())
+            if matcher.quick_ratio() >= self.cutoff:
+                ratio = matcher.ratio()
+                if ratio >= self.cutoff:
+                    scored.append((-ratio, self.names[i]))
+        scored.sort()
+        return [name for ratio, name in scored if name != word][:limit]
+
+
+class Suggester(object):
+    """Suggestions for unresolved targets, memoized for one build."""
+
+    def __init__(self, names):
+        # type: (Iterable[unicode]) -> None
+        names = list(names)
+        # dotted targets are compared with full names, plain ones with the
+        # last component
+        self.fullnames = TrigramIndex(names)
+        self.shortnames = TrigramIndex(name.rpartition('.')[2] for name in names)
+        self.cache = {}  # type: Dict[unicode, List[unicode]]
+
+    def suggest(self, target):
+        # type: (unicode) -> List[unicode]
+        try:
+            return self.cache[target]
+        except KeyError:
+            if '.' in target:
+                result = self.fullnames.suggest(target)
+            else:
+                result = self.shortnames.suggest(target)
+            self.cache[target] = result
+            return result
+
+
+def get_dangling_warning(app, node):
+    # type: (Sphinx, nodes.Node) -> unicode
+    """Return the warning Sphinx gives about *node* if nothing resolves it,
+    with ``%(target)s`` for the target, or None if it gives none.
+    """
+    typ = node['reftype']
+    domain = app.env.domains.get(node.get('refdomain'))
+    warn = node.get('refwarn')
+    if app.config.nitpicky:
+        dtype = domain and '%s:%s' % (domain.name, typ) or typ
+        warn = (dtype, node['reftarget']) not in app.config.nitpick_ignore
+    if not warn:
+        return None
+    if domain and typ in domain.dangling_warnings:
+        return domain.dangling_warnings[typ]
+    elif node.get('refdomain', 'std') not in ('', 'std'):
+        return __('%s:%s reference target not found: %%(target)s') % (node['refdomain'], typ)
+    return __('%r reference target not found: %%(target)s') % typ
+
+
+def suggest_names(app, env, node, contnode):
+    # type: (Sphinx, BuildEnvironment, nodes.Node, nodes.Node) -> nodes.Node
+    if node['reftype'] != 'any' and node.get('refdomain') != 'gauss':
+        return None
+    message = get_dangling_warning(app, node)
+    if message is None and app.config.nitpicky:
+        # a target in nitpick_ignore
+        return None
+
+    suggester = getattr(app, '_gauss_suggester', None)
+    if suggester is None:
+        domain = env.get_domain('gauss')
+        suggester = app._gauss_suggester = Suggester(
+            list(domain.data['objects']) + list(domain.data['modules']))
+
+    target = node['reftarget']
+    if target.endswith('()'):
+        target = target[:-2]
+    suggestions = suggester.suggest(target)
+    if not suggestions:
+        return None
+    if message is None:
+        logger.warning(__('GAUSS reference target not found: %s; did you mean %s?'),
+                       target, ', '.join(suggestions),
+                       type='ref', subtype='gauss', location=node)
+        return None
+    logger.warning(__('%s; did you mean %s?'),
+                   message % {'target': node['reftarget']}, ', '.join(suggestions),
+                   type='ref', subtype=node['reftype'], location=node)
+    # left unresolved, as Sphinx would, without its warning
+    return contnode
+
+
+def forget_suggester(app, env, docnames):
+    # type: (Sphinx, BuildEnvironment, List[unicode]) -> None
+    # the object names may change while documents are read
+    app._gauss_suggester = None
+
+
+def setup(app):
+    # type: (Sphinx) -> Dict[unicode, Any]
+    app.connect('env-before-read-docs', forget_suggester)
+    app.connect('missing-reference', suggest_names)
+
+    return {
+        'version': 'builtin',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+    GAUSSSymbolDB
+    ~~~~~~~~~~~~~
+
+    Writes the objects and modules of the GAUSS domain, with their
+    signatures, to an SQLite database that tools can query without loading
+    the Sphinx environment.  Only the documents read during a build are
+    rewritten.
+
+    The database is ``<doctreedir>/gauss-symbols.db``, so that it is not
+    published with the HTML, unless ``gauss_symboldb`` names another
+    file, relative to the configuration directory; set it to ``False`` to
+    write none.
+
+    Run as a script to look names up; the lookup does not need Sphinx::
+
+        python GAUSSSymbolDB.py _build/doctrees/gauss-symbols.db dbOpen
+        python GAUSSSymbolDB.py --prefix _build/doctrees/gauss-symbols.db dbO
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+if False:
+    # For type annotation
+    from typing import Any, Dict, Iterable, List, Tuple  # NOQA
+    from docutils import nodes  # NOQA
+    from sphinx.application import Sphinx  # NOQA
+    from sphinx.builders import Builder  # NOQA
+    from sphinx.environment import BuildEnvironment  # NOQA
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE objects (
+    name TEXT PRIMARY KEY,
+    shortname TEXT NOT NULL,
+    objtype TEXT NOT NULL,
+    docname TEXT NOT NULL,
+    anchor TEXT NOT NULL,
+    uri TEXT,
+    signature TEXT
+);
+CREATE INDEX objects_shortname ON objects (shortname);
+CREATE INDEX objects_docname ON objects (docname);
+CREATE TABLE modules (
+    name TEXT PRIMARY KEY,
+    docname TEXT NOT NULL,
+    uri TEXT,
+    synopsis TEXT,
+    platform TEXT,
+    deprecated INTEGER NOT NULL
+);
+CREATE INDEX modules_docname ON modules (docname);
+"""
+
+# one past the largest character a name can start with a given prefix
+_PREFIX_END = u'\uffff'
+
+
+def connect(filename):
+    # type: (unicode) -> sqlite3.Connection
+    """Open the database *filename*, creating the schema when it is missing
+    or out of date.
+    """
+    conn = sqlite3.connect(filename)
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+    except sqlite3.DatabaseError:
+        row = None
+    if row is None or int(row[0]) != SCHEMA_VERSION:
+        conn.close()
+        if os.path.exists(filename):
+            os.remove(filename)
+        conn = sqlite3.connect(filename)
+        with conn:
+            conn.executescript(SCHEMA)
+            conn.execute("INSERT INTO meta VALUES ('schema', ?)",
+                         (str(SCHEMA_VERSION),))
+    return conn
+
+
+def _get_target_uri(builder, docname, anchor):
+    # type: (Builder, unicode, unicode) -> unicode
+    try:
+        from sphinx.errors import NoUri
+    except ImportError:
+        # Sphinx < 2.1, which has it in sphinx.environment only
+        from sphinx.environment import NoUri
+    try:
+        return builder.get_target_uri(docname) + '#' + anchor
+    except NoUri:
+        return None
+
+
+def _signature_text(node):
+    # type: (nodes.Node) -> unicode
+    """Render a signature node as plain text, e.g. ``{ a, b } = f(x[, y])``."""
+    from sphinx import addnodes
+    from GAUSSHTMLTranslator import desc_returnlist
+
+    if isinstance(node, (addnodes.desc_parameterlist, addnodes.desc_optional,
+                         desc_returnlist)):
+        text = ''
+        for child in node.children:
+            if isinstance(child, addnodes.desc_optional):
+                # the separator goes inside the brackets: f(a[, b])
+                text += '[' + (text and ', ') + _signature_text(child) + ']'
+            else:
+                text += (text and ', ') + _signature_text(child)
+        if isinstance(node, addnodes.desc_parameterlist):
+            return '(' + text + ')'
+        elif isinstance(node, addnodes.desc_optional):
+            return text
+        elif len(node.children) > 1:
+            return '{ ' + text + ' } = '
+        else:
+            return text + ' = '
+    elif isinstance(node, addnodes.desc_signature):
+        return ''.join(_signature_text(child) for child in node.children)
+    else:
+        return node.astext()
+
+
+def _get_signatures(env, docname):
+    # type: (BuildEnvironment, unicode) -> Dict[unicode, unicode]
+    """Return the signature text of the GAUSS objects described in
+    *docname*, keyed by full name.
+    """
+    from sphinx import addnodes
+
+    signatures = {}  # type: Dict[unicode, unicode]
+    doctree = env.get_doctree(docname)
+    for desc in doctree.traverse(addnodes.desc):
+        if desc.get('domain') != 'gauss':
+            continue
+        for signode in desc.traverse(addnodes.desc_signature):
+            for name in signode['ids']:
+                signatures.setdefault(name, _signature_text(signode))
+    return signatures
+
+
+def update(conn, env, builder, docnames):
+    # type: (sqlite3.Connection, BuildEnvironment, Builder, Iterable[unicode]) -> None
+    """Replace the rows of *docnames* with the current domain data."""
+    domain = env.get_domain('gauss')
+    data = domain.data
+    docnames = set(docnames)
+    with conn:
+        for docname in docnames:
+            conn.execute("DELETE FROM objects WHERE docname = ?", (docname,))
+            conn.execute("DELETE FROM modules WHERE docname = ?", (docname,))
+
+        for docid, docname in enumerate(data['docnames']):
+            if docname not in docnames or docname not in env.all_docs:
+                continue
+            names = data['docobjects'].get(docid)
+            if names:
+                signatures = _get_signatures(env, docname)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(name, name.rpartition('.')[2], objtype, docname, name,
+                      _get_target_uri(builder, docname, name),
+                      signatures.get(name))
+                     for name, objtype in ((name, domain.get_object(name)[1])
+                                           for name in names)
+                     if objtype != 'module'])  # modules have their own table
+            modnames = data['docmodules'].get(docid)
+            if modnames:
+                rows = []
+                for modname in modnames:
+                    synopsis, platform, deprecated = domain.get_module(modname)[1:]
+                    rows.append((modname, docname,
+                                 _get_target_uri(builder, docname, 'module-' + modname),
+                                 synopsis, platform, bool(deprecated)))
+                conn.executemany(
+                    "INSERT OR REPLACE INTO modules VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+
+def lookup(conn, name, prefix=False):
+    # type: (sqlite3.Connection, unicode, bool) -> List[Tuple]
+    """Return (name, objtype, signature, uri) of the objects and modules
+    whose full or short name is *name*, or starts with it if *prefix* is
+    true.
+    """
+    if prefix:
+        cond = "BETWEEN ? AND ?"
+        args = (name, name + _PREFIX_END)
+    else:
+        cond = "= ?"
+        args = (name,)
+    query = ("SELECT name, 'module', synopsis, uri FROM modules "
+             "WHERE name %(cond)s "
+             "UNION "
+             "SELECT name, objtype, signature, uri FROM objects "
+             "WHERE name %(cond)s OR shortname %(cond)s "
+             "ORDER BY name" % {'cond': cond})
+    return conn.execute(query, args * 3).fetchall()
+
+
+def note_docs_to_read(app, env, docnames):
+    # type: (Sphinx, BuildEnvironment, List[unicode]) -> None
+    app._gauss_symboldb_docnames = set(docnames)
+
+
+def get_dbfile(app):
+    # type: (Sphinx) -> unicode
+    if app.config.gauss_symboldb:
+        return os.path.join(app.confdir, app.config.gauss_symboldb)
+    return os.path.join(app.doctreedir, 'gauss-symbols.db')
+
+
+def write_symboldb(app, exception):
+    # type: (Sphinx, Exception) -> None
+    if exception is not None or app.config.gauss_symboldb is False:
+        return
+    env = app.env
+    conn = connect(get_dbfile(app))
+    try:
+        known = set(row[0] for row in conn.execute(
+            "SELECT docname FROM objects UNION SELECT docname FROM modules"))
+        if not known:
+            docnames = set(env.all_docs)
+        else:
+            docnames = getattr(app, '_gauss_symboldb_docnames', set())
+        # documents removed since the last build
+        docnames.update(known - set(env.all_docs))
+        update(conn, env, app.builder, docnames)
+    finally:
+        conn.close()
+
+
+def setup(app):
+    # type: (Sphinx) -> Dict[unicode, Any]
+    app.add_config_value('gauss_symboldb', None, '')
+    app.connect('env-before-read-docs', note_docs_to_read)
+    app.connect('build-finished', write_symboldb)
+
+    return {
+        'version': 'builtin',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
+
+
+def main(argv=None):
+    # type: (List[unicode]) -> int
+    parser = argparse.ArgumentParser(
+        description='Look up GAUSS objects in a symbol database written by '
+                    'the documentation build.')
+    parser.add_argument('database')
+    parser.add_argument('name', help='full or short object name')
+    parser.add_argument('-p', '--prefix', action='store_true',
+                        help='match names starting with NAME')
+    parser.add_argument('-t', '--time', action='store_true',
+                        help='report the time the query took')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.database):
+        parser.error('%s does not exist' % args.database)
+    start = time.time()
+    conn = sqlite3.connect(args.database)
+    rows = lookup(conn, args.name, args.prefix)
+    elapsed = time.time() - start
+    conn.close()
+
+    for name, objtype, signature, uri in rows:
+        print('\t'.join([name, objtype, signature or '', uri or '']))
+    if args.time:
+        print('%d results in %.2f ms' % (len(rows), elapsed * 1000),
+              file=sys.stderr)
+    return 0 if rows else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+"""
+    GAUSSViewcode
+    ~~~~~~~~~~~~~
+
+    Highlighted source pages for GAUSS files, like the ones
+    ``sphinx.ext.viewcode`` makes for Python modules::
+
+        gauss_viewcode_files = ['../examples/*.e', '../src/*.src']
+
+    Every file the patterns match, relative to the configuration
+    directory, gets a page under ``_gauss/`` with an anchor on each of its
+    procs.  The description of a GAUSS object named after one of the procs
+    links to it with ``[source]``, and the proc links back with
+    ``[docs]``.
+
+    The procs are found through the index `GAUSSAutodoc` keeps of the
+    files.  A page is only written again when its file, its ``[docs]``
+    links, the HTML configuration or the navigation around it changed:
+    the templates, or the global table of contents that sidebars show.
+    The files that need it are highlighted by the processes of
+    ``gauss_highlight_workers``.
+"""
+
+import glob
+import hashlib
+import json
+import os
+from html import escape
+
+from docutils import nodes
+
+import pygments
+import sphinx
+from sphinx import addnodes
+from sphinx.builders.html import SingleFileHTMLBuilder, StandaloneHTMLBuilder
+from sphinx.environment.adapters.toctree import TocTree
+from sphinx.locale import _, __
+from sphinx.util import logging
+from sphinx.util.nodes import make_refnode
+
+from GAUSSAutodoc import code_version, get_cachefile, get_procs
+from GAUSSParallelHighlight import highlight_sources
+
+if False:
+    # For type annotation
+    from typing import Any, Dict, Iterator, List, Set, Tuple  # NOQA
+    from sphinx.application import Sphinx  # NOQA
+    from sphinx.environment import BuildEnvironment  # NOQA
+
+logger = logging.getLogger(__name__)
+
+PAGES = '_gauss'
+
+_code_version = None  # type: unicode
+
+
+def is_enabled(app):
+    # type: (Sphinx) -> bool
+    return (bool(app.config.gauss_viewcode_files) and
+            isinstance(app.builder, StandaloneHTMLBuilder) and
+            not isinstance(app.builder, SingleFileHTMLBuilder) and
+            not app.builder.name.startswith('epub'))
+
+
+def get_index(app, refresh=False):
+    # type: (Sphinx, bool) -> Tuple[Dict[unicode, unicode], Dict[unicode, unicode]]
+    """Return the files with a page, by page name, and the page of every
+    proc, by name.
+    """
+    index = getattr(app, '_gauss_viewcode', None)
+    if index is not None and not refresh:
+        return index
+
+    filenames = set()  # type: Set[unicode]
+    for pattern in app.config.gauss_viewcode_files:
+        filenames.update(os.path.normpath(filename) for filename in
+                         glob.glob(os.path.join(app.confdir, pattern))
+                         if os.path.isfile(filename))
+    files = {}  # type: Dict[unicode, unicode]
+    names = {}  # type: Dict[unicode, unicode]
+    if filenames:
+        base = os.path.commonpath([os.path.dirname(filename) for filename in filenames])
+        for filename in sorted(filenames):
+            pagename = PAGES + '/' + os.path.relpath(filename, base).replace(os.sep, '/')
+            files[pagename] = filename
+        procs = get_procs(sorted(filenames), app.config.source_encoding,
+                          get_cachefile(app), app.config.gauss_autodoc_workers)
+        for pagename, filename in sorted(files.items()):
+            for proc in procs[filename]:
+                names.setdefault(proc['name'], pagename)
+    index = app._gauss_viewcode = files, names
+    return index
+
+
+def add_source_links(app, doctree):
+    # type: (Sphinx, nodes.Node) -> None
+    if not is_enabled(app):
+        return
+    env = app.env
+    files, names = get_index(app)
+    links = {}  # type: Dict[unicode, unicode]
+    for objnode in doctree.traverse(addnodes.desc):
+        if objnode.get('domain') != 'gauss':
+            continue
+        for signode in objnode:
+            if not isinstance(signode, addnodes.desc_signature):
+                continue
+            fullname = signode.get('fullname')
+            if not fullname:
+                continue
+            pagename = links[fullname] = names.get(fullname)
+            if pagename is None:
+                continue
+            # read again when the file changes, which also writes its page
+            env.note_dependency(files[pagename])
+            inline = nodes.inline('', _('[source]'), classes=['viewcode-link'])
+            signode += addnodes.pending_xref('', inline, reftype='gauss-viewcode',
+                                             refdomain='std', refexplicit=False,
+                                             reftarget=pagename, refid=fullname,
+                                             refdoc=env.docname)
+    if links:
+        env.gauss_viewcode_links[env.docname] = links
+
+
+def init_links(app, env, docnames):
+    # type: (Sphinx, BuildEnvironment, List[unicode]) -> None
+    if not hasattr(env, 'gauss_viewcode_links'):
+        env.gauss_viewcode_links = {}
+
+
+def purge_links(app, env, docname):
+    # type: (Sphinx, BuildEnvironment, unicode) -> None
+    getattr(env, 'gauss_viewcode_links', {}).pop(docname, None)
+
+
+def merge_links(app, env, docnames, other):
+    # type: (Sphinx, BuildEnvironment, Set[unicode], BuildEnvironment) -> None
+    for docname in docnames:
+        if docname in other.gauss_viewcode_links:
+            env.gauss_viewcode_links[docname] = other.gauss_viewcode_links[docname]
+
+
+def get_outdated(app, env, added, changed, removed):
+    # type: (Sphinx, BuildEnvironment, Set[unicode], Set[unicode], Set[unicode]) -> List[unicode]
+    """Return the documents whose ``[source]`` links would go elsewhere."""
+    # Sphinx 1.8 passes the builder as env
+    env = app.env
+    links = getattr(env, 'gauss_viewcode_links', {})
+    if not links and not is_enabled(app):
+        return []
+    names = get_index(app, refresh=True)[1] if is_enabled(app) else {}
+    return [docname for docname, targets in links.items()
+            if docname in env.all_docs and docname not in changed and
+            any(names.get(name) != pagename for name, pagename in targets.items())]
+
+
+def missing_reference(app, env, node, contnode):
+    # type: (Sphinx, BuildEnvironment, nodes.Node, nodes.Node) -> nodes.Node
+    if node['reftype'] == 'gauss-viewcode':
+        return make_refnode(app.builder, node['refdoc'], node['reftarget'],
+                            node['refid'], contnode)
+    return None
+
+
+def get_keyfile(app):
+    # type: (Sphinx) -> unicode
+    return os.path.join(app.doctreedir, 'gauss-viewcode.json')
+
+
+def page_key(app, *parts):
+    # type: (Sphinx, Any) -> unicode
+    """Return a hash of what the output of a page depends on."""
+    global _code_version
+    if _code_version is None:
+        with open(__file__, 'rb') as f:
+            _code_version = hashlib.sha1(f.read() + code_version().encode()).hexdigest()
+    build_info = app.builder.build_info
+    data = [app.outdir, build_info.config_hash, build_info.tags_hash,
+            sphinx.__version__, pygments.__version__, _code_version] + list(parts)
+    return hashlib.sha1(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def navigation_key(app):
+    # type: (Sphinx) -> unicode
+    """Return a hash of the navigation the templates put around every
+    page: the global table of contents, fully expanded, and the time the
+    newest template changed, which Sphinx checks its own pages against.
+    """
+    builder = app.builder
+    toctree = TocTree(app.env).get_toctree_for(app.config.master_doc, builder,
+                                               collapse=False, includehidden=True)
+    mtime = builder.templates.newest_template_mtime() if builder.templates else 0
+    data = [mtime, toctree.pformat() if toctree is not None else None]
+    return hashlib.sha1(json.dumps(data).encode('utf-8')).hexdigest()
+
+
+def render(app, pagename, html, text, procs, backlinks):
+    # type: (Sphinx, unicode, unicode, unicode, List[Dict[unicode, Any]], Dict[unicode, unicode]) -> unicode  # NOQA
+    """Return *html*, the highlighted *text*, with the procs of *text* in
+    anchored blocks.
+    """
+    lines = html.splitlines()
+    # split off wrap markup from the first line of the actual code
+    before, after = lines[0].split('<pre>', 1)
+    lines[0:1] = [before + '<pre>', after]
+    # the lexer strips leading blank lines
+    offset = len(text[:len(text) - len(text.lstrip('\r\n'))].replace('\r\n', '\n'))
+    maxindex = len(lines) - 1
+    seen = set()  # type: Set[unicode]
+    for proc in procs:
+        name = proc['name']
+        start = proc['line'] - offset
+        if name in seen or start < 1:
+            continue
+        seen.add(name)
+        end = start + proc['lines'] - 1
+        backlink = ''
+        if name in backlinks:
+            uri = app.builder.get_relative_uri(pagename, backlinks[name])
+            backlink = '<a class="viewcode-back" href="%s#%s">%s</a>' % (
+                escape(uri), escape(name), _('[docs]'))
+        lines[start] = ('<div class="viewcode-block" id="%s">%s' %
+                        (escape(name), backlink) + lines[start])
+        lines[min(end, maxindex)] += '</div>'
+    return '\n'.join(lines)
+
+
+def collect_pages(app):
+    # type: (Sphinx) -> Iterator[Tuple[unicode, Dict[unicode, Any], unicode]]
+    if not is_enabled(app):
+        return
+    files = get_index(app)[0]
+    domain = app.env.get_domain('gauss')
+    encoding = app.config.source_encoding
+    procs = get_procs(sorted(files.values()), encoding, get_cachefile(app),
+                      app.config.gauss_autodoc_workers)
+    try:
+        with open(get_keyfile(app), encoding='utf-8') as f:
+            stored = json.load(f)
+    except (IOError, OSError, ValueError):
+        stored = {}
+    keys = app._gauss_viewcode_keys = {}  # type: Dict[unicode, unicode]
+    navigation = navigation_key(app)
+
+    pages = []  # type: List[Tuple[unicode, unicode, List[Dict[unicode, Any]], Dict[unicode, unicode]]]  # NOQA
+    for pagename, filename in sorted(files.items()):
+        with open(filename, 'rb') as f:
+            content = f.read()
+        backlinks = {}  # type: Dict[unicode, unicode]
+        for proc in procs[filename]:
+            found = domain.get_object(proc['name'])
+            if found is not None:
+                backlinks[proc['name']] = found[0]
+        key = keys[pagename] = page_key(app, navigation, hashlib.sha1(content).hexdigest(),
+                                        backlinks)
+        if (stored.get(pagename) == key and
+                os.path.exists(app.builder.get_outfilename(pagename))):
+            continue
+        text = content.decode(encoding)
+        # the number of lines of each proc, from its byte offsets
+        fileprocs = [dict(proc, lines=1 + content.count(b'\n', proc['start'], proc['end'] - 1))
+                     for proc in procs[filename]]
+        pages.append((pagename, text, fileprocs, backlinks))
+
+    logger.info(__('GAUSS source pages: %d to write, %d unchanged'),
+                len(pages), len(files) - len(pages))
+    highlighter = app.builder.highlighter
+    jobs = [(text, 'gauss', None, False, {'linenos': False})
+            for pagename, text, fileprocs, backlinks in pages]
+    for (pagename, text, fileprocs, backlinks), html in zip(pages,
+                                                            highlight_sources(app, jobs)):
+        if html is None:
+            html = highlighter.highlight_block(text, 'gauss', linenos=False)
+        relname = pagename[len(PAGES) + 1:]
+        context = {
+            'parents': [{'link': app.builder.get_relative_uri(pagename, PAGES + '/index'),
+                         'title': _('GAUSS source')}],
+            'title': relname,
+            'body': (_('<h1>Source code for %s</h1>') % escape(relname) +
+                     render(app, pagename, html, text, fileprocs, backlinks)),
+        }
+        yield pagename, context, 'page.html'
+
+    pagename = PAGES + '/index'
+    key = keys[pagename] = page_key(app, navigation, sorted(files))
+    if stored.get(pagename) == key and os.path.exists(app.builder.get_outfilename(pagename)):
+        return
+    html = ['<ul>']
+    for name in sorted(files):
+        html.append('<li><a href="%s">%s</a></li>' % (
+            escape(app.builder.get_relative_uri(pagename, name)),
+            escape(name[len(PAGES) + 1:])))
+    html.append('</ul>')
+    context = {
+        'title': _('Overview: GAUSS source'),
+        'body': _('<h1>All GAUSS source files</h1>') + '\n'.join(html),
+    }
+    yield pagename, context, 'page.html'
+
+
+def save_keys(app, exception):
+    # type: (Sphinx, Exception) -> None
+    keys = getattr(app, '_gauss_viewcode_keys', None)
+    if exception is not None or keys is None:
+        return
+    with open(get_keyfile(app), 'w', encoding='utf-8') as f:
+        json.dump(keys, f, indent=1, sort_keys=True)
+
+
+def setup(app):
+    # type: (Sphinx) -> Dict[unicode, Any]
+    app.add_config_value('gauss_viewcode_files', [], 'env')
+    app.connect('env-before-read-docs', init_links)
+    app.connect('env-get-outdated', get_outdated)
+    app.connect('env-purge-doc', purge_links)
+    app.connect('env-merge-info', merge_links)
+    app.connect('doctree-read', add_source_links)
+    app.connect('missing-reference', missing_reference)
+    app.connect('html-collect-pages', collect_pages)
+    app.connect('build-finished', save_keys)
+
+    return {
+        'version': 'builtin',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
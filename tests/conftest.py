@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+    Fixtures for the tests of the extensions in ``docs/util``, which are
+    imported by module name as ``docs/conf.py`` does.
+"""
+
+import os
+import sys
+from io import StringIO
+
+import pytest
+
+UTIL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                    'docs', 'util')
+sys.path.insert(0, UTIL)
+
+CONF = """\
+import sys
+sys.path.insert(0, %r)
+
+master_doc = 'index'
+primary_domain = 'gauss'
+highlight_language = 'gauss'
+%s
+
+def setup(app):
+    for name in %r:
+        __import__(name).setup(app)
+
+    from GAUSSHTMLTranslator import GAUSSHTMLTranslator
+    app.set_translator('html', GAUSSHTMLTranslator, override=True)
+"""
+
+
+@pytest.fixture
+def make_project(tmp_path):
+    """Return a function writing a project of the given documents to
+    *tmp_path*, with a configuration setting up the given extensions.
+    """
+    def make_project(docs, extensions=('GAUSSDomain',), conf=''):
+        srcdir = tmp_path / 'src'
+        srcdir.mkdir(exist_ok=True)
+        (srcdir / 'conf.py').write_text(CONF % (UTIL, conf, list(extensions)),
+                                        encoding='utf-8')
+        for name, text in docs.items():
+            path = srcdir / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(text, encoding='utf-8')
+        return srcdir
+    return make_project
+
+
+@pytest.fixture
+def build():
+    """Return a function building a project and returning the application
+    and its warnings.
+    """
+    from sphinx.application import Sphinx
+    from sphinx.util.console import strip_colors
+    from sphinx.util.docutils import docutils_namespace
+
+    def build(srcdir, outdir, buildername='html', parallel=0, freshenv=False,
+              confoverrides=None):
+        warning = StringIO()
+        # every application registers the nodes and directives anew
+        with docutils_namespace():
+            app = Sphinx(str(srcdir), str(srcdir), str(outdir),
+                         os.path.join(str(outdir), '.doctrees'), buildername,
+                         confoverrides or {}, status=None, warning=warning,
+                         freshenv=freshenv, parallel=parallel)
+            app.build()
+        return app, strip_colors(warning.getvalue())
+    return build
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+    Writes ``lexer_golden.json``, the tokens `GAUSSLexer.get_tokens` gives
+    for the sources of ``lexer-corpus`` and the pathological inputs of
+    `GAUSSLexerBench`, which ``test_lexer.py`` compares the lexer with.
+    The tokens are those of the lexer as it was before it was optimized::
+
+        git show 24fefe9:docs/util/GAUSSLexer.py > /tmp/GAUSSLexer.py
+        python tests/make_lexer_golden.py /tmp/GAUSSLexer.py
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import sys
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(TESTS), 'docs', 'util'))
+
+from GAUSSLexerBench import CORPUS, PATHOLOGICAL  # NOQA
+
+GOLDEN = os.path.join(TESTS, 'lexer_golden.json')
+
+#: the size of the pathological inputs
+SIZE = 2000
+
+
+def golden_cases():
+    """Return the name and text of every case."""
+    cases = []
+    for filename in sorted(os.listdir(CORPUS)):
+        if filename.endswith(('.src', '.g', '.e')):
+            with open(os.path.join(CORPUS, filename), encoding='utf-8') as f:
+                cases.append((filename, f.read()))
+    for name, prefix, text, suffix in PATHOLOGICAL:
+        cases.append((name, prefix + text * (SIZE // len(text)) + suffix))
+    return cases
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('module', help='the GAUSSLexer.py to take the tokens of')
+    args = parser.parse_args(argv)
+
+    spec = importlib.util.spec_from_file_location('GAUSSLexer_golden', args.module)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    lexer = module.GAUSSLexer()
+    golden = {}
+    for name, text in golden_cases():
+        golden[name] = [[str(ttype)[len('Token.'):], value]
+                        for ttype, value in lexer.get_tokens(text)]
+    # a token a line
+    with open(GOLDEN, 'w', encoding='utf-8') as f:
+        f.write('{\n')
+        for i, name in enumerate(sorted(golden)):
+            f.write('%s: [\n' % json.dumps(name))
+            f.write(',\n'.join(json.dumps(token, ensure_ascii=False)
+                               for token in golden[name]))
+            f.write('\n]%s\n' % (',' if i < len(golden) - 1 else ''))
+        f.write('}\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+    Tests of the procs `GAUSSAutodoc` finds in GAUSS sources and documents.
+"""
+
+import os
+
+from GAUSSAutodoc import get_signature, parse_procs
+
+SOURCE = '''\
+/*
+** The sum.
+*/
+proc (1) = add(a, b);
+    retp(a + b);
+endp;
+
+// proc (1) = commented(x);
+//     retp(x);
+// endp;
+
+/* proc (1) = hidden(x);
+    retp(x);
+endp; */
+
+#if 0
+proc (1) = dead(x);
+    retp(x);
+endp;
+#endif
+
+s = "proc (1) = quoted(x);";
+
+// Upper case.
+PROC (2) = UPPER(X, Y);
+    RETP(X, Y);
+ENDP;
+
+proc single(x);
+    retp(x + 1);
+endp;
+
+proc none();
+endp;
+
+proc (2) = named(x, { a, b });
+    local lo, hi;
+    if x;
+        retp(x[1], hi);
+    endif;
+    retp(lo, hi[1]);
+endp;
+
+proc (2) = bad(x);
+    retp(x);
+endp;
+'''
+
+
+def test_parse_procs():
+    procs = parse_procs(SOURCE)
+    assert [(proc['name'], proc['line'], proc['returns'], proc['args'], proc['retps'])
+            for proc in procs] == [
+        ('add', 4, 1, ['a', 'b'], [[5, [None]]]),
+        ('UPPER', 25, 2, ['X', 'Y'], [[26, ['X', 'Y']]]),
+        ('single', 29, None, ['x'], [[30, [None]]]),
+        ('none', 33, None, [], []),
+        ('named', 36, 2, ['x', '{ a, b }'], [[39, [None, 'hi']], [41, ['lo', None]]]),
+        ('bad', 44, 2, ['x'], [[45, ['x']]]),
+    ]
+    assert [proc['comment'] for proc in procs] == ['The sum.', 'Upper case.', '', '', '', '']
+    # from the line of proc to the line of endp
+    assert [SOURCE[proc['start']:proc['end']] for proc in procs[1:4]] == [
+        'PROC (2) = UPPER(X, Y);\n    RETP(X, Y);\nENDP;\n',
+        'proc single(x);\n    retp(x + 1);\nendp;\n',
+        'proc none();\nendp;\n',
+    ]
+
+
+def test_signature():
+    assert [get_signature(proc) for proc in parse_procs(SOURCE)] == [
+        'out = add(a, b)',
+        '{ X, Y } = UPPER(X, Y)',
+        # a single return unless the proc says otherwise
+        'out = single(x)',
+        'out = none()',
+        # the names of the returns from whichever retp names them
+        '{ lo, hi } = named(x, { a, b })',
+        '{ out1, out2 } = bad(x)',
+    ]
+
+
+def test_autogauss(make_project, build, tmp_path):
+    srcdir = make_project({'index.rst': 'Index\n=====\n\n.. autogauss:: src/util.src\n',
+                           'src/util.src': SOURCE},
+                          ['GAUSSDomain', 'GAUSSAutodoc'])
+    app, warnings = build(srcdir, tmp_path / 'out')
+    # the retp of a proc returning fewer values than it declares
+    assert warnings.splitlines() == [
+        '%s:45: WARNING: proc bad declares 2 returns, but its retp returns 1'
+        % os.path.join(str(srcdir), 'src', 'util.src')]
+
+    names = [name for name, dispname, objtype, docname, anchor, priority
+             in app.env.get_domain('gauss').get_objects()]
+    assert sorted(names) == ['UPPER', 'add', 'bad', 'named', 'none', 'single']
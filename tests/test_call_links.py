@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+    Tests of the links `GAUSSCallLinks` puts on the procs called in GAUSS
+    code.
+"""
+
+import os
+import re
+
+import pytest
+
+EXTENSIONS = ['GAUSSDomain', 'GAUSSHTMLFormatter', 'GAUSSCallLinks']
+
+# the lexer, as ``docs/conf.py`` adds it
+CONF = """\
+from sphinx.highlighting import lexers
+from GAUSSLexer import GAUSSLexer
+lexers['gauss'] = GAUSSLexer()
+"""
+
+CODE = '\n'.join([
+    '.. code-block:: gauss', '',
+    '   x = myProc(1) + MYPROC(2);',
+    '   y = undocumented(x);',
+    '   db = dbOpen("db");',
+    '   dbClose(db);',
+    '   z = qualified(x);', '',
+])
+
+DOCS = {
+    'index.rst': '\n'.join([
+        'Index', '=====', '',
+        '.. toctree::', '', '   sub/page', '',
+        '.. gauss:function:: myProc(x)', '',
+        '.. gauss:function:: dbClose(db)', '',
+        '.. gauss:module:: mod', '',
+        '.. gauss:function:: qualified(x)', '',
+        CODE,
+    ]),
+    'sub/page.rst': 'Page\n====\n\n' + CODE,
+}
+
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def links(html):
+    """Return the targets and names of the links in the code of *html*."""
+    return re.findall(r'<a class="reference internal" href="([^"]*)">'
+                      r'<span class="n[fb]">(\w+)</span></a>', html)
+
+
+@pytest.mark.parametrize('compact', [True, False])
+def test_links(make_project, build, tmp_path, compact):
+    srcdir = make_project(DOCS, EXTENSIONS, conf=CONF)
+    app, warnings = build(srcdir, tmp_path / 'out',
+                          confoverrides={'gauss_compact_highlighting': compact})
+    assert 'WARNING' not in warnings
+
+    for filename, uri in [('index.html', '#'),
+                          (os.path.join('sub', 'page.html'), '../index.html#')]:
+        html = read(os.path.join(app.outdir, filename))
+        # the documented procs, whatever their case, and builtins that are
+        # documented; not undocumented procs and builtins
+        assert links(html) == [
+            (uri + 'myProc', 'myProc'),
+            (uri + 'myProc', 'MYPROC'),
+            (uri + 'dbClose', 'dbClose'),
+            (uri + 'mod.qualified', 'qualified'),
+        ]
+        assert '<span class="nf">undocumented</span>' in html
+        assert '<span class="nb">dbOpen</span>' in html
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+    Tests of the per-document indices of the GAUSS domain data, which
+    ``clear_doc`` and ``merge_domaindata`` keep up to date, and of the
+    upgrade of data pickled in an older layout.
+"""
+
+import os
+import pickle
+
+import GAUSSDomain
+
+DOCS = 8
+
+
+def make_docs(version):
+    """Return documents describing a module and some procs each, which
+    refer to the procs of the other documents.  Going from *version* 0 to
+    1 renames a proc in every document and moves one to another.
+    """
+    docs = {'index.rst': 'Index\n=====\n\n.. toctree::\n\n' +
+            ''.join('   d%d\n' % i for i in range(DOCS))}
+    for i in range(DOCS):
+        names = ['proc%d_%d' % (i, j) for j in range(4)]
+        if version:
+            names[0] += 'b'
+        if version and i == 2:
+            names.append('moved')
+        elif not version and i == 5:
+            names.append('moved')
+        lines = ['d%d' % i, '==', '']
+        if not (version and i == 3):
+            lines += ['.. gauss:module:: mod%d' % i, '']
+        for j, name in enumerate(names):
+            lines += ['.. gauss:function:: %s(x)' % name, '',
+                      '   See :gauss:func:`proc%d_%d` and :gauss:func:`moved`.'
+                      % ((i + j + 1) % DOCS, j), '']
+        docs['d%d.rst' % i] = '\n'.join(lines)
+    return docs
+
+
+def normalize(data):
+    """Return the domain data with docnames and objtypes spelled out, so
+    that the data of different builds can be compared.
+    """
+    docnames, objtypes = data['docnames'], data['objtypes']
+    return {
+        'objects': dict((name, (docnames[code >> 8], objtypes[code & 0xff]))
+                        for name, code in data['objects'].items()),
+        'modules': dict((name, (docnames[info[0]],) + tuple(info[1:]))
+                        for name, info in data['modules'].items()),
+        'docobjects': dict((docnames[docid], names)
+                           for docid, names in data['docobjects'].items() if names),
+        'docmodules': dict((docnames[docid], names)
+                           for docid, names in data['docmodules'].items() if names),
+        'docxrefs': dict((docnames[docid], targets)
+                         for docid, targets in data['docxrefs'].items() if targets),
+        'xrefdeps': dict((target, set(docnames[docid] for docid in docids))
+                         for target, docids in data['xrefdeps'].items() if docids),
+    }
+
+
+def test_parallel_read(make_project, build, tmp_path, monkeypatch):
+    merged = []
+    merge_domaindata = GAUSSDomain.GAUSSDomain.merge_domaindata
+
+    def counting_merge(self, docnames, otherdata):
+        merged.extend(docnames)
+        merge_domaindata(self, docnames, otherdata)
+
+    monkeypatch.setattr(GAUSSDomain.GAUSSDomain, 'merge_domaindata', counting_merge)
+
+    srcdir = make_project(make_docs(0))
+    serial = build(srcdir, tmp_path / 'serial', 'dummy')[0]
+    parallel = build(srcdir, tmp_path / 'parallel', 'dummy', parallel=2)[0]
+    assert set(merged) == set(['index'] + ['d%d' % i for i in range(DOCS)])
+    expected = normalize(serial.env.domaindata['gauss'])
+    assert normalize(parallel.env.domaindata['gauss']) == expected
+    assert expected['objects']['mod5.moved'] == ('d5', 'function')
+    assert expected['docmodules']['d3'] == {'mod3'}
+
+    # read every document again, each process clearing what it had before
+    make_project(make_docs(1))
+    del merged[:]
+    serial = build(srcdir, tmp_path / 'serial', 'dummy')[0]
+    parallel = build(srcdir, tmp_path / 'parallel', 'dummy', parallel=2)[0]
+    assert set(merged) >= set('d%d' % i for i in range(DOCS))
+    fresh = build(srcdir, tmp_path / 'fresh', 'dummy')[0]
+    expected = normalize(fresh.env.domaindata['gauss'])
+    assert normalize(serial.env.domaindata['gauss']) == expected
+    assert normalize(parallel.env.domaindata['gauss']) == expected
+    assert 'mod0.proc0_0' not in expected['objects']
+    assert expected['objects']['mod0.proc0_0b'] == ('d0', 'function')
+    assert expected['objects']['proc3_1'] == ('d3', 'function')
+    assert 'mod3' not in expected['modules']
+    assert 'mod5.moved' not in expected['objects']
+    assert expected['objects']['mod2.moved'] == ('d2', 'function')
+
+
+def test_clear_doc(make_project, build, tmp_path):
+    app = build(make_project(make_docs(0)), tmp_path / 'out', 'dummy')[0]
+    domain = app.env.get_domain('gauss')
+    domain.clear_doc('d3')
+    data = normalize(domain.data)
+    assert not any(docname == 'd3' for docname, objtype in data['objects'].values())
+    assert 'mod3' not in data['modules']
+    assert 'd3' not in data['docobjects'] and 'd3' not in data['docxrefs']
+    assert all('d3' not in docnames for docnames in data['xrefdeps'].values())
+    assert data['objects']['mod2.proc2_0'] == ('d2', 'function')
+
+
+def test_signature_cache(make_project, build, tmp_path):
+    GAUSSDomain._signature_cache['stale(x)'] = None
+    srcdir = make_project({'index.rst': '.. gauss:function:: { a, b } = f(x[, y])\n'})
+    app = build(srcdir, tmp_path / 'out', 'dummy')[0]
+    assert 'stale(x)' not in GAUSSDomain._signature_cache
+    assert app.env.get_domain('gauss').get_object('f') == ('index', 'function')
+    returns, name_prefix, name, arglist = GAUSSDomain._signature_cache['{ a, b } = f(x[, y])']
+    assert (returns, name_prefix, name) == (['a', 'b'], None, 'f')
+
+
+def downgrade(data):
+    """Return *data* in the version 3 layout, which spelled out docnames
+    and objtypes in every entry and kept the short name index.
+    """
+    old = normalize(data)
+    old['shortnames'] = {}
+    for name in old['objects']:
+        old['shortnames'].setdefault(name.rpartition('.')[2], set()).add(name)
+    old['version'] = 3
+    return old
+
+
+def rewrite_domaindata(app, function):
+    filename = os.path.join(app.doctreedir, 'environment.pickle')
+    with open(filename, 'rb') as f:
+        env = pickle.load(f)
+    env.domaindata['gauss'] = function(env.domaindata['gauss'])
+    with open(filename, 'wb') as f:
+        pickle.dump(env, f, pickle.HIGHEST_PROTOCOL)
+    # to tell the documents read again from the others
+    for docname in env.all_docs:
+        os.utime(os.path.join(app.doctreedir, docname + '.doctree'), (0, 0))
+
+
+def read_again(app):
+    return sorted(docname for docname in app.env.all_docs if os.path.getmtime(
+        os.path.join(app.doctreedir, docname + '.doctree')) != 0)
+
+
+def test_upgrade_data(make_project, build, tmp_path):
+    docs = make_docs(0)
+    srcdir = make_project(docs)
+    app = build(srcdir, tmp_path / 'out')[0]
+    expected = normalize(app.env.domaindata['gauss'])
+
+    rewrite_domaindata(app, downgrade)
+    (srcdir / 'd1.rst').write_text(docs['d1.rst'] + '\nAnd :gauss:func:`mod5.moved`.\n',
+                                   encoding='utf-8')
+    app, warnings = build(srcdir, tmp_path / 'out')
+    assert 'WARNING' not in warnings
+    expected['docxrefs']['d1'].add('mod5.moved')
+    expected['xrefdeps']['mod5.moved'] = {'d1'}
+    # upgraded in place, so the build stays incremental
+    assert read_again(app) == ['d1']
+    data = app.env.domaindata['gauss']
+    assert data['version'] == 4 and 'shortnames' not in data
+    assert sorted(data['docnames']) == ['d%d' % i for i in range(DOCS)]
+    assert sorted(data['objtypes']) == ['function', 'module']
+    assert all(isinstance(code, int) for code in data['objects'].values())
+    assert normalize(data) == expected
+    domain = app.env.get_domain('gauss')
+    assert domain.get_object('mod5.moved') == ('d5', 'function')
+    assert domain.get_module('mod3') == ('d3', '', '', False)
+    assert [match[0] for match in domain.find_obj(app.env, None, None, 'proc2_1',
+                                                  'func', 1)] == ['mod2.proc2_1']
+    with open(os.path.join(app.outdir, 'd1.html'), encoding='utf-8') as f:
+        assert 'href="d5.html#mod5.moved"' in f.read()
+
+    # older data is thrown away with the rest of the environment
+    def version2(data):
+        data = downgrade(data)
+        for key in ('xrefdeps', 'docxrefs'):
+            del data[key]
+        data['version'] = 2
+        return data
+
+    rewrite_domaindata(app, version2)
+    app = build(srcdir, tmp_path / 'out')[0]
+    assert read_again(app) == sorted(app.env.all_docs)
+    assert normalize(app.env.domaindata['gauss']) == expected
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+    Tests of the highlighted code blocks `GAUSSHighlightCache` keeps from
+    one build to the next.
+"""
+
+import os
+import sqlite3
+
+EXTENSIONS = ['GAUSSDomain', 'GAUSSHighlightCache']
+
+# the lexer, as ``docs/conf.py`` adds it
+CONF = """\
+from sphinx.highlighting import lexers
+from GAUSSLexer import GAUSSLexer
+lexers['gauss'] = GAUSSLexer()
+"""
+
+#: the number of GAUSS blocks of each page
+BLOCKS = 4
+
+
+def page(n):
+    lines = ['Page %d' % n, '=' * len('Page %d' % n), '']
+    for i in range(BLOCKS):
+        lines += ['.. code-block:: gauss', '',
+                  '   proc (1) = f%d_%d(x);' % (n, i),
+                  '       // block %d of page %d' % (i, n),
+                  '       retp(x * %d + "%s");' % (i, 'text' * i),
+                  '   endp;', '']
+    # not cached, as Sphinx adds the raiseonerror filter to its lexer
+    lines += ['.. code-block:: python', '', '   x = %d' % n, '']
+    return '\n'.join(lines)
+
+
+DOCS = dict(('page%d.rst' % n, page(n)) for n in range(3))
+DOCS['index.rst'] = 'Index\n=====\n\n.. toctree::\n\n   page0\n   page1\n   page2\n'
+
+#: the number of GAUSS blocks
+COUNT = BLOCKS * 3
+
+
+def stats(outdir):
+    """Return the hits and misses of the last build, and the number and
+    size of the entries in the cache.
+    """
+    conn = sqlite3.connect(os.path.join(str(outdir), '.doctrees', 'gauss-highlight.db'))
+    try:
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        count, size = conn.execute("SELECT COUNT(*), TOTAL(size) FROM entries").fetchone()
+    finally:
+        conn.close()
+    return meta['hits'], meta['misses'], count, size
+
+
+def pages(outdir):
+    """Return the contents of the pages of *outdir*."""
+    contents = {}
+    for name in sorted(os.listdir(str(outdir))):
+        if name.endswith('.html'):
+            with open(os.path.join(str(outdir), name), 'rb') as f:
+                contents[name] = f.read()
+    return contents
+
+
+def test_cache(make_project, build, tmp_path):
+    srcdir = make_project(DOCS, EXTENSIONS, conf=CONF)
+    # without the cache
+    build(srcdir, tmp_path / 'off', confoverrides={'gauss_highlight_cache_size': 0})
+    assert not os.path.exists(str(tmp_path / 'off' / '.doctrees' / 'gauss-highlight.db'))
+    expected = pages(tmp_path / 'off')
+    assert 'f2_3' in expected['page2.html'].decode('utf-8')
+
+    # a cold build, then a warm one writing every page again
+    outdir = tmp_path / 'out'
+    build(srcdir, outdir)
+    hits, misses, count, size = stats(outdir)
+    assert (hits, misses, count) == (0, COUNT, COUNT)
+    assert pages(outdir) == expected
+    build(srcdir, outdir, freshenv=True)
+    assert stats(outdir) == (COUNT, 0, COUNT, size)
+    assert pages(outdir) == expected
+
+    # a cache too small for every block evicts the entries used least
+    # recently, here those of the pages not written again
+    small = {'gauss_highlight_cache_size': size // 2}
+    (srcdir / 'page0.rst').write_text(DOCS['page0.rst'], encoding='utf-8')
+    build(srcdir, outdir, confoverrides=small)
+    hits, misses, count, size = stats(outdir)
+    assert (hits, misses) == (BLOCKS, 0)
+    assert BLOCKS <= count < COUNT and size <= small['gauss_highlight_cache_size']
+    (srcdir / 'page0.rst').write_text(DOCS['page0.rst'], encoding='utf-8')
+    build(srcdir, outdir, confoverrides=small)
+    assert stats(outdir)[:2] == (BLOCKS, 0)
+    # the next build highlights the evicted blocks again
+    build(srcdir, outdir, freshenv=True, confoverrides=small)
+    assert stats(outdir)[:2] == (count, COUNT - count)
+    assert pages(outdir) == expected
+
+    # a changed block misses, the others still hit
+    build(srcdir, outdir, freshenv=True)
+    (srcdir / 'page1.rst').write_text(DOCS['page1.rst'].replace('block 0', 'block zero'),
+                                      encoding='utf-8')
+    build(srcdir, outdir)
+    assert stats(outdir)[:3] == (BLOCKS - 1, 1, COUNT + 1)
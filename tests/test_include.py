@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+    Tests of the procs the ``gauss-include`` directive of `GAUSSInclude`
+    includes.
+"""
+
+from docutils import nodes
+
+# the proc f, after a commented out f and one in #if 0, on lines 14 to 17
+SOURCE = '''\
+// Fonctions d'édition.
+// proc (1) = f(x);
+//     retp(x);
+// endp;
+
+/* proc (1) = f(x);
+endp; */
+
+#if 0
+proc (1) = f(x);
+    retp("ancien");
+#endif
+
+proc (1) = f(x);
+    // élevé au carré
+    retp(x^2);
+endp;
+
+proc g();
+endp;
+'''
+
+FILES = {
+    'utf8.src': SOURCE.encode('utf-8'),
+    'bom.src': b'\xef\xbb\xbf' + SOURCE.encode('utf-8'),
+    'latin1.src': SOURCE.encode('latin-1'),
+    'crlf.src': SOURCE.replace('\n', '\r\n').encode('utf-8'),
+}
+
+# the lexer, as ``docs/conf.py`` adds it
+CONF = """\
+from sphinx.highlighting import lexers
+from GAUSSLexer import GAUSSLexer
+lexers['gauss'] = GAUSSLexer()
+"""
+
+OPTIONS = {'latin1.src': ['   :encoding: latin-1']}
+
+
+def test_proc(make_project, build, tmp_path):
+    lines = ['Index', '=====', '']
+    for name in sorted(FILES):
+        for directive, option in [('gauss-include', ':proc: f'),
+                                  ('literalinclude', ':lines: 14-17')]:
+            lines += (['.. %s:: %s' % (directive, name), '   ' + option,
+                       '   :lineno-match:'] + OPTIONS.get(name, []) + [''])
+    srcdir = make_project({'index.rst': '\n'.join(lines)},
+                          ['GAUSSDomain', 'GAUSSAutodoc', 'GAUSSInclude'], conf=CONF)
+    for name, content in FILES.items():
+        (srcdir / name).write_bytes(content)
+    app, warnings = build(srcdir, tmp_path / 'out')
+    assert 'WARNING' not in warnings
+
+    blocks = list(app.env.get_doctree('index').traverse(nodes.literal_block))
+    assert len(blocks) == 2 * len(FILES)
+    for proc, included in zip(blocks[::2], blocks[1::2]):
+        assert proc.astext() == included.astext() == (
+            'proc (1) = f(x);\n    // élevé au carré\n    retp(x^2);\nendp;\n')
+        assert proc['highlight_args'] == included['highlight_args'] == {'linenostart': 14}
+        assert proc['linenos'] and included['linenos']
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+    Tests of the resolution of GAUSS references through the inventories of
+    other projects, by `GAUSSInventory`.
+"""
+
+import os
+import shutil
+
+from conftest import CONF, UTIL
+from GAUSSInventory import GAUSSInventory
+
+DB = '\n'.join([
+    'Databases', '=========', '',
+    '.. gauss:function:: dbOpen(name)', '',
+    '.. gauss:function:: dbClose(db)', '',
+    '.. gauss:module:: dbmod', '',
+    '.. gauss:function:: dbQuery(db, sql)', '',
+])
+
+CDF = 'Distributions\n=============\n\n.. gauss:function:: cdfNorm(x)\n'
+
+DOCS = {
+    'index.rst': '\n'.join([
+        'Index', '=====', '',
+        '.. toctree::', '', '   sub/page', '',
+        '.. gauss:function:: local(x)', '',
+        'See :gauss:func:`dbOpen`, :any:`dbmod.dbQuery`, :gauss:mod:`dbClose`',
+        'and :gauss:func:`local`.', '',
+    ]),
+    'sub/page.rst': 'Page\n====\n\nSee :gauss:func:`cdfNorm` and :gauss:func:`dbOpen`.\n',
+}
+
+INVENTORIES = ("gauss_inventories = {'db': ('https://db.example/', 'db.inv'),\n"
+               "                     'cdf': ('api', 'cdf.inv')}")
+
+
+def write_inventory(build, path, text, filename):
+    """Build a project of one document *text* in *path* and copy its
+    inventory to *filename*, with a later mtime than it had.
+    """
+    path.mkdir(exist_ok=True)
+    (path / 'conf.py').write_text(CONF % (UTIL, '', ['GAUSSDomain']), encoding='utf-8')
+    (path / 'index.rst').write_text(text, encoding='utf-8')
+    app = build(path, path / 'out')[0]
+    mtime = os.path.getmtime(filename) + 10 if os.path.exists(filename) else None
+    shutil.copy(os.path.join(app.outdir, 'objects.inv'), filename)
+    if mtime is not None:
+        os.utime(filename, (mtime, mtime))
+
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_inventory(make_project, build, tmp_path):
+    srcdir = make_project(DOCS, ['GAUSSDomain', 'GAUSSInventory'], conf=INVENTORIES)
+    write_inventory(build, tmp_path / 'db', DB, str(srcdir / 'db.inv'))
+    write_inventory(build, tmp_path / 'cdf', CDF, str(srcdir / 'cdf.inv'))
+    outdir = tmp_path / 'out'
+    app, warnings = build(srcdir, outdir)
+    assert 'WARNING' not in warnings
+
+    # the index, searched by name
+    inventory = GAUSSInventory(os.path.join(app.doctreedir, 'gaussinv-db.idx'))
+    try:
+        assert inventory.count == 4
+        assert inventory.lookup('dbOpen') == [('function', 'index.html#dbOpen', '-')]
+        assert inventory.lookup('dbmod.dbQuery') == [
+            ('function', 'index.html#dbmod.dbQuery', '-')]
+        assert inventory.lookup('dbmod') == [('module', 'index.html#module-dbmod', '-')]
+        assert inventory.lookup('dbOpe') == inventory.lookup('zzz') == []
+        assert inventory.is_current(str(srcdir / 'db.inv'))
+    finally:
+        inventory.close()
+
+    html = read(os.path.join(app.outdir, 'index.html'))
+    assert 'href="https://db.example/index.html#dbOpen"' in html
+    assert 'href="https://db.example/index.html#dbmod.dbQuery"' in html
+    assert 'href="#local"' in html
+    # a module role does not resolve to a function
+    assert '#dbClose"' not in html
+    # a relative base URI, from a page in a subdirectory
+    html = read(os.path.join(app.outdir, 'sub', 'page.html'))
+    assert 'href="../api/index.html#cdfNorm"' in html
+
+    # a changed inventory is indexed again, and the pages linking through
+    # the inventories are written again
+    write_inventory(build, tmp_path / 'db', DB.replace('dbOpen(', 'dbOpen2('),
+                    str(srcdir / 'db.inv'))
+    app, warnings = build(srcdir, outdir)
+    html = read(os.path.join(app.outdir, 'index.html'))
+    assert '#dbOpen"' not in html
+    assert 'href="https://db.example/index.html#dbmod.dbQuery"' in html
+    html = read(os.path.join(app.outdir, 'sub', 'page.html'))
+    assert '#dbOpen"' not in html and 'href="../api/index.html#cdfNorm"' in html
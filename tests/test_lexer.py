@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+    Tests of `GAUSSLexer`, whose tokens must be those Pygments'
+    `RegexLexer` gives for its rules, and but for known differences those
+    the lexer gave before it was optimized.
+"""
+
+import io
+import json
+import mmap
+import os
+import random
+import re
+import time
+from collections import deque
+
+import pytest
+from pygments.lexer import RegexLexer
+from pygments.token import Comment, Keyword, Name, Text, string_to_tokentype
+
+from GAUSSLexer import GAUSSLexer, IncrementalGAUSSLexer
+from GAUSSLexerBench import CORPUS, PATHOLOGICAL
+from make_lexer_golden import GOLDEN, golden_cases
+
+# pieces of GAUSS, well-formed or not, that random texts are made of
+FRAGMENTS = [
+    'proc (1) = f(x);', 'proc (2) = g(struct DS *p, &fn);', 'endp;', 'retp(x);',
+    'keyword k(s);', 'local a, b:proc;', 'if x > 1;', 'elseif y;', 'else;', 'endif;',
+    'for i(1, 10, 1);', 'endfor;', 'threadfor j(1, 2, 1);', 'threadendfor;',
+    'do while x;', 'endo;', 'struct DS d;', 'd.names = "a";', 'p->member',
+    'x = { 1 2, 3.5e-3 -4 };', "y = x' * x;", 'z = a .* b ./ c;', 'call f(1);',
+    'fn h(x) = x + 1;', 'label:', 'goto label;', 'gosub sub;', 'dbOpen("db");',
+    '/* c */', '/*', '*/', '// c', '@ c @', '@', '"str"', '"', '\\', '\\\n',
+    '#if 0', '#ifdef A', '#else', '#elif B', '#endif', '#define A 1',
+    '#include util.src', '#ifdef', ' ', '  ', '\t', '\n', '\n', '\n\n', ' \n',
+    'x', '1', '1.5', '0x1f', '1e10', ';', ',', '(', ')', '[', ']', '{', '}',
+    '=', '==', '$+', '~', '|', '!', '?', '`', 'é',
+]
+
+STATES = [('root',), ('root', 'macro'), ('root', 'if0'), ('root', 'string'),
+          ('root', 'if0', 'if0')]
+
+
+def reference_tokens(lexer, text, stack=('root',)):
+    return list(RegexLexer.get_tokens_unprocessed(lexer, text, stack))
+
+
+def random_texts(count, seed):
+    rng = random.Random(seed)
+    for i in range(count):
+        yield ''.join(rng.choice(FRAGMENTS) + rng.choice(['', ' ', '\n'])
+                      for j in range(rng.randint(1, 60)))
+
+
+def corpus_texts():
+    for filename in sorted(os.listdir(CORPUS)):
+        if filename.endswith(('.src', '.g', '.e')):
+            with open(os.path.join(CORPUS, filename), encoding='utf-8') as f:
+                yield filename, f.read()
+
+
+@pytest.fixture(scope='module')
+def lexer():
+    return GAUSSLexer()
+
+
+def first_difference(golden, tokens):
+    """Return the index of the first token of *tokens* that differs from
+    *golden* other than in the ways the optimizations changed them on
+    purpose, or None.
+    """
+    for i, ((gtype, gvalue), (ttype, value)) in enumerate(zip(golden, tokens)):
+        if gtype is ttype and gvalue == value:
+            continue
+        if gvalue != value:
+            pass
+        elif gtype in (Name, Name.Function) and ttype is Name.Builtin:
+            # builtins are highlighted again
+            continue
+        elif (gtype is Text and ttype is Text.Whitespace and
+              tokens[i - 1] == (Keyword, 'fn')):
+            # the fn of a definition is followed by whitespace, without
+            # scanning the rest of the text for its "="
+            continue
+        if (i == len(tokens) - 1 and value == ''.join(v for t, v in golden[i:]) and
+                (ttype is Comment.Multiline and value.startswith('/*') or
+                 ttype is Comment.Single and value.startswith('//') and
+                 value.endswith('\\\n'))):
+            # unclosed comments in macros, and comments continued to the
+            # end, run to the end of the text
+            return None
+        return i
+    if len(golden) != len(tokens):
+        return min(len(golden), len(tokens))
+    return None
+
+
+@pytest.fixture(scope='module')
+def golden():
+    with open(GOLDEN, encoding='utf-8') as f:
+        return dict((name, [(string_to_tokentype(ttype), value) for ttype, value in tokens])
+                    for name, tokens in json.load(f).items())
+
+
+@pytest.mark.parametrize('name,text', golden_cases(),
+                         ids=[name for name, text in golden_cases()])
+def test_golden(lexer, golden, name, text):
+    tokens = list(lexer.get_tokens(text))
+    i = first_difference(golden[name], tokens)
+    assert i is None, (golden[name][i:i + 3], tokens[i:i + 3])
+
+
+@pytest.mark.parametrize('name,text', list(corpus_texts()))
+def test_corpus(lexer, name, text):
+    assert list(lexer.get_tokens_unprocessed(text)) == reference_tokens(lexer, text)
+
+
+@pytest.mark.parametrize('name,prefix,text,suffix', PATHOLOGICAL)
+def test_pathological(lexer, name, prefix, text, suffix):
+    text = prefix + text * (2000 // len(text)) + suffix
+    assert list(lexer.get_tokens_unprocessed(text)) == reference_tokens(lexer, text)
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_random(lexer, seed):
+    for text in random_texts(250, seed):
+        for stack in STATES:
+            assert (list(lexer.get_tokens_unprocessed(text, stack)) ==
+                    reference_tokens(lexer, text, stack)), (stack, text)
+
+
+def test_get_matches(lexer):
+    # the matches the other lexing APIs are built on give the same tokens
+    for text in random_texts(250, 4):
+        statestack = ['root']
+        tokens = []
+        ends = list(lexer._get_matches(text, statestack, tokens))
+        assert tokens == reference_tokens(lexer, text), text
+        assert ends == sorted(ends) and (not text or ends[-1] == len(text))
+
+
+class NoRunLexer(GAUSSLexer):
+    """The lexer without its rule for runs of numbers."""
+
+    tokens = {
+        'statements': [rule for rule in GAUSSLexer.tokens['statements']
+                       if rule[0] != GAUSSLexer._number_run_re],
+    }
+
+
+def numbers(count, separator=' ', values=('1', '-2', '3.5', '.5', '1.', '1e5',
+                                          '-2.5E-3', '4e+2', '.5e1', '10')):
+    return separator.join(values[i % len(values)] for i in range(count))
+
+
+NUMBER_RUNS = [
+    numbers(7), numbers(8), numbers(9), numbers(7, ', '), numbers(8, ', '),
+    numbers(8, ','), numbers(8, ';'), numbers(8, ' ; '), numbers(8, '\n'),
+    numbers(8, ',\n    '), numbers(8, '\t'), numbers(40, ' '),
+    'x = { %s };' % numbers(8), 'x = { %s, %s };' % (numbers(4), numbers(4)),
+    'x = {\n    %s\n};\n' % numbers(16, ',\n    '),
+    numbers(8, values=('-1', '-2')), numbers(8, values=('.5',)),
+    numbers(8, values=('1.',)), numbers(8, values=('1e5', '1E-5', '1e+5')),
+    # runs the rule leaves to the other rules, or ends early
+    'a%s' % numbers(8), 'x%s' % numbers(8, ','), numbers(8) + 'x',
+    numbers(8) + '.', numbers(8) + '.* y', numbers(8) + ' .5.', numbers(8) + '1.e',
+    numbers(7) + ' 1 + 2', numbers(8) + ' - 2', numbers(8, ' -'), numbers(8, ',,'),
+    numbers(8) + ' 0x1f', '0x1f ' + numbers(8), numbers(8) + ' // c',
+    numbers(4) + ' /* c */ ' + numbers(4), '"%s"' % numbers(8),
+]
+
+
+@pytest.mark.parametrize('text', NUMBER_RUNS)
+def test_number_runs(lexer, text):
+    assert list(lexer.get_tokens(text)) == list(NoRunLexer().get_tokens(text))
+
+
+def test_number_run_rule():
+    # the runs the rule is for
+    match = re.compile(GAUSSLexer._number_run_re, GAUSSLexer.flags).match
+    assert match(numbers(8)).group() == numbers(8)
+    assert match(numbers(8, ',\n    ')).group() == numbers(8, ',\n    ')
+    assert match(numbers(7)) is None
+    assert match(numbers(8) + 'x') is None
+
+
+def best_time(function, text, repeat=3):
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        deque(function(text), maxlen=0)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+@pytest.mark.parametrize('api', ['get_tokens', 'get_tokens_unprocessed'])
+@pytest.mark.parametrize('name,prefix,text,suffix', PATHOLOGICAL)
+def test_linear_time(lexer, api, name, prefix, text, suffix):
+    # four times the text takes about four times as long; a quadratic rule
+    # would make it sixteen.  The constant term allows for timer noise.
+    function = getattr(lexer, api)
+    small, big = [best_time(function, prefix + text * (size // len(text)) + suffix)
+                  for size in (4000, 16000)]
+    assert big < 8 * small + 0.005, (small, big)
+
+
+def check_incremental(incremental, lexer):
+    text = incremental.text
+    assert list(incremental.get_tokens_unprocessed()) == reference_tokens(lexer, text)
+    assert len(incremental.states) == len(incremental.lines) == len(incremental.tokens)
+
+
+def test_incremental_empty(lexer):
+    incremental = IncrementalGAUSSLexer()
+    assert incremental.lines == incremental.states == []
+    check_incremental(incremental, lexer)
+
+    for text, end in [('x = 1;', (0, 6)), ('x = 1;\ny = 2;', (1, 6)),
+                      ('@ stray\nx;\n', (2, 0))]:
+        incremental = IncrementalGAUSSLexer(text)
+        assert incremental.edit(0, 0, end[0], end[1], '') == (0, 0)
+        assert incremental.text == '' and incremental.strays == []
+        check_incremental(incremental, lexer)
+        # and typing again
+        incremental.edit(0, 0, 0, 0, '#if 0\n')
+        incremental.edit(1, 0, 1, 0, 'x = 1;')
+        assert incremental.text == '#if 0\nx = 1;'
+        check_incremental(incremental, lexer)
+
+
+def test_incremental_random(lexer):
+    rng = random.Random(5)
+    for text in random_texts(20, 5):
+        incremental = IncrementalGAUSSLexer(text)
+        for i in range(20):
+            lines = incremental.lines or ['']
+            line, end_line = sorted(rng.randrange(len(lines)) for j in range(2))
+            column = rng.randint(0, len(lines[line].rstrip('\n')))
+            end_column = rng.randint(0, len(lines[end_line].rstrip('\n')))
+            if (line, column) > (end_line, end_column):
+                column, end_column = end_column, column
+            # now and then everything goes
+            if rng.random() < 0.1:
+                line, column = 0, 0
+                end_line = len(lines) - 1
+                end_column = len(lines[end_line])
+            new = ''.join(rng.choice(FRAGMENTS) for j in range(rng.randint(0, 3)))
+            incremental.edit(line, column, end_line, end_column, new)
+            check_incremental(incremental, lexer)
+
+
+#: texts the preprocessing of get_tokens changes
+PREPROCESSED = [
+    ('crlf', 'x = 1;\r\n/* a\r\n b */\r\ny = "\r\n";\r'),
+    ('bom', '\ufeffproc (1) = f(x);\n    retp(x);\nendp;'),
+    ('blank ends', '\n\n  \n  x = 1;  \n\n  \n'),
+    ('tabs', '\tif x;\n\t\ty = "\t";\n\tendif;\n'),
+    ('multibyte', 'x = "\u00e9\u20ac\U0001f600"; // \u00e9\n' * 20),
+    ('no newline', '// c'),
+    ('empty', ''),
+]
+
+
+def stream_sources(text, tmp_path):
+    yield io.StringIO(text)
+    data = text.encode('utf-8')
+    yield io.BytesIO(data)
+    if data:
+        path = tmp_path / 'source.src'
+        path.write_bytes(data)
+        with open(str(path), 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as source:
+                yield source
+
+
+@pytest.mark.parametrize('name,text', golden_cases() + PREPROCESSED,
+                         ids=[name for name, text in golden_cases() + PREPROCESSED])
+def test_stream(lexer, name, text, tmp_path):
+    expected = list(lexer.get_tokens(text))
+    for chunksize in (1, 7, 64):
+        for source in stream_sources(text, tmp_path):
+            assert list(lexer.get_tokens_stream(source, chunksize)) == expected, (
+                chunksize, source)
+
+
+@pytest.mark.parametrize('options', [dict(stripnl=False), dict(stripall=True),
+                                     dict(tabsize=4), dict(ensurenl=False)])
+def test_stream_options(options, tmp_path):
+    lexer = GAUSSLexer(**options)
+    for name, text in PREPROCESSED:
+        expected = list(lexer.get_tokens(text))
+        for chunksize in (1, 7):
+            for source in stream_sources(text, tmp_path):
+                assert list(lexer.get_tokens_stream(source, chunksize)) == expected, (
+                    name, chunksize, source)
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+    Tests of the problems `GAUSSLint` finds in GAUSS code.
+"""
+
+import pytest
+
+from GAUSSLint import lint
+
+CLEAN = [
+    'proc (1) = f(x);\n    retp(x + 1);\nendp;',
+    # a procedure argument opens nothing
+    'proc (1) = apply(&f, x);\n    local f:proc;\n    retp(f(x));\nendp;',
+    'proc (1) = g(a, &h);\n    local b, h : proc, c;\n    retp(h(a));\nendp;',
+    'keyword k(s);\n    print s;\nendp;',
+    'for i(1, 10, 1);\n    if i > 5;\n        break;\n    endif;\nendfor;',
+    'threadfor j(1, 2, 1);\n    x[j] = j;\nthreadendfor;',
+    'do while x < 10;\n    x = x + 1;\nendo;',
+    '#if 0\nproc\n#endif',
+    'x = 1; // if y',
+]
+
+
+@pytest.mark.parametrize('text', CLEAN)
+def test_clean(text):
+    assert lint(text) == []
+
+
+def test_unclosed():
+    assert lint('proc (1) = f(x);\n    local g:proc;\n    retp(g(x));') == [
+        (1, '%r is not closed by %r', ('proc', 'endp'))]
+    assert lint('keyword k(s);\n    if s;\nendp;') == [
+        (2, '%r is not closed by %r before %r', ('if', 'endif', 'endp'))]
+    assert lint('keyword k(s);\n    print s;') == [
+        (1, '%r is not closed by %r', ('keyword', 'endp'))]
+
+
+def test_closer_without_opener():
+    assert lint('x = 1;\nendp;') == [(2, '%r without %r', ('endp', 'proc'))]
+    assert lint('keyword k(s);\nendif;\nendp;') == [
+        (2, '%r without %r', ('endif', 'if'))]
+
+
+def test_unterminated():
+    assert lint('x = "text;\nproc') == [(1, 'unterminated string', ())]
+    assert lint('x = 1;\n#if 0\ny = 2;') == [(2, "'#if' is not closed by '#endif'", ())]
+    assert lint('x = 1; */ y') == [(1, 'unexpected %r', ('*/',))]
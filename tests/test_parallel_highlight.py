@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+    Tests of the code blocks `GAUSSParallelHighlight` highlights in a pool
+    of processes.
+"""
+
+import os
+
+from GAUSSHTMLTranslator import GAUSSHTMLTranslator
+
+EXTENSIONS = ['GAUSSDomain', 'GAUSSParallelHighlight']
+
+# the lexer, as ``docs/conf.py`` adds it
+CONF = """\
+from sphinx.highlighting import lexers
+from GAUSSLexer import GAUSSLexer
+lexers['gauss'] = GAUSSLexer()
+"""
+
+INDEX = '\n'.join([
+    'Index', '=====', '',
+    '.. code-block:: gauss', '',
+    '   proc (1) = f(x);', '       retp(x + 1);', '   endp;', '',
+    '.. code-block:: gauss',
+    '   :linenos:', '',
+    '   x = f(1); // a call', '   print "text";', '',
+    '::', '',
+    '   y = x\'x;', '',
+    '.. code-block:: python', '',
+    '   def g(x):', '       return x', '',
+    '.. code-block:: python',
+    '   :force:', '',
+    '   x = $ forced', '',
+    '.. code-block:: python', '',
+    '   x = $ warns', '',
+])
+
+
+def pages(outdir):
+    """Return the contents of the pages of *outdir*."""
+    contents = {}
+    for name in sorted(os.listdir(str(outdir))):
+        if name.endswith('.html'):
+            with open(os.path.join(str(outdir), name), 'rb') as f:
+                contents[name] = f.read()
+    return contents
+
+
+def test_workers(make_project, build, tmp_path, monkeypatch):
+    # the blocks the pool highlighted
+    pooled = []
+    visit_literal_block = GAUSSHTMLTranslator.visit_literal_block
+
+    def visit(self, node):
+        if node.get('gauss_highlighted') is not None:
+            pooled.append(node.rawsource)
+        return visit_literal_block(self, node)
+    monkeypatch.setattr(GAUSSHTMLTranslator, 'visit_literal_block', visit)
+
+    srcdir = make_project({'index.rst': INDEX}, EXTENSIONS, conf=CONF)
+    warnings = {}
+    for workers in (0, 2):
+        warnings[workers] = build(srcdir, tmp_path / str(workers),
+                                  confoverrides={'gauss_highlight_workers': workers})[1]
+        if workers == 0:
+            assert pooled == []
+    assert pages(tmp_path / '0') == pages(tmp_path / '2')
+
+    # every block but the one whose highlighting warns, which is left to
+    # the translator to warn about
+    assert pooled == ['proc (1) = f(x);\n    retp(x + 1);\nendp;',
+                      'x = f(1); // a call\nprint "text";', "y = x'x;",
+                      'def g(x):\n    return x', 'x = $ forced']
+    for workers in (0, 2):
+        assert warnings[workers].count('Could not lex literal_block as "python"') == 1
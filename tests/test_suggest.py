@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+    Tests of the suggestions `GAUSSSuggest` gives for unresolved GAUSS
+    references.
+"""
+
+from GAUSSSuggest import TrigramIndex
+
+DOCS = {
+    'index.rst': '\n'.join([
+        'Index', '=====', '',
+        '.. gauss:function:: dbOpen(name)', '',
+        '.. gauss:function:: dbQueryFetchAllM(query)', '',
+        'See :any:`dbOpn` and :gauss:func:`dbQueryFetchAlM`.', '',
+    ]),
+}
+
+
+def get_warnings(make_project, build, tmp_path, conf=''):
+    srcdir = make_project(DOCS, ['GAUSSDomain', 'GAUSSSuggest'], conf=conf)
+    warnings = build(srcdir, tmp_path / 'out', 'dummy', freshenv=True)[1]
+    return [line.split(': ', 1)[1] for line in warnings.splitlines()
+            if 'reference target not found' in line]
+
+
+def test_trigram_index():
+    index = TrigramIndex(['dbOpen', 'dbClose', 'dbQueryFetchAllM', 'cdfBvn2e'])
+    assert index.suggest('dbOpn') == ['dbOpen']
+    assert index.suggest('DBOPEN') == ['dbOpen']
+    assert index.suggest('cdfBvn2') == ['cdfBvn2e']
+    assert index.suggest('dbOpen') == []
+    assert index.suggest('xyz') == []
+
+    # a name that is indexed, as one of another type, is no suggestion and
+    # takes no place from one
+    index = TrigramIndex(['dbOpen', 'dbOpen1', 'dbOpen2', 'dbOpen3', 'dbOpenX'])
+    assert index.suggest('dbOpen', limit=3) == ['dbOpen1', 'dbOpen2', 'dbOpen3']
+
+
+def test_one_warning_per_miss(make_project, build, tmp_path):
+    assert get_warnings(make_project, build, tmp_path) == [
+        "WARNING: 'any' reference target not found: dbOpn; did you mean dbOpen?",
+        'WARNING: GAUSS reference target not found: dbQueryFetchAlM; '
+        'did you mean dbQueryFetchAllM?',
+    ]
+
+
+def test_nitpicky(make_project, build, tmp_path):
+    assert get_warnings(make_project, build, tmp_path, conf='nitpicky = True') == [
+        "WARNING: 'any' reference target not found: dbOpn; did you mean dbOpen?",
+        'WARNING: gauss:func reference target not found: dbQueryFetchAlM; '
+        'did you mean dbQueryFetchAllM?',
+    ]
+    conf = "nitpicky = True\nnitpick_ignore = [('gauss:func', 'dbQueryFetchAlM')]"
+    assert get_warnings(make_project, build, tmp_path, conf=conf) == [
+        "WARNING: 'any' reference target not found: dbOpn; did you mean dbOpen?",
+    ]
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+    Tests of the symbol database `GAUSSSymbolDB` writes.
+"""
+
+import os
+import sqlite3
+import warnings
+
+from sphinx.deprecation import RemovedInSphinx30Warning
+
+import GAUSSSymbolDB
+
+DOCS = {
+    'index.rst': 'Index\n=====\n\n.. toctree::\n\n   db\n',
+    'db.rst': '\n'.join([
+        'Database', '========', '',
+        '.. gauss:module:: dbmod', '   :synopsis: Databases.', '',
+        '.. gauss:function:: db = dbOpen(name[, options])', '',
+        '.. gauss:function:: { rows, cols } = dbQueryFetchAllM(query)', '',
+    ]),
+}
+
+
+def test_symboldb(make_project, build, tmp_path):
+    srcdir = make_project(DOCS, ['GAUSSDomain', 'GAUSSSymbolDB'])
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always', RemovedInSphinx30Warning)
+        app = build(srcdir, tmp_path / 'out')[0]
+    assert not [w for w in caught if 'NoUri' in str(w.message)]
+
+    # kept with the doctrees, not published with the HTML
+    filename = os.path.join(app.doctreedir, 'gauss-symbols.db')
+    assert os.path.exists(filename)
+    assert not os.path.exists(os.path.join(app.outdir, 'gauss-symbols.db'))
+    conn = sqlite3.connect(filename)
+    try:
+        assert GAUSSSymbolDB.lookup(conn, 'dbOpen') == [
+            ('dbmod.dbOpen', 'function', 'db = dbmod.dbOpen(name[, options])',
+             'db.html#dbmod.dbOpen')]
+        assert [row[0] for row in GAUSSSymbolDB.lookup(conn, 'db', prefix=True)] == [
+            'dbmod', 'dbmod.dbOpen', 'dbmod.dbQueryFetchAllM']
+    finally:
+        conn.close()
+
+
+def test_symboldb_disabled(make_project, build, tmp_path):
+    srcdir = make_project(DOCS, ['GAUSSDomain', 'GAUSSSymbolDB'],
+                          conf='gauss_symboldb = False')
+    app = build(srcdir, tmp_path / 'out')[0]
+    assert not os.path.exists(os.path.join(app.doctreedir, 'gauss-symbols.db'))
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+    Tests of the source pages `GAUSSViewcode` writes.
+"""
+
+import os
+
+EXTENSIONS = ['GAUSSDomain', 'GAUSSAutodoc', 'GAUSSParallelHighlight', 'GAUSSViewcode']
+
+DOCS = {
+    'index.rst': 'Index\n=====\n\n.. toctree::\n\n   guide\n',
+    'guide.rst': 'Alpha guide\n===========\n\n.. gauss:function:: f(x)\n',
+    'src/util.src': 'proc (1) = f(x);\n    retp(x + 1);\nendp;\n',
+    '_templates/layout.html': '{% extends "!layout.html" %}\n'
+                              '{% block footer %}footer one{% endblock %}\n',
+}
+
+CONF = "gauss_viewcode_files = ['src/*.src']\ntemplates_path = ['_templates']"
+
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_navigation(make_project, build, tmp_path):
+    srcdir = make_project(DOCS, EXTENSIONS, conf=CONF)
+    outdir = tmp_path / 'out'
+    page = os.path.join(str(outdir), '_gauss', 'util.src.html')
+    build(srcdir, outdir)
+    html = read(page)
+    assert 'Alpha guide' in html and 'footer one' in html
+    assert 'href="../guide.html#f"' in html
+
+    # nothing changed, nothing written
+    os.utime(page, (0, 0))
+    build(srcdir, outdir)
+    assert os.path.getmtime(page) == 0
+
+    # the table of contents in the sidebar
+    (srcdir / 'guide.rst').write_text(DOCS['guide.rst'].replace('Alpha', 'Beta'),
+                                      encoding='utf-8')
+    build(srcdir, outdir)
+    html = read(page)
+    assert 'Beta guide' in html and 'Alpha guide' not in html
+
+    # the templates
+    template = srcdir / '_templates' / 'layout.html'
+    template.write_text(DOCS['_templates/layout.html'].replace('one', 'two'),
+                        encoding='utf-8')
+    mtime = os.path.getmtime(page) + 10
+    os.utime(str(template), (mtime, mtime))
+    build(srcdir, outdir)
+    assert 'footer two' in read(page)